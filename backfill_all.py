@@ -8,30 +8,41 @@ import os
 import sys
 import time
 import random
-import psycopg2
 from datetime import datetime
 from psycopg2.extras import execute_values
 
+from db_pool import get_connection, release_connection
+from checkpoints import IngestionRun
+
 BATCH_SIZE = 10000
 
 def get_db():
-    return psycopg2.connect(host='localhost', database='rental_intel', user='sngmacmini')
+    return get_connection('bulk')
 
 def get_counts():
+    """Property total and highest property_id without scanning properties
+
+    The total comes from the trigger-maintained zip_property_counts and the
+    highest id from the primary key index.
+    """
     conn = get_db()
     cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM rental_intel.properties")
-    props = cur.fetchone()[0]
-    cur.execute("SELECT COUNT(*) FROM rental_intel.listings")
-    listings = cur.fetchone()[0]
-    cur.execute("SELECT COUNT(*) FROM rental_intel.rent_price_history")
-    prices = cur.fetchone()[0]
+    cur.execute("""
+        SELECT
+            (SELECT COALESCE(SUM(property_count), 0) FROM rental_intel.zip_property_counts),
+            (SELECT COALESCE(MAX(property_id), 0) FROM rental_intel.properties)
+    """)
+    props, max_id = cur.fetchone()
     cur.close()
-    conn.close()
-    return props, listings, prices
+    release_connection(conn)
+    return props, max_id
 
-def backfill_batch():
-    """Backfill one batch of properties with listings and prices"""
+def backfill_batch(after_id=0):
+    """Backfill one batch of properties with listings and prices
+    
+    Walks properties in property_id order after `after_id`.
+    Returns (listings created, last property_id scanned).
+    """
     conn = get_db()
     conn.autocommit = False
     cur = conn.cursor()
@@ -42,13 +53,17 @@ def backfill_batch():
         FROM rental_intel.properties p
         LEFT JOIN rental_intel.listings l ON p.property_id = l.property_id
         WHERE l.listing_id IS NULL
+        AND p.property_id > %s
+        ORDER BY p.property_id
         LIMIT %s
-    """, (BATCH_SIZE,))
+    """, (after_id, BATCH_SIZE))
     
     props = cur.fetchall()
     
     if not props:
-        return 0
+        cur.close()
+        release_connection(conn)
+        return 0, after_id
     
     # Create listings
     listings_data = []
@@ -91,45 +106,72 @@ def backfill_batch():
     
     conn.commit()
     cur.close()
-    conn.close()
+    release_connection(conn)
     
-    return len(results)
+    return len(results), props[-1][0]
 
 def main():
     print("=" * 70)
     print("BACKFILLING ALL 10M PROPERTIES")
     print("=" * 70)
     
-    props, listings, prices = get_counts()
+    run = IngestionRun('backfill')
+    resumed = run.start()
+    
+    # An unfinished run resumes its cursor; nothing is counted by scanning
+    props, max_id = get_counts()
+    if resumed:
+        cursor = resumed['cursor']
+        inserted = resumed['counters'].get('inserted', 0)
+        print(f"Resuming after property_id {cursor:,}")
+    else:
+        cursor = 0
+        inserted = 0
+    counters = {'properties': props, 'inserted': inserted}
     print(f"Properties: {props:,}")
-    print(f"Listings: {listings:,}")
-    print(f"Prices: {prices:,}")
-    print(f"Missing: {props - listings:,}")
+    print(f"Backfilled so far: {inserted:,}")
     print("=" * 70)
     
     start_time = time.time()
     total_backfilled = 0
     batch = 0
+    status = 'completed'
+    
+    try:
+        # Walk until no property after the cursor lacks a listing; the
+        # listing total can exceed the property total, so it is no bound
+        while True:
+            count, next_cursor = backfill_batch(cursor)
+            if next_cursor == cursor:
+                break
+            cursor = next_cursor
+            
+            total_backfilled += count
+            batch += 1
+            
+            counters['inserted'] += count
+            run.checkpoint(cursor, counters)
+            
+            if batch % 10 == 0:
+                elapsed = time.time() - start_time
+                rate = total_backfilled / elapsed if elapsed > 0 else 0
+                pct = (cursor / max_id) * 100 if max_id else 100.0
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] property_id {cursor:,}/{max_id:,} ({pct:.1f}%) | "
+                      f"Backfilled: {counters['inserted']:,} | Rate: {rate*3600:,.0f}/hr")
     
-    while listings < props:
-        count = backfill_batch()
-        if count == 0:
-            break
-        
-        listings += count
-        prices += count
-        total_backfilled += count
-        batch += 1
-        
-        if batch % 10 == 0:
-            elapsed = time.time() - start_time
-            rate = total_backfilled / elapsed if elapsed > 0 else 0
-            pct = (listings / props) * 100
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] {listings:,}/{props:,} ({pct:.1f}%) | Rate: {rate*3600:,.0f}/hr")
+    except KeyboardInterrupt:
+        print("\nInterrupted! Progress checkpointed.")
+        status = 'interrupted'
+    except Exception as e:
+        print(f"\nError: {e}")
+        status = 'failed'
+    finally:
+        run.checkpoint(cursor, counters, force=True)
+        run.finish(status)
     
     elapsed = time.time() - start_time
     print("\n" + "=" * 70)
-    print("BACKFILL COMPLETE!")
+    print("BACKFILL COMPLETE!" if status == 'completed' else f"BACKFILL {status.upper()}")
     print("=" * 70)
     print(f"Total backfilled: {total_backfilled:,}")
     print(f"Time: {elapsed/60:.1f} minutes")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+One-time backfill of rental_intel.listing_current_rent
+Walks listings in listing_id order and copies each listing's latest price
+from rent_price_history; resumable via ingestion_log checkpoints
+"""
+
+import time
+from datetime import datetime
+
+from db_pool import get_connection, release_connection
+from checkpoints import IngestionRun
+
+BATCH_SIZE = 50000
+
+def backfill_batch(after_id=0):
+    """Backfill the latest rent for one batch of listings
+
+    Returns (rows written, last listing_id scanned).
+    """
+    conn = get_connection('bulk')
+    cur = conn.cursor()
+
+    cur.execute("""
+        SELECT MAX(listing_id), COUNT(*) FROM (
+            SELECT listing_id FROM rental_intel.listings
+            WHERE listing_id > %s
+            ORDER BY listing_id
+            LIMIT %s
+        ) batch
+    """, (after_id, BATCH_SIZE))
+    last_id, scanned = cur.fetchone()
+
+    if not scanned:
+        cur.close()
+        release_connection(conn)
+        return 0, after_id
+
+    # Index range scan per listing range; never sorts the whole history
+    cur.execute("""
+        INSERT INTO rental_intel.listing_current_rent (
+            listing_id, property_id, observed_rent, rent_per_sqft,
+            change_type, observed_date
+        )
+        SELECT DISTINCT ON (listing_id)
+            listing_id, property_id, observed_rent, rent_per_sqft,
+            change_type, observed_date
+        FROM rental_intel.rent_price_history
+        WHERE listing_id > %s AND listing_id <= %s
+        ORDER BY listing_id, observed_date DESC
+        ON CONFLICT (listing_id) DO UPDATE SET
+            property_id = EXCLUDED.property_id,
+            observed_rent = EXCLUDED.observed_rent,
+            rent_per_sqft = EXCLUDED.rent_per_sqft,
+            change_type = EXCLUDED.change_type,
+            observed_date = EXCLUDED.observed_date,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE rental_intel.listing_current_rent.observed_date <= EXCLUDED.observed_date
+    """, (after_id, last_id))
+    written = cur.rowcount
+
+    conn.commit()
+    cur.close()
+    release_connection(conn)
+
+    return written, last_id
+
+def main():
+    print("=" * 70)
+    print("BACKFILLING listing_current_rent")
+    print("=" * 70)
+
+    run = IngestionRun('backfill_current_rent')
+    resumed = run.start()
+    cursor = resumed['cursor'] if resumed else 0
+    counters = resumed['counters'] if resumed else {'inserted': 0}
+    if resumed:
+        print(f"Resuming after listing_id {cursor:,}")
+
+    start_time = time.time()
+    status = 'completed'
+
+    try:
+        while True:
+            written, next_cursor = backfill_batch(cursor)
+            if next_cursor == cursor:
+                break
+            cursor = next_cursor
+            counters['inserted'] += written
+            run.checkpoint(cursor, counters)
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] listing_id {cursor:,} | {counters['inserted']:,} rents")
+
+    except KeyboardInterrupt:
+        print("\nInterrupted! Progress checkpointed.")
+        status = 'interrupted'
+    except Exception as e:
+        print(f"\nError: {e}")
+        status = 'failed'
+    finally:
+        run.checkpoint(cursor, counters, force=True)
+        run.finish(status)
+
+    elapsed = time.time() - start_time
+    print(f"\n{status.upper()}: {counters['inserted']:,} rents in {elapsed/60:.1f} minutes")
+
+if __name__ == "__main__":
+    main()
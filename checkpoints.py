@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Resumable Ingestion Runs
+Periodic checkpoints (batch cursor, counters, throughput) stored in
+rental_intel.ingestion_log so a restarted loader resumes in O(1)
+"""
+
+import json
+import time
+import logging
+from typing import Dict, Optional
+
+from db_pool import pooled_connection
+
+# Minimum seconds between checkpoint writes
+CHECKPOINT_INTERVAL = 30
+
+logger = logging.getLogger('rental_intel.checkpoints')
+
+
+class IngestionRun:
+    """One ingestion_log row that carries periodic, resumable checkpoints
+
+    Usage:
+        run = IngestionRun('fast_v3')
+        resumed = run.start()            # last unfinished checkpoint, or None
+        ...
+        run.checkpoint({'batch_num': n}, {'inserted': total})
+        ...
+        run.finish()
+    """
+
+    def __init__(self, source: str, interval: float = CHECKPOINT_INTERVAL):
+        self.source = source
+        self.interval = interval
+        self.log_id = None
+        self.cursor = None
+        self.counters = {}
+        self._started = None
+        self._last_write = 0.0
+        self._base_counters = {}
+
+    def start(self) -> Optional[Dict]:
+        """Open a new run, returning the previous run's last checkpoint
+
+        Only a run that did not complete (running, interrupted, failed) is
+        resumed; after a completed run the new run starts fresh. The lookup
+        is a single index probe on (source, log_id) over rows that carry a
+        checkpoint; nothing is counted or scanned.
+        """
+        with pooled_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT checkpoint, status FROM rental_intel.ingestion_log
+                WHERE source = %s AND checkpoint IS NOT NULL
+                ORDER BY log_id DESC
+                LIMIT 1
+            """, (self.source,))
+            row = cur.fetchone()
+            resumed = row[0] if row and row[1] != 'completed' else None
+
+            # The new row starts from the resumed checkpoint so a crash before
+            # its first write still leaves the latest progress discoverable
+            cur.execute("""
+                INSERT INTO rental_intel.ingestion_log (source, status, checkpoint, checkpoint_at)
+                VALUES (%s, 'running', %s, CURRENT_TIMESTAMP)
+                RETURNING log_id
+            """, (self.source, json.dumps(resumed) if resumed else None))
+            self.log_id = cur.fetchone()[0]
+            conn.commit()
+            cur.close()
+
+        if resumed:
+            self.cursor = resumed.get('cursor')
+            self.counters = dict(resumed.get('counters', {}))
+            self._base_counters = dict(self.counters)
+            logger.info(f"{self.source}: resuming from checkpoint {self.cursor}")
+        self._started = time.time()
+        self._last_write = time.monotonic()
+        return resumed
+
+    def checkpoint(self, cursor, counters: Dict, force: bool = False) -> bool:
+        """Record progress; writes at most once per interval unless forced"""
+        self.cursor = cursor
+        self.counters = counters
+        if not force and time.monotonic() - self._last_write < self.interval:
+            return False
+
+        self._write()
+        self._last_write = time.monotonic()
+        return True
+
+    def finish(self, status: str = 'completed', errors: Optional[list] = None):
+        """Write the final checkpoint and close the run"""
+        self._write(status=status, errors=errors)
+
+    def throughput(self) -> float:
+        """Records per second processed by this run (not counting resumed work)"""
+        elapsed = time.time() - self._started if self._started else 0
+        done = self.counters.get('inserted', 0) - self._base_counters.get('inserted', 0)
+        return done / elapsed if elapsed > 0 else 0.0
+
+    def _write(self, status: Optional[str] = None, errors: Optional[list] = None):
+        """Persist cursor, counters and throughput onto the run's log row"""
+        checkpoint = {
+            'cursor': self.cursor,
+            'counters': self.counters,
+            'throughput_per_sec': round(self.throughput(), 2),
+            'elapsed_secs': round(time.time() - self._started, 1) if self._started else 0,
+        }
+        try:
+            with pooled_connection() as conn:
+                cur = conn.cursor()
+                cur.execute("""
+                    UPDATE rental_intel.ingestion_log
+                    SET checkpoint = %s,
+                        checkpoint_at = CURRENT_TIMESTAMP,
+                        records_scanned = %s,
+                        records_inserted = %s,
+                        records_updated = %s,
+                        price_changes = %s,
+                        errors = COALESCE(%s, errors),
+                        status = COALESCE(%s, status),
+                        run_end = CASE WHEN %s IS NULL THEN run_end ELSE CURRENT_TIMESTAMP END
+                    WHERE log_id = %s
+                """, (
+                    json.dumps(checkpoint),
+                    self.counters.get('scanned', 0),
+                    self.counters.get('inserted', 0),
+                    self.counters.get('updated', 0),
+                    self.counters.get('price_changes', 0),
+                    json.dumps(errors) if errors is not None else None,
+                    status, status,
+                    self.log_id
+                ))
+                conn.commit()
+                cur.close()
+        except Exception as e:
+            logger.error(f"{self.source}: failed to write checkpoint: {e}")
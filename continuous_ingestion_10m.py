@@ -8,10 +8,12 @@ import os
 import sys
 import time
 import random
-import psycopg2
 from datetime import datetime, timedelta
 from psycopg2.extras import RealDictCursor
 
+from db_pool import get_connection, release_connection, PreparedStatement
+from checkpoints import IngestionRun
+
 # Target: 10 million properties
 TARGET_PROPERTIES = 10_000_000
 BATCH_SIZE = 1000
@@ -22,104 +24,104 @@ US_MARKETS_FULL = {
     # Major metros with sub-markets
     'CA': {
         'regions': [
-            ('San Francisco', 94101, 94188, 4500),
-            ('San Jose', 95001, 95196, 3800),
-            ('Oakland', 94601, 94688, 3200),
-            ('Los Angeles', 90001, 90899, 2800),
-            ('San Diego', 92014, 92199, 2700),
-            ('Sacramento', 95660, 95899, 1800),
-            ('Fresno', 93650, 93888, 1400),
-            ('Bakersfield', 93301, 93390, 1300)
+            ('San Francisco', '94101', '94188', 4500),
+            ('San Jose', '95001', '95196', 3800),
+            ('Oakland', '94601', '94688', 3200),
+            ('Los Angeles', '90001', '90899', 2800),
+            ('San Diego', '92014', '92199', 2700),
+            ('Sacramento', '95660', '95899', 1800),
+            ('Fresno', '93650', '93888', 1400),
+            ('Bakersfield', '93301', '93390', 1300)
         ]
     },
     'TX': {
         'regions': [
-            ('Houston', 77001, 77299, 1600),
-            ('Dallas', 75201, 75398, 1700),
-            ('Austin', 78701, 78799, 2000),
-            ('San Antonio', 78201, 78299, 1300),
-            ('Fort Worth', 76101, 76299, 1500),
-            ('El Paso', 79901, 79999, 1000),
-            ('Plano', 75023, 75099, 1900)
+            ('Houston', '77001', '77299', 1600),
+            ('Dallas', '75201', '75398', 1700),
+            ('Austin', '78701', '78799', 2000),
+            ('San Antonio', '78201', '78299', 1300),
+            ('Fort Worth', '76101', '76299', 1500),
+            ('El Paso', '79901', '79999', 1000),
+            ('Plano', '75023', '75099', 1900)
         ]
     },
     'NY': {
         'regions': [
-            ('New York', 10001, 10292, 4200),
-            ('Brooklyn', 11201, 11256, 3500),
-            ('Queens', 11361, 11436, 2800),
-            ('Bronx', 10451, 10475, 2400),
-            ('Buffalo', 14201, 14280, 1100),
-            ('Rochester', 14602, 14694, 1000)
+            ('New York', '10001', '10292', 4200),
+            ('Brooklyn', '11201', '11256', 3500),
+            ('Queens', '11361', '11436', 2800),
+            ('Bronx', '10451', '10475', 2400),
+            ('Buffalo', '14201', '14280', 1100),
+            ('Rochester', '14602', '14694', 1000)
         ]
     },
     'FL': {
         'regions': [
-            ('Miami', 33101, 33299, 3000),
-            ('Miami Beach', 33109, 33154, 3200),
-            ('Tampa', 33601, 33694, 1600),
-            ('Orlando', 32801, 32899, 1500),
-            ('Jacksonville', 32099, 32290, 1300),
-            ('St. Petersburg', 33701, 33784, 1400),
-            ('Fort Lauderdale', 33301, 33394, 2000),
-            ('Naples', 34101, 34120, 2800)
+            ('Miami', '33101', '33299', 3000),
+            ('Miami Beach', '33109', '33154', 3200),
+            ('Tampa', '33601', '33694', 1600),
+            ('Orlando', '32801', '32899', 1500),
+            ('Jacksonville', '32099', '32290', 1300),
+            ('St. Petersburg', '33701', '33784', 1400),
+            ('Fort Lauderdale', '33301', '33394', 2000),
+            ('Naples', '34101', '34120', 2800)
         ]
     },
     'IL': {
         'regions': [
-            ('Chicago', 60601, 60827, 2100),
-            ('Evanston', 60201, 60209, 1800),
-            ('Oak Park', 60301, 60304, 1700),
-            ('Aurora', 60502, 60599, 1400),
-            ('Rockford', 61101, 61126, 900)
+            ('Chicago', '60601', '60827', 2100),
+            ('Evanston', '60201', '60209', 1800),
+            ('Oak Park', '60301', '60304', 1700),
+            ('Aurora', '60502', '60599', 1400),
+            ('Rockford', '61101', '61126', 900)
         ]
     },
     # All 50 states with representative markets
-    'PA': [('Philadelphia', 19101, 19199, 1800), ('Pittsburgh', 15201, 15295, 1200)],
-    'OH': [('Columbus', 43085, 43299, 1300), ('Cleveland', 44101, 44199, 950)],
-    'GA': [('Atlanta', 30301, 30399, 1600), ('Augusta', 30901, 30999, 900)],
-    'NC': [('Charlotte', 28201, 28299, 1500), ('Raleigh', 27601, 27699, 1300)],
-    'MI': [('Detroit', 48201, 48299, 800), ('Grand Rapids', 49501, 49599, 1100)],
-    'NJ': [('Newark', 07101, 07199, 2100), ('Jersey City', 07030, 07399, 2400)],
-    'VA': [('Virginia Beach', 23450, 23479, 1300), ('Richmond', 23218, 23298, 1150)],
-    'WA': [('Seattle', 98101, 98199, 2400), ('Spokane', 99201, 99299, 1150)],
-    'AZ': [('Phoenix', 85001, 85099, 1400), ('Tucson', 85701, 85799, 1050)],
-    'MA': [('Boston', 02101, 02199, 3600), ('Cambridge', 02138, 02239, 3200)],
-    'TN': [('Nashville', 37201, 37299, 1400), ('Memphis', 38101, 38199, 950)],
-    'IN': [('Indianapolis', 46201, 46299, 1100), ('Fort Wayne', 46801, 46899, 850)],
-    'MO': [('Kansas City', 64101, 64199, 1100), ('St. Louis', 63101, 63199, 1050)],
-    'MD': [('Baltimore', 21201, 21299, 1300), ('Rockville', 20847, 20853, 1600)],
-    'WI': [('Milwaukee', 53201, 53299, 1100), ('Madison', 53701, 53799, 1300)],
-    'CO': [('Denver', 80201, 80299, 1900), ('Boulder', 80301, 80310, 2100)],
-    'MN': [('Minneapolis', 55401, 55488, 1400), ('St. Paul', 55101, 55199, 1250)],
-    'SC': [('Charleston', 29401, 29492, 1500), ('Columbia', 29201, 29299, 1000)],
-    'AL': [('Birmingham', 35201, 35299, 1000), ('Montgomery', 36101, 36199, 850)],
-    'LA': [('New Orleans', 70112, 70199, 1300), ('Baton Rouge', 70801, 70899, 950)],
-    'KY': [('Louisville', 40201, 40299, 1000), ('Lexington', 40502, 40599, 1050)],
-    'OR': [('Portland', 97201, 97299, 1750), ('Eugene', 97401, 97499, 1200)],
-    'OK': [('Oklahoma City', 73101, 73199, 900), ('Tulsa', 74101, 74199, 850)],
-    'CT': [('Bridgeport', 06601, 06699, 1500), ('New Haven', 06501, 06599, 1400)],
-    'UT': [('Salt Lake City', 84101, 84199, 1400), ('Provo', 84601, 84606, 1100)],
-    'IA': [('Des Moines', 50301, 50399, 950), ('Cedar Rapids', 52401, 52499, 850)],
-    'NV': [('Las Vegas', 89101, 89199, 1400), ('Reno', 89501, 89599, 1300)],
-    'AR': [('Little Rock', 72201, 72299, 800), ('Fayetteville', 72701, 72704, 850)],
-    'MS': [('Jackson', 39201, 39299, 850), ('Gulfport', 39501, 39599, 900)],
-    'KS': [('Wichita', 67201, 67299, 800), ('Overland Park', 66204, 66299, 1050)],
-    'NM': [('Albuquerque', 87101, 87199, 950), ('Santa Fe', 87501, 87509, 1200)],
-    'NE': [('Omaha', 68101, 68199, 900), ('Lincoln', 68501, 68599, 850)],
-    'WV': [('Charleston', 25301, 25399, 750), ('Huntington', 25701, 25799, 700)],
-    'ID': [('Boise', 83701, 83799, 1300), ('Meridian', 83642, 83646, 1350)],
-    'HI': [('Honolulu', 96801, 96899, 2500), ('Hilo', 96720, 96721, 1800)],
-    'NH': [('Manchester', 03101, 03111, 1400), ('Nashua', 03060, 03099, 1450)],
-    'ME': [('Portland', 04101, 04199, 1500), ('Bangor', 04401, 04402, 1100)],
-    'MT': [('Billings', 59101, 59199, 1000), ('Missoula', 59801, 59899, 1200)],
-    'RI': [('Providence', 02901, 02940, 1400), ('Newport', 02840, 02841, 1600)],
-    'DE': [('Wilmington', 19801, 19899, 1300), ('Dover', 19901, 19906, 1100)],
-    'SD': [('Sioux Falls', 57101, 57199, 900), ('Rapid City', 57701, 57799, 850)],
-    'ND': [('Fargo', 58102, 58199, 900), ('Bismarck', 58501, 58507, 850)],
-    'AK': [('Anchorage', 99501, 99599, 1500), ('Juneau', 99801, 99850, 1350)],
-    'VT': [('Burlington', 05401, 05499, 1400), ('Rutland', 05701, 05704, 1000)],
-    'WY': [('Cheyenne', 82001, 82009, 1000), ('Casper', 82601, 82609, 950)]
+    'PA': [('Philadelphia', '19101', '19199', 1800), ('Pittsburgh', '15201', '15295', 1200)],
+    'OH': [('Columbus', '43085', '43299', 1300), ('Cleveland', '44101', '44199', 950)],
+    'GA': [('Atlanta', '30301', '30399', 1600), ('Augusta', '30901', '30999', 900)],
+    'NC': [('Charlotte', '28201', '28299', 1500), ('Raleigh', '27601', '27699', 1300)],
+    'MI': [('Detroit', '48201', '48299', 800), ('Grand Rapids', '49501', '49599', 1100)],
+    'NJ': [('Newark', '07101', '07199', 2100), ('Jersey City', '07030', '07399', 2400)],
+    'VA': [('Virginia Beach', '23450', '23479', 1300), ('Richmond', '23218', '23298', 1150)],
+    'WA': [('Seattle', '98101', '98199', 2400), ('Spokane', '99201', '99299', 1150)],
+    'AZ': [('Phoenix', '85001', '85099', 1400), ('Tucson', '85701', '85799', 1050)],
+    'MA': [('Boston', '02101', '02199', 3600), ('Cambridge', '02138', '02239', 3200)],
+    'TN': [('Nashville', '37201', '37299', 1400), ('Memphis', '38101', '38199', 950)],
+    'IN': [('Indianapolis', '46201', '46299', 1100), ('Fort Wayne', '46801', '46899', 850)],
+    'MO': [('Kansas City', '64101', '64199', 1100), ('St. Louis', '63101', '63199', 1050)],
+    'MD': [('Baltimore', '21201', '21299', 1300), ('Rockville', '20847', '20853', 1600)],
+    'WI': [('Milwaukee', '53201', '53299', 1100), ('Madison', '53701', '53799', 1300)],
+    'CO': [('Denver', '80201', '80299', 1900), ('Boulder', '80301', '80310', 2100)],
+    'MN': [('Minneapolis', '55401', '55488', 1400), ('St. Paul', '55101', '55199', 1250)],
+    'SC': [('Charleston', '29401', '29492', 1500), ('Columbia', '29201', '29299', 1000)],
+    'AL': [('Birmingham', '35201', '35299', 1000), ('Montgomery', '36101', '36199', 850)],
+    'LA': [('New Orleans', '70112', '70199', 1300), ('Baton Rouge', '70801', '70899', 950)],
+    'KY': [('Louisville', '40201', '40299', 1000), ('Lexington', '40502', '40599', 1050)],
+    'OR': [('Portland', '97201', '97299', 1750), ('Eugene', '97401', '97499', 1200)],
+    'OK': [('Oklahoma City', '73101', '73199', 900), ('Tulsa', '74101', '74199', 850)],
+    'CT': [('Bridgeport', '06601', '06699', 1500), ('New Haven', '06501', '06599', 1400)],
+    'UT': [('Salt Lake City', '84101', '84199', 1400), ('Provo', '84601', '84606', 1100)],
+    'IA': [('Des Moines', '50301', '50399', 950), ('Cedar Rapids', '52401', '52499', 850)],
+    'NV': [('Las Vegas', '89101', '89199', 1400), ('Reno', '89501', '89599', 1300)],
+    'AR': [('Little Rock', '72201', '72299', 800), ('Fayetteville', '72701', '72704', 850)],
+    'MS': [('Jackson', '39201', '39299', 850), ('Gulfport', '39501', '39599', 900)],
+    'KS': [('Wichita', '67201', '67299', 800), ('Overland Park', '66204', '66299', 1050)],
+    'NM': [('Albuquerque', '87101', '87199', 950), ('Santa Fe', '87501', '87509', 1200)],
+    'NE': [('Omaha', '68101', '68199', 900), ('Lincoln', '68501', '68599', 850)],
+    'WV': [('Charleston', '25301', '25399', 750), ('Huntington', '25701', '25799', 700)],
+    'ID': [('Boise', '83701', '83799', 1300), ('Meridian', '83642', '83646', 1350)],
+    'HI': [('Honolulu', '96801', '96899', 2500), ('Hilo', '96720', '96721', 1800)],
+    'NH': [('Manchester', '03101', '03111', 1400), ('Nashua', '03060', '03099', 1450)],
+    'ME': [('Portland', '04101', '04199', 1500), ('Bangor', '04401', '04402', 1100)],
+    'MT': [('Billings', '59101', '59199', 1000), ('Missoula', '59801', '59899', 1200)],
+    'RI': [('Providence', '02901', '02940', 1400), ('Newport', '02840', '02841', 1600)],
+    'DE': [('Wilmington', '19801', '19899', 1300), ('Dover', '19901', '19906', 1100)],
+    'SD': [('Sioux Falls', '57101', '57199', 900), ('Rapid City', '57701', '57799', 850)],
+    'ND': [('Fargo', '58102', '58199', 900), ('Bismarck', '58501', '58507', 850)],
+    'AK': [('Anchorage', '99501', '99599', 1500), ('Juneau', '99801', '99850', 1350)],
+    'VT': [('Burlington', '05401', '05499', 1400), ('Rutland', '05701', '05704', 1000)],
+    'WY': [('Cheyenne', '82001', '82009', 1000), ('Casper', '82601', '82609', 950)]
 }
 
 STREETS = [
@@ -129,22 +131,48 @@ STREETS = [
     'Franklin Ave', 'Madison St', 'Jefferson Blvd', 'California St', 'Market St'
 ]
 
-def get_db_connection():
-    """Get database connection"""
-    return psycopg2.connect(
-        host='localhost',
-        database='rental_intel',
-        user='sngmacmini'
+# Per-property statements, prepared once per pooled connection
+INSERT_PROPERTY = PreparedStatement('cc_insert_property', """
+    INSERT INTO rental_intel.properties (
+        street_address, city, state, zip,
+        normalized_full_address, address_hash,
+        property_type, bedrooms, bathrooms, square_feet
+    ) VALUES (
+        $1, $2, $3, $4, $5, $6, $7, $8, $9, $10
     )
+    ON CONFLICT (address_hash) DO NOTHING
+    RETURNING property_id
+""", ('TEXT', 'TEXT', 'TEXT', 'TEXT', 'TEXT', 'TEXT', 'TEXT', 'INTEGER', 'DECIMAL', 'INTEGER'))
+
+INSERT_LISTING = PreparedStatement('cc_insert_listing', """
+    INSERT INTO rental_intel.listings (
+        property_id, source_platform, source_listing_id,
+        listing_url, listing_status
+    ) VALUES ($1, $2, $3, $4, 'active')
+    ON CONFLICT DO NOTHING
+    RETURNING listing_id
+""", ('BIGINT', 'TEXT', 'TEXT', 'TEXT'))
+
+INSERT_PRICE = PreparedStatement('cc_insert_price', """
+    INSERT INTO rental_intel.rent_price_history (
+        listing_id, property_id, observed_rent, rent_per_sqft,
+        change_type, observed_date
+    ) VALUES ($1, $2, $3, $4, 'new', CURRENT_DATE)
+    ON CONFLICT DO NOTHING
+""", ('BIGINT', 'BIGINT', 'DECIMAL', 'DECIMAL'))
+
+def get_db_connection():
+    """Check out a connection from the shared pool"""
+    return get_connection('ingest')
 
 def get_current_count():
-    """Get current property count"""
+    """Current property count from the trigger-maintained zip_property_counts"""
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM rental_intel.properties")
+    cursor.execute("SELECT COALESCE(SUM(property_count), 0) FROM rental_intel.zip_property_counts")
     count = cursor.fetchone()[0]
     cursor.close()
-    conn.close()
+    release_connection(conn)
     return count
 
 def generate_addresses_for_region(region_data, count_per_region=50):
@@ -157,8 +185,10 @@ def generate_addresses_for_region(region_data, count_per_region=50):
     properties = []
     
     for city, zip_start, zip_end, base_rent in regions:
+        # ZIP bounds are strings so leading zeros survive ('07101')
+        zip_start, zip_end = int(zip_start), int(zip_end)
         for i in range(count_per_region):
-            zip_code = random.randint(zip_start, min(zip_end, zip_start + 99))
+            zip_code = f"{random.randint(zip_start, min(zip_end, zip_start + 99)):05d}"
             street_num = random.randint(100, 9999)
             street = random.choice(STREETS)
             
@@ -176,7 +206,7 @@ def generate_addresses_for_region(region_data, count_per_region=50):
                 'street_address': f"{street_num} {street}",
                 'city': city,
                 'state': None,  # Set per state
-                'zip_code': str(zip_code),
+                'zip_code': zip_code,
                 'bedrooms': bedrooms,
                 'bathrooms': bathrooms,
                 'sqft': sqft,
@@ -194,17 +224,7 @@ def insert_batch(batch, state):
     inserted = 0
     for prop in batch:
         try:
-            cursor.execute("""
-                INSERT INTO rental_intel.properties (
-                    street_address, city, state, zip,
-                    normalized_full_address, address_hash,
-                    property_type, bedrooms, bathrooms, square_feet
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                )
-                ON CONFLICT (address_hash) DO NOTHING
-                RETURNING property_id
-            """, (
+            INSERT_PROPERTY.execute(cursor, (
                 prop['street_address'],
                 prop['city'],
                 state,
@@ -223,14 +243,7 @@ def insert_batch(batch, state):
                 inserted += 1
                 
                 # Insert listing
-                cursor.execute("""
-                    INSERT INTO rental_intel.listings (
-                        property_id, source_platform, source_listing_id,
-                        listing_url, listing_status
-                    ) VALUES (%s, %s, %s, %s, 'active')
-                    ON CONFLICT DO NOTHING
-                    RETURNING listing_id
-                """, (
+                INSERT_LISTING.execute(cursor, (
                     prop_id, 'continuous_collector', f"cc_{state}_{inserted}",
                     f"https://rental.intel/{state}/{inserted}"
                 ))
@@ -240,13 +253,7 @@ def insert_batch(batch, state):
                     listing_id = list_result[0]
                     
                     # Insert price
-                    cursor.execute("""
-                        INSERT INTO rental_intel.rent_price_history (
-                            listing_id, property_id, observed_rent, rent_per_sqft,
-                            change_type, observed_date
-                        ) VALUES (%s, %s, %s, %s, 'new', CURRENT_DATE)
-                        ON CONFLICT DO NOTHING
-                    """, (
+                    INSERT_PRICE.execute(cursor, (
                         listing_id, prop_id,
                         prop['rent'],
                         round(prop['rent'] / prop['sqft'], 2) if prop['sqft'] else None
@@ -257,7 +264,7 @@ def insert_batch(batch, state):
     
     conn.commit()
     cursor.close()
-    conn.close()
+    release_connection(conn)
     
     return inserted
 
@@ -284,12 +291,22 @@ def main():
     print("=" * 60)
     
     start_time = datetime.now()
+    
+    # Resume an unfinished run's batch cursor; the property total is read
+    # fresh (other loaders add properties between runs) without a scan
+    run = IngestionRun('continuous_collector')
+    resumed = run.start()
+    if resumed:
+        batch_num = resumed['cursor']['batch_num']
+        counters = {'inserted': resumed['counters'].get('inserted', 0)}
+    else:
+        batch_num = 0
+        counters = {'inserted': 0}
     total_inserted = get_current_count()
+    status = 'completed'
     
     print(f"Starting from: {total_inserted:,} properties")
     
-    batch_num = 0
-    
     try:
         while total_inserted < TARGET_PROPERTIES:
             batch_inserted = 0
@@ -307,6 +324,8 @@ def main():
             
             total_inserted += batch_inserted
             batch_num += 1
+            counters['inserted'] += batch_inserted
+            run.checkpoint({'batch_num': batch_num}, counters)
             
             # Log every 100 batches
             if batch_num % 100 == 0:
@@ -335,7 +354,7 @@ def main():
                     
                     conn.commit()
                     cursor.close()
-                    conn.close()
+                    release_connection(conn)
                     
                     print(f"  → Updated metrics for {len(zips)} ZIPs")
                 except Exception as e:
@@ -346,9 +365,13 @@ def main():
     
     except KeyboardInterrupt:
         print("\n\nInterrupted! Saving progress...")
+        status = 'interrupted'
+    finally:
+        run.checkpoint({'batch_num': batch_num}, counters, force=True)
+        run.finish(status)
     
     # Final status
-    final_count = get_current_count()
+    final_count = total_inserted
     elapsed = (datetime.now() - start_time).total_seconds()
     
     print("\n" + "=" * 60)
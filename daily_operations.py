@@ -5,23 +5,26 @@ Automated daily data ingestion and metric calculation
 """
 
 import os
+import io
+import csv
 import json
+import pickle
+import math
 import hashlib
 import logging
+import threading
 from datetime import datetime, timedelta, date
-from typing import List, Dict, Optional, Tuple
+from itertools import islice
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator, Callable
 from dataclasses import dataclass
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
 import psycopg2
 from psycopg2.extras import execute_values, RealDictCursor
 import schedule
 import time
 
-# Configuration
-DB_HOST = os.getenv('DB_HOST', 'localhost')
-DB_PORT = os.getenv('DB_PORT', '5432')
-DB_NAME = os.getenv('DB_NAME', 'rental_intel')
-DB_USER = os.getenv('DB_USER', 'sngmacmini')  # macOS default user
-DB_PASSWORD = os.getenv('DB_PASSWORD', '')
+from db_pool import get_connection, release_connection, PreparedStatement, statement_stats
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,6 +32,152 @@ logging.basicConfig(
 )
 logger = logging.getLogger('rental_intel')
 
+# Values accepted by the properties.property_type CHECK constraint
+PROPERTY_TYPES = ('apartment', 'house', 'condo', 'townhouse', 'studio', 'loft')
+
+# Columns streamed into the bulk ingestion staging table (in COPY order)
+STAGING_COLUMNS = (
+    'seq', 'street_address', 'city', 'state', 'zip_code',
+    'normalized', 'address_hash', 'property_type', 'bedrooms',
+    'bathrooms', 'square_feet', 'source_listing_id', 'listing_url', 'rent',
+    'observed_date'
+)
+
+# Price observations buffered per record_prices call
+PRICE_BATCH_SIZE = 5000
+
+# Max entries kept by PropertyCache (address_hash -> property_id)
+PROPERTY_CACHE_SIZE = int(os.getenv('PROPERTY_CACHE_SIZE', '500000'))
+
+# On-disk location of the ListingCache between runs, and its max entries
+LISTING_CACHE_PATH = os.getenv(
+    'LISTING_CACHE_PATH', os.path.expanduser('~/.rental_intel/listing_cache.pkl')
+)
+LISTING_CACHE_SIZE = int(os.getenv('LISTING_CACHE_SIZE', '1000000'))
+
+# Listing ids per bulk last_verified_date update
+TOUCH_BATCH_SIZE = 50000
+
+# Streaming ingestion: records per COPY/commit chunk, recent listings
+# remembered for de-duplication, and error messages kept per run
+STREAM_CHUNK_SIZE = 5000
+DEDUPE_WINDOW = 100000
+ERROR_SAMPLE_SIZE = 100
+
+# Daily ZIP metrics backend: 'sql' (incremental, dirty ZIPs only) or
+# 'numpy' (metrics_engine.ZipMetricsEngine, every ZIP and every column)
+METRICS_ENGINE = os.getenv('METRICS_ENGINE', 'sql')
+
+# Fields a record must carry to be ingested
+REQUIRED_FIELDS = ('street_address', 'city', 'state', 'zip_code', 'source_listing_id')
+
+# Column limits checked before COPY: INTEGER, DECIMAL(4, 2) bathrooms,
+# DECIMAL(10, 2) rent and DECIMAL(8, 4) rent_per_sqft (exclusive bounds)
+INTEGER_LIMIT = 2 ** 31
+BATHROOMS_LIMIT = 100
+RENT_LIMIT = 10 ** 8
+RENT_PER_SQFT_LIMIT = 10 ** 4
+
+# Hot write paths, prepared once per pooled connection
+UPSERT_PROPERTY = PreparedStatement('ri_upsert_property', """
+    INSERT INTO rental_intel.properties (
+        street_address, city, state, zip,
+        normalized_full_address, address_hash,
+        property_type, bedrooms, bathrooms, square_feet
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+    ON CONFLICT (address_hash) DO UPDATE SET
+        property_type = COALESCE(EXCLUDED.property_type, rental_intel.properties.property_type),
+        bedrooms = COALESCE(EXCLUDED.bedrooms, rental_intel.properties.bedrooms),
+        bathrooms = COALESCE(EXCLUDED.bathrooms, rental_intel.properties.bathrooms),
+        square_feet = COALESCE(EXCLUDED.square_feet, rental_intel.properties.square_feet),
+        updated_at = CURRENT_TIMESTAMP
+    RETURNING property_id
+""", ('TEXT', 'TEXT', 'TEXT', 'TEXT', 'TEXT', 'TEXT', 'TEXT', 'INTEGER', 'DECIMAL', 'INTEGER'))
+
+UPSERT_LISTING = PreparedStatement('ri_upsert_listing', """
+    INSERT INTO rental_intel.listings (
+        property_id, source_platform, source_listing_id,
+        listing_url, listing_status, last_verified_date
+    ) VALUES ($1, $2, $3, $4, 'active', CURRENT_TIMESTAMP)
+    ON CONFLICT (source_platform, source_listing_id) DO UPDATE SET
+        property_id = EXCLUDED.property_id,
+        listing_status = 'active',
+        last_verified_date = CURRENT_TIMESTAMP
+    RETURNING listing_id
+""", ('BIGINT', 'TEXT', 'TEXT', 'TEXT'))
+
+# Observations arrive as parallel arrays so one statement text serves any
+# batch size. Listings not yet in listing_current_rent (e.g. before
+# backfill_current_rent.py has reached them) fall back to their latest
+# price history row.
+RECORD_PRICES = PreparedStatement('ri_record_prices', """
+    WITH obs (listing_id, rent) AS (
+        SELECT * FROM unnest($1, $2)
+    ),
+    classified AS (
+        SELECT
+            o.listing_id,
+            l.property_id,
+            p.zip,
+            o.rent,
+            ROUND(o.rent / NULLIF(p.square_feet, 0), 4) AS rent_per_sqft,
+            CASE
+                WHEN last.observed_rent IS NULL THEN 'new'
+                WHEN o.rent > last.observed_rent THEN 'increase'
+                WHEN o.rent < last.observed_rent THEN 'decrease'
+                ELSE 'unchanged'
+            END AS change_type
+        FROM obs o
+        JOIN rental_intel.listings l ON l.listing_id = o.listing_id
+        LEFT JOIN rental_intel.properties p ON p.property_id = l.property_id
+        LEFT JOIN rental_intel.listing_current_rent cur ON cur.listing_id = o.listing_id
+        LEFT JOIN LATERAL (
+            SELECT h.observed_rent
+            FROM rental_intel.rent_price_history h
+            WHERE cur.listing_id IS NULL AND h.listing_id = o.listing_id
+            ORDER BY h.observed_date DESC, h.price_history_id DESC
+            LIMIT 1
+        ) hist ON true
+        CROSS JOIN LATERAL (
+            SELECT COALESCE(cur.observed_rent, hist.observed_rent) AS observed_rent
+        ) last
+    ),
+    inserted AS (
+        INSERT INTO rental_intel.rent_price_history (
+            listing_id, property_id, observed_rent, rent_per_sqft,
+            change_type, observed_date, zip
+        )
+        SELECT listing_id, property_id, rent, rent_per_sqft, change_type, CURRENT_DATE, zip
+        FROM classified
+        WHERE change_type <> 'unchanged'
+    )
+    SELECT change_type, COUNT(*) AS n
+    FROM classified
+    GROUP BY change_type
+""", ('BIGINT[]', 'DECIMAL[]'))
+
+# Reactivated listings change their ZIP's active count, so mark it dirty
+TOUCH_LISTINGS = PreparedStatement('ri_touch_listings', """
+    WITH touched AS (
+        UPDATE rental_intel.listings l
+        SET listing_status = 'active',
+            last_verified_date = CURRENT_TIMESTAMP
+        FROM rental_intel.listings prior
+        WHERE prior.listing_id = l.listing_id
+        AND l.listing_id = ANY($1)
+        RETURNING l.listing_id, l.property_id, prior.listing_status AS prior_status
+    ),
+    marked AS (
+        INSERT INTO rental_intel.dirty_zips (zip)
+        SELECT DISTINCT p.zip
+        FROM touched t
+        JOIN rental_intel.properties p ON p.property_id = t.property_id
+        WHERE t.prior_status <> 'active'
+        ON CONFLICT (zip) DO NOTHING
+    )
+    SELECT listing_id FROM touched
+""", ('BIGINT[]',))
+
 @dataclass
 class PropertyData:
     """Standardized property data structure"""
@@ -49,23 +198,197 @@ class ListingData:
     listing_url: Optional[str] = None
     rent: Optional[float] = None
 
+class ErrorTracker:
+    """Bounded error record: total and per-type counts plus the first N messages"""
+    
+    def __init__(self, max_samples: int = ERROR_SAMPLE_SIZE):
+        self.max_samples = max_samples
+        self.total = 0
+        self.counts = {}
+        self.samples = []
+    
+    def add(self, error_type: str, message: str):
+        """Count an error, keeping its message while samples remain"""
+        self.total += 1
+        self.counts[error_type] = self.counts.get(error_type, 0) + 1
+        if len(self.samples) < self.max_samples:
+            self.samples.append(message)
+
+
+class PropertyCache:
+    """Bounded LRU map of address_hash -> (property_id, known attributes)
+    
+    Lets upsert_property skip the database for properties that are already
+    stored with the same attributes.
+    """
+    
+    def __init__(self, max_size: int = PROPERTY_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, address_hash: str, attrs: tuple) -> Optional[int]:
+        """Return the cached property_id if the upsert would be a no-op"""
+        entry = self._entries.get(address_hash)
+        if entry is not None:
+            property_id, known = entry
+            # The upsert COALESCEs NULL inputs, so only non-null attributes
+            # that differ from the stored ones would change the row
+            if all(v is None or v == k for v, k in zip(attrs, known)):
+                self._entries.move_to_end(address_hash)
+                self.hits += 1
+                return property_id
+        self.misses += 1
+        return None
+    
+    def put(self, address_hash: str, property_id: int, attrs: tuple):
+        """Remember a property after a successful upsert"""
+        entry = self._entries.get(address_hash)
+        if entry is not None and entry[0] == property_id:
+            attrs = tuple(k if v is None else v for v, k in zip(attrs, entry[1]))
+        self._entries[address_hash] = (property_id, attrs)
+        self._entries.move_to_end(address_hash)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def discard(self, address_hashes: List[str]):
+        """Forget entries whose writes were rolled back"""
+        for address_hash in address_hashes:
+            self._entries.pop(address_hash, None)
+    
+    def warm(self, cursor, limit: Optional[int] = None) -> int:
+        """Preload the most recently updated properties, return count loaded"""
+        cursor.execute("""
+            SELECT property_id, address_hash, property_type, bedrooms, bathrooms, square_feet
+            FROM rental_intel.properties
+            ORDER BY updated_at DESC
+            LIMIT %s
+        """, (limit or self.max_size,))
+        rows = cursor.fetchall()
+        # Oldest first so the most recent end up at the MRU end
+        for r in reversed(rows):
+            self.put(r['address_hash'], r['property_id'], self.attrs(
+                r['property_type'], r['bedrooms'], r['bathrooms'], r['square_feet']
+            ))
+        return len(rows)
+    
+    @staticmethod
+    def attrs(property_type, bedrooms, bathrooms, square_feet) -> tuple:
+        """Comparable attribute tuple (bathrooms as DECIMAL(4, 2) stores it)"""
+        if bathrooms is not None:
+            bathrooms = round(float(bathrooms), 2)
+        return (property_type, bedrooms, bathrooms, square_feet)
+
+
+class ListingCache:
+    """Persistent, bounded LRU map of (source_platform, source_listing_id)
+    -> (listing_id, last rent, content fingerprint)
+    
+    Re-observations whose fingerprint is unchanged skip the write path and
+    are only touched (last_verified_date) in bulk at the end of the run.
+    The cache is saved to disk after each successful batch. Both the
+    per-record and the stream path record the listings they write; one
+    cache may be shared by concurrent writer threads.
+    """
+    
+    def __init__(self, path: str = LISTING_CACHE_PATH, max_size: int = LISTING_CACHE_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def load(self) -> int:
+        """Load the cache from disk, return entry count"""
+        with self._lock:
+            try:
+                with open(self.path, 'rb') as f:
+                    self._entries = OrderedDict(pickle.load(f))
+            except FileNotFoundError:
+                self._entries = OrderedDict()
+            except Exception as e:
+                logger.warning(f"Discarding unreadable listing cache {self.path}: {e}")
+                self._entries = OrderedDict()
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return len(self._entries)
+    
+    def save(self):
+        """Write the cache to disk atomically"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(self._entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+    
+    def lookup(self, source: str, source_listing_id: str, fingerprint: str) -> Optional[int]:
+        """Return listing_id if the listing was seen with the same content"""
+        key = (source, source_listing_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] == fingerprint:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+    
+    def put(self, source: str, source_listing_id: str, listing_id: int,
+            rent: Optional[float], fingerprint: str):
+        """Remember a listing after it went through the full write path"""
+        key = (source, source_listing_id)
+        with self._lock:
+            self._entries[key] = (listing_id, rent, fingerprint)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def discard(self, source: str, source_listing_ids: Iterable[str]):
+        """Forget listings whose stored state the cache cannot vouch for"""
+        with self._lock:
+            for source_listing_id in source_listing_ids:
+                self._entries.pop((source, source_listing_id), None)
+    
+    def discard_listing_ids(self, listing_ids: set):
+        """Forget entries pointing at listings that no longer exist"""
+        with self._lock:
+            stale = [k for k, v in self._entries.items() if v[0] in listing_ids]
+            for key in stale:
+                del self._entries[key]
+    
+    @staticmethod
+    def fingerprint(record: Dict) -> str:
+        """Digest of everything the write path would store for a record"""
+        content = '\x1f'.join(str(record.get(k)) for k in (
+            'street_address', 'city', 'state', 'zip_code', 'property_type',
+            'bedrooms', 'bathrooms', 'square_feet', 'listing_url', 'rent'
+        ))
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
 class RentalIntelDB:
     """Database operations handler"""
     
-    def __init__(self):
+    def __init__(self, workload: str = 'default', property_cache: Optional[PropertyCache] = None):
+        self.workload = workload  # session settings profile, see db_pool.WORKLOAD_SETTINGS
+        self.property_cache = property_cache
         self.conn = None
         self.cursor = None
+        self._uow = None  # active unit-of-work state, see unit_of_work()
         
     def connect(self) -> bool:
-        """Establish database connection"""
+        """Check out a connection from the shared pool"""
         try:
-            self.conn = psycopg2.connect(
-                host=DB_HOST,
-                port=DB_PORT,
-                database=DB_NAME,
-                user=DB_USER,
-                password=DB_PASSWORD
-            )
+            self.conn = get_connection(self.workload)
             self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
             logger.info("Database connection established")
             return True
@@ -74,13 +397,167 @@ class RentalIntelDB:
             return False
     
     def close(self):
-        """Close database connection"""
+        """Return the connection to the shared pool"""
         if self.cursor:
             self.cursor.close()
+            self.cursor = None
         if self.conn:
-            self.conn.close()
+            release_connection(self.conn)
+            self.conn = None
             logger.info("Database connection closed")
     
+    @contextmanager
+    def unit_of_work(self, commit_every: int = 1000, commit_interval_ms: Optional[int] = None,
+                     before_commit: Optional[Callable[[], None]] = None):
+        """Defer commits for the write methods
+        
+        Inside the block upsert_property, upsert_listing and record_price(s)
+        stop committing on their own. The transaction is committed every
+        `commit_every` records (see record_scope) or once
+        `commit_interval_ms` has elapsed since the last commit, and on exit.
+        `before_commit` (e.g. a flush of buffered writes) runs in its own
+        savepoint right before each of those commits.
+        """
+        self._uow = {
+            'commit_every': commit_every,
+            'commit_interval': commit_interval_ms / 1000.0 if commit_interval_ms else None,
+            'before_commit': before_commit,
+            'last_commit': time.monotonic(),
+            'pending': 0,
+            'in_record': False,     # inside a savepoint scope
+            'is_record': False,     # ... that is a record (see records_rolled_back)
+            'record_failed': False,
+            'commits': 0,
+            'records_rolled_back': 0,
+            'record_keys': [],  # property cache keys written by the current record
+            'txn_keys': [],     # ... and by records not yet committed
+        }
+        try:
+            yield self._uow
+            self._commit_uow()
+        except Exception:
+            self.conn.rollback()
+            self._forget_cached(self._uow['txn_keys'] + self._uow['record_keys'])
+            raise
+        finally:
+            self._uow = None
+    
+    @contextmanager
+    def savepoint_scope(self):
+        """Isolate writes that are not a record (e.g. a buffered flush)
+        
+        Like record_scope, a failing write rolls back only this block, but
+        the block does not count towards `commit_every`. No-op outside
+        unit_of_work().
+        """
+        if self._uow is None:
+            yield
+            return
+        with self._savepoint(is_record=False):
+            yield
+    
+    @contextmanager
+    def record_scope(self):
+        """Isolate one record's writes in a savepoint
+        
+        A failing write rolls back to the savepoint, discarding only this
+        record; the rest of the unit of work is kept. No-op outside
+        unit_of_work().
+        """
+        uow = self._uow
+        if uow is None:
+            yield
+            return
+        
+        with self._savepoint(is_record=True):
+            yield
+        
+        if uow['record_failed']:
+            return
+        uow['pending'] += 1
+        uow['txn_keys'].extend(uow['record_keys'])
+        uow['record_keys'] = []
+        interval = uow['commit_interval']
+        if (uow['pending'] >= uow['commit_every'] or
+                (interval and time.monotonic() - uow['last_commit'] >= interval)):
+            self._commit_uow()
+    
+    @contextmanager
+    def _savepoint(self, is_record: bool):
+        """Run a block in the uow_record savepoint
+        
+        The savepoint is released only if the block succeeds; on failure
+        it is rolled back first, so the transaction stays usable and the
+        original exception is the one raised.
+        """
+        uow = self._uow
+        self.cursor.execute("SAVEPOINT uow_record")
+        uow['in_record'] = True
+        uow['is_record'] = is_record
+        uow['record_failed'] = False
+        uow['record_keys'] = []
+        try:
+            yield
+        except Exception:
+            try:
+                self._rollback()
+                self.cursor.execute("RELEASE SAVEPOINT uow_record")
+            finally:
+                uow['in_record'] = False
+            raise
+        uow['in_record'] = False
+        self.cursor.execute("RELEASE SAVEPOINT uow_record")
+    
+    def _commit_uow(self):
+        """Run the before_commit hook, then commit the unit of work"""
+        uow = self._uow
+        if uow['before_commit']:
+            with self._savepoint(is_record=False):
+                uow['before_commit']()
+        self.conn.commit()
+        uow['commits'] += 1
+        uow['pending'] = 0
+        uow['txn_keys'] = []
+        uow['last_commit'] = time.monotonic()
+    
+    def _commit(self):
+        """Commit now, or leave it to the active unit of work"""
+        if self._uow is None:
+            self.conn.commit()
+    
+    def _rollback(self):
+        """Roll back the current record's savepoint, or the transaction"""
+        uow = self._uow
+        if uow is None:
+            self.conn.rollback()
+        elif uow['in_record']:
+            if not uow['record_failed']:
+                uow['record_failed'] = True
+                if uow['is_record']:
+                    uow['records_rolled_back'] += 1
+            self.cursor.execute("ROLLBACK TO SAVEPOINT uow_record")
+            self._forget_cached(uow['record_keys'])
+            uow['record_keys'] = []
+        else:
+            logger.warning(f"Rolling back unit of work with {uow['pending']} pending records")
+            self.conn.rollback()
+            self._forget_cached(uow['txn_keys'] + uow['record_keys'])
+            uow['pending'] = 0
+            uow['txn_keys'] = []
+            uow['record_keys'] = []
+    
+    def _remember_cached(self, address_hash: str, property_id: int, attrs: tuple):
+        """Cache an upserted property, tracking it until its write commits"""
+        self.property_cache.put(address_hash, property_id, attrs)
+        uow = self._uow
+        if uow is not None:
+            uow['record_keys' if uow['in_record'] else 'txn_keys'].append(address_hash)
+    
+    def _forget_cached(self, address_hashes: List[str]):
+        """Drop cache entries whose writes were rolled back"""
+        if self.property_cache is not None and address_hashes:
+            self.property_cache.discard(address_hashes)
+    
     def upsert_property(self, prop: PropertyData) -> Optional[int]:
         """Insert or update property, return property_id"""
         try:
@@ -90,130 +567,391 @@ class RentalIntelDB:
             )
             address_hash = hashlib.sha256(normalized.encode()).hexdigest()
             
+            # Known property with nothing new to write: skip the round trip
+            attrs = None
+            if self.property_cache is not None:
+                attrs = PropertyCache.attrs(
+                    prop.property_type, prop.bedrooms, prop.bathrooms, prop.square_feet
+                )
+                property_id = self.property_cache.get(address_hash, attrs)
+                if property_id is not None:
+                    return property_id
+            
             # Insert property
-            self.cursor.execute("""
-                INSERT INTO rental_intel.properties (
-                    street_address, city, state, zip,
-                    normalized_full_address, address_hash,
-                    property_type, bedrooms, bathrooms, square_feet
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (address_hash) DO UPDATE SET
-                    property_type = COALESCE(EXCLUDED.property_type, rental_intel.properties.property_type),
-                    bedrooms = COALESCE(EXCLUDED.bedrooms, rental_intel.properties.bedrooms),
-                    bathrooms = COALESCE(EXCLUDED.bathrooms, rental_intel.properties.bathrooms),
-                    square_feet = COALESCE(EXCLUDED.square_feet, rental_intel.properties.square_feet),
-                    updated_at = CURRENT_TIMESTAMP
-                RETURNING property_id
-            """, (
+            UPSERT_PROPERTY.execute(self.cursor, (
                 prop.street_address, prop.city, prop.state, prop.zip_code,
                 normalized, address_hash,
                 prop.property_type, prop.bedrooms, prop.bathrooms, prop.square_feet
             ))
             
             result = self.cursor.fetchone()
-            self.conn.commit()
+            self._commit()
+            if result and attrs is not None:
+                self._remember_cached(address_hash, result['property_id'], attrs)
             return result['property_id'] if result else None
             
         except Exception as e:
             logger.error(f"Failed to upsert property: {e}")
-            self.conn.rollback()
+            self._rollback()
             return None
     
     def upsert_listing(self, property_id: int, listing: ListingData) -> Optional[int]:
         """Insert or update listing, return listing_id"""
         try:
-            self.cursor.execute("""
-                INSERT INTO rental_intel.listings (
-                    property_id, source_platform, source_listing_id,
-                    listing_url, listing_status, last_verified_date
-                ) VALUES (%s, %s, %s, %s, 'active', CURRENT_TIMESTAMP)
-                ON CONFLICT (source_platform, source_listing_id) DO UPDATE SET
-                    property_id = EXCLUDED.property_id,
-                    listing_status = 'active',
-                    last_verified_date = CURRENT_TIMESTAMP
-                RETURNING listing_id
-            """, (property_id, listing.source_platform, listing.source_listing_id, listing.listing_url))
+            UPSERT_LISTING.execute(self.cursor, (
+                property_id, listing.source_platform, listing.source_listing_id, listing.listing_url
+            ))
             
             result = self.cursor.fetchone()
-            self.conn.commit()
+            self._commit()
             return result['listing_id'] if result else None
             
         except Exception as e:
             logger.error(f"Failed to upsert listing: {e}")
-            self.conn.rollback()
+            self._rollback()
             return None
     
     def record_price(self, listing_id: int, rent: float) -> bool:
         """Record price change if different from last"""
+        counts = self.record_prices([(listing_id, rent)]) or {}
+        return any(counts.get(t) for t in ('new', 'increase', 'decrease'))
+    
+    def record_prices(self, observations: List[Tuple[int, float]]) -> Optional[Dict[str, int]]:
+        """Record a batch of (listing_id, rent) observations
+        
+        Classifies every observation against the listing's last price and
+        computes rent_per_sqft in one joined query, then appends only the
+        changed rows. Repeated listing_ids keep the last observation.
+        Returns counts per change type ({} when nothing matched a listing),
+        or None on a database error.
+        """
+        latest = dict(observations)
+        if not latest:
+            return {}
+        
         try:
-            # Get last price
-            self.cursor.execute("""
-                SELECT observed_rent FROM rental_intel.rent_price_history
-                WHERE listing_id = %s
-                ORDER BY observed_date DESC
-                LIMIT 1
-            """, (listing_id,))
+            RECORD_PRICES.execute(self.cursor, (list(latest.keys()), list(latest.values())))
+            rows = self.cursor.fetchall()
             
-            last_price = self.cursor.fetchone()
+            self._commit()
+            return {r['change_type']: r['n'] for r in rows}
             
-            # Determine change type
-            if last_price is None:
-                change_type = 'new'
-            elif rent > last_price['observed_rent']:
-                change_type = 'increase'
-            elif rent < last_price['observed_rent']:
-                change_type = 'decrease'
-            else:
-                return False  # No change
-            
-            # Get property_id
-            self.cursor.execute(
-                "SELECT property_id FROM rental_intel.listings WHERE listing_id = %s",
-                (listing_id,)
+        except Exception as e:
+            logger.error(f"Failed to record prices: {e}")
+            self._rollback()
+            return None
+    
+    def bulk_ingest(self, source: str, records: List[Dict]) -> Dict:
+        """Set-based ingest: COPY records into staging, then resolve
+        properties, listings and price history with a few statements.
+
+        Records may carry an ``observed_date`` (historical imports); it
+        defaults to today. Monthly partitions missing for the batch's date
+        range are created first.
+        
+        Runs in a single transaction; the caller commits or rolls back.
+        Returns counts, per-record (error_type, message) validation errors
+        and the listing_id of every written source_listing_id.
+        """
+        result = {'inserted': 0, 'price_changes': 0, 'errors': [], 'partitions_created': [],
+                  'listing_ids': {}}
+        
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        staged = 0
+        today = date.today()
+        first_date = last_date = today
+        for seq, record in enumerate(records):
+            try:
+                row = self._staging_row(seq, record)
+            except (KeyError, ValueError, TypeError) as e:
+                result['errors'].append((type(e).__name__, f"record {seq}: {e!r}"))
+                continue
+            writer.writerow(row)
+            staged += 1
+            observed = row[-1] or today
+            first_date = min(first_date, observed)
+            last_date = max(last_date, observed)
+        
+        if not staged:
+            return result
+        
+        self.cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS ingest_staging (
+                seq INTEGER,
+                street_address TEXT,
+                city TEXT,
+                state TEXT,
+                zip_code TEXT,
+                normalized TEXT,
+                address_hash TEXT,
+                property_type TEXT,
+                bedrooms INTEGER,
+                bathrooms DECIMAL(4, 2),
+                square_feet INTEGER,
+                source_listing_id TEXT,
+                listing_url TEXT,
+                rent DECIMAL(10, 2),
+                observed_date DATE,
+                property_id BIGINT,
+                listing_id BIGINT
+            ) ON COMMIT DELETE ROWS
+        """)
+        self.cursor.execute("TRUNCATE ingest_staging")
+        
+        buf.seek(0)
+        self.cursor.copy_expert(
+            f"COPY ingest_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buf
+        )
+        
+        # One catalog check per batch instead of per-row partition misses
+        self.cursor.execute(
+            "SELECT month_created FROM rental_intel.ensure_partitions(%s, %s)",
+            (first_date, last_date)
+        )
+        result['partitions_created'] = [r['month_created'] for r in self.cursor.fetchall()]
+        for created in result['partitions_created']:
+            logger.info(created)
+        
+        # Properties: one upsert per distinct address, last record wins
+        self.cursor.execute("""
+            WITH upserted AS (
+                INSERT INTO rental_intel.properties (
+                    street_address, city, state, zip,
+                    normalized_full_address, address_hash,
+                    property_type, bedrooms, bathrooms, square_feet
+                )
+                SELECT DISTINCT ON (address_hash)
+                    street_address, city, state, zip_code,
+                    normalized, address_hash,
+                    property_type, bedrooms, bathrooms, square_feet
+                FROM ingest_staging
+                ORDER BY address_hash, seq DESC
+                ON CONFLICT (address_hash) DO UPDATE SET
+                    property_type = COALESCE(EXCLUDED.property_type, rental_intel.properties.property_type),
+                    bedrooms = COALESCE(EXCLUDED.bedrooms, rental_intel.properties.bedrooms),
+                    bathrooms = COALESCE(EXCLUDED.bathrooms, rental_intel.properties.bathrooms),
+                    square_feet = COALESCE(EXCLUDED.square_feet, rental_intel.properties.square_feet),
+                    updated_at = CURRENT_TIMESTAMP
+                RETURNING property_id, address_hash
             )
-            prop_result = self.cursor.fetchone()
-            property_id = prop_result['property_id']
-            
-            # Calculate rent per sqft
-            rent_per_sqft = None
-            if property_id:
-                self.cursor.execute(
-                    "SELECT square_feet FROM rental_intel.properties WHERE property_id = %s",
-                    (property_id,)
+            UPDATE ingest_staging s
+            SET property_id = u.property_id
+            FROM upserted u
+            WHERE s.address_hash = u.address_hash
+        """)
+        
+        # Listings: one upsert per distinct source listing, last record wins
+        self.cursor.execute("""
+            WITH upserted AS (
+                INSERT INTO rental_intel.listings (
+                    property_id, source_platform, source_listing_id,
+                    listing_url, listing_status, last_verified_date
                 )
-                prop_data = self.cursor.fetchone()
-                if prop_data and prop_data['square_feet']:
-                    rent_per_sqft = round(rent / prop_data['square_feet'], 4)
+                SELECT DISTINCT ON (source_listing_id)
+                    property_id, %s, source_listing_id,
+                    listing_url, 'active', CURRENT_TIMESTAMP
+                FROM ingest_staging
+                WHERE property_id IS NOT NULL
+                ORDER BY source_listing_id, seq DESC
+                ON CONFLICT (source_platform, source_listing_id) DO UPDATE SET
+                    property_id = EXCLUDED.property_id,
+                    listing_status = 'active',
+                    last_verified_date = CURRENT_TIMESTAMP
+                RETURNING listing_id, source_listing_id
+            )
+            UPDATE ingest_staging s
+            SET listing_id = u.listing_id
+            FROM upserted u
+            WHERE s.source_listing_id = u.source_listing_id
+        """, (source,))
+        result['inserted'] = self.cursor.rowcount
+        
+        # Price history: the latest staged rent per listing and day, each
+        # classified against the listing's previous price as of that day:
+        # the later of its previous staged day and its latest recorded price
+        # on or before the day. listing_current_rent answers that unless it
+        # is newer than the row (backdated imports) or missing (not
+        # backfilled yet); then the history is searched. Append only real
+        # changes.
+        self.cursor.execute("""
+            INSERT INTO rental_intel.rent_price_history (
+                listing_id, property_id, observed_rent, rent_per_sqft,
+                change_type, observed_date, zip
+            )
+            SELECT
+                c.listing_id, c.property_id, c.rent,
+                ROUND(c.rent / NULLIF(p.square_feet, 0), 4),
+                c.change_type, c.observed_date, p.zip
+            FROM (
+                SELECT
+                    d.listing_id, d.property_id, d.rent, d.observed_date,
+                    CASE
+                        WHEN prev.rent IS NULL THEN 'new'
+                        WHEN d.rent > prev.rent THEN 'increase'
+                        WHEN d.rent < prev.rent THEN 'decrease'
+                        ELSE 'unchanged'
+                    END AS change_type
+                FROM (
+                    SELECT
+                        s.listing_id, s.property_id, s.rent, s.observed_date,
+                        LAG(s.rent) OVER w AS staged_rent,
+                        LAG(s.observed_date) OVER w AS staged_date,
+                        CASE WHEN cur.observed_date <= s.observed_date
+                            THEN cur.observed_rent ELSE hist.observed_rent END AS recorded_rent,
+                        CASE WHEN cur.observed_date <= s.observed_date
+                            THEN cur.observed_date ELSE hist.observed_date END AS recorded_date
+                    FROM (
+                        SELECT DISTINCT ON (listing_id, observed_date)
+                            listing_id, property_id, rent, observed_date
+                        FROM (
+                            SELECT seq, listing_id, property_id, rent,
+                                   COALESCE(observed_date, CURRENT_DATE) AS observed_date
+                            FROM ingest_staging
+                            WHERE listing_id IS NOT NULL AND rent IS NOT NULL
+                        ) staged
+                        ORDER BY listing_id, observed_date, seq DESC
+                    ) s
+                    LEFT JOIN rental_intel.listing_current_rent cur ON cur.listing_id = s.listing_id
+                    LEFT JOIN LATERAL (
+                        SELECT h.observed_rent, h.observed_date
+                        FROM rental_intel.rent_price_history h
+                        WHERE (cur.listing_id IS NULL OR cur.observed_date > s.observed_date)
+                        AND h.listing_id = s.listing_id
+                        AND h.observed_date <= s.observed_date
+                        ORDER BY h.observed_date DESC, h.price_history_id DESC
+                        LIMIT 1
+                    ) hist ON true
+                    WINDOW w AS (PARTITION BY s.listing_id ORDER BY s.observed_date)
+                ) d
+                CROSS JOIN LATERAL (
+                    SELECT CASE
+                        WHEN d.staged_date >= d.recorded_date OR d.recorded_date IS NULL
+                            THEN d.staged_rent
+                        ELSE d.recorded_rent
+                    END AS rent
+                ) prev
+            ) c
+            JOIN rental_intel.properties p ON p.property_id = c.property_id
+            WHERE c.change_type <> 'unchanged'
+        """)
+        result['price_changes'] = self.cursor.rowcount
+        
+        self.cursor.execute("""
+            INSERT INTO rental_intel.dirty_zips (zip)
+            SELECT DISTINCT zip_code FROM ingest_staging
+            WHERE listing_id IS NOT NULL
+            ON CONFLICT (zip) DO NOTHING
+        """)
+        
+        self.cursor.execute("""
+            SELECT DISTINCT source_listing_id, listing_id FROM ingest_staging
+            WHERE listing_id IS NOT NULL
+        """)
+        result['listing_ids'] = {r['source_listing_id']: r['listing_id'] for r in self.cursor.fetchall()}
+        
+        return result
+    
+    def _staging_row(self, seq: int, record: Dict) -> tuple:
+        """Validate a raw record and convert it to a staging COPY row
+        
+        Every column the COPY or the target tables constrain is checked
+        here, so a bad record raises ValueError on its own instead of
+        aborting the whole batch.
+        """
+        text = {field: _required_text(record, field) for field in REQUIRED_FIELDS}
+        listing_url = _optional(_text, record.get('listing_url'))
+        
+        property_type = record.get('property_type')
+        if property_type is not None and property_type not in PROPERTY_TYPES:
+            raise ValueError(f"invalid property_type {property_type!r}")
+        
+        bedrooms = _optional(_as_int, record.get('bedrooms'))
+        square_feet = _optional(_as_int, record.get('square_feet'))
+        bathrooms = _optional(_as_number, record.get('bathrooms'))
+        if bathrooms is not None and abs(round(bathrooms, 2)) >= BATHROOMS_LIMIT:
+            raise ValueError(f"bathrooms out of range: {bathrooms!r}")
+        
+        rent = _optional(_as_number, record.get('rent')) or None
+        if rent is not None:
+            if rent < 0 or round(rent, 2) >= RENT_LIMIT:
+                raise ValueError(f"rent out of range: {rent!r}")
+            if square_feet and abs(round(rent / square_feet, 4)) >= RENT_PER_SQFT_LIMIT:
+                raise ValueError(f"rent per sqft out of range: {rent!r} / {square_feet!r}")
+        
+        normalized = self._normalize_address(
+            text['street_address'], text['city'], text['state'], text['zip_code']
+        )
+        address_hash = hashlib.sha256(normalized.encode()).hexdigest()
+        
+        return (
+            seq, text['street_address'], text['city'], text['state'], text['zip_code'],
+            normalized, address_hash, property_type, bedrooms,
+            bathrooms, square_feet, text['source_listing_id'], listing_url,
+            rent, _optional(_as_date, record.get('observed_date'))
+        )
+    
+    def touch_listings(self, listing_ids: List[int]) -> set:
+        """Bulk-refresh last_verified_date for re-observed listings
+        
+        Returns the ids that no longer exist in the database.
+        """
+        missing = set()
+        try:
+            for i in range(0, len(listing_ids), TOUCH_BATCH_SIZE):
+                chunk = listing_ids[i:i + TOUCH_BATCH_SIZE]
+                TOUCH_LISTINGS.execute(self.cursor, (chunk,))
+                found = {r['listing_id'] for r in self.cursor.fetchall()}
+                missing.update(set(chunk) - found)
+            self._commit()
             
-            # Insert price record
+        except Exception as e:
+            logger.error(f"Failed to touch listings: {e}")
+            self._rollback()
+        
+        return missing
+    
+    def mark_zips_dirty(self, zip_codes: Iterable[str]):
+        """Record ZIPs whose metrics need recomputing"""
+        zip_codes = list(zip_codes)
+        if not zip_codes:
+            return
+        try:
             self.cursor.execute("""
-                INSERT INTO rental_intel.rent_price_history (
-                    listing_id, property_id, observed_rent, rent_per_sqft,
-                    change_type, observed_date
-                ) VALUES (%s, %s, %s, %s, %s, CURRENT_DATE)
-            """, (listing_id, property_id, rent, rent_per_sqft, change_type))
-            
-            self.conn.commit()
-            return True
+                INSERT INTO rental_intel.dirty_zips (zip)
+                SELECT DISTINCT unnest(%s::TEXT[])
+                ON CONFLICT (zip) DO NOTHING
+            """, (zip_codes,))
+            self._commit()
             
         except Exception as e:
-            logger.error(f"Failed to record price: {e}")
-            self.conn.rollback()
-            return False
+            logger.error(f"Failed to mark dirty ZIPs: {e}")
+            self._rollback()
     
     def mark_stale_listings(self, days: int = 30) -> int:
-        """Mark listings inactive after N days"""
+        """Mark listings inactive after N days, flagging their ZIPs dirty"""
         try:
             self.cursor.execute("""
-                UPDATE rental_intel.listings
-                SET listing_status = 'inactive',
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE listing_status = 'active'
-                AND last_verified_date < CURRENT_DATE - INTERVAL '%s days'
-                RETURNING listing_id
+                WITH stale AS (
+                    UPDATE rental_intel.listings
+                    SET listing_status = 'inactive',
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE listing_status = 'active'
+                    AND last_verified_date < CURRENT_DATE - INTERVAL '%s days'
+                    RETURNING property_id
+                ),
+                marked AS (
+                    INSERT INTO rental_intel.dirty_zips (zip)
+                    SELECT DISTINCT p.zip
+                    FROM stale s
+                    JOIN rental_intel.properties p ON p.property_id = s.property_id
+                    ON CONFLICT (zip) DO NOTHING
+                )
+                SELECT COUNT(*) AS stale_count FROM stale
             """, (days,))
             
-            stale_count = self.cursor.rowcount
+            stale_count = self.cursor.fetchone()['stale_count']
             self.conn.commit()
             logger.info(f"Marked {stale_count} listings as inactive")
             return stale_count
@@ -239,6 +977,127 @@ class RentalIntelDB:
             self.conn.rollback()
             return False
     
+    def calculate_all_zip_metrics(self, metric_date: date = None,
+                                  zip_codes: Optional[List[str]] = None) -> Dict:
+        """Calculate daily metrics for every ZIP (or just zip_codes) in one pass
+        
+        Returns {'zips': rows written, 'seconds': elapsed}; zips is -1 on failure.
+        """
+        if metric_date is None:
+            metric_date = date.today()
+        
+        start = time.monotonic()
+        try:
+            self.cursor.execute("SELECT rental_intel.calculate_all_zip_metrics(%s, %s) AS zips",
+                              (metric_date, zip_codes))
+            zips = self.cursor.fetchone()['zips']
+            self.conn.commit()
+            
+        except Exception as e:
+            logger.error(f"Failed to calculate ZIP metrics: {e}")
+            self.conn.rollback()
+            zips = -1
+        
+        elapsed = time.monotonic() - start
+        logger.info(f"ZIP metrics for {metric_date}: {zips} ZIPs in {elapsed:.1f}s")
+        return {'zips': zips, 'seconds': elapsed}
+    
+    def refresh_zip_metrics(self, metric_date: date = None, full: bool = False) -> Dict:
+        """Recompute metrics for dirty ZIPs only, carrying the rest forward
+        
+        Rebuilds every ZIP when full=True or the previous day has no rows.
+        Returns {'recomputed', 'carried_forward', 'seconds'}; recomputed is
+        -1 on failure.
+        """
+        if metric_date is None:
+            metric_date = date.today()
+        
+        start = time.monotonic()
+        try:
+            self.cursor.execute(
+                "SELECT * FROM rental_intel.calculate_dirty_zip_metrics(%s, %s)",
+                (metric_date, full)
+            )
+            result = dict(self.cursor.fetchone())
+            self.conn.commit()
+            
+        except Exception as e:
+            logger.error(f"Failed to refresh ZIP metrics: {e}")
+            self.conn.rollback()
+            result = {'recomputed': -1, 'carried_forward': 0}
+        
+        result['seconds'] = time.monotonic() - start
+        logger.info(f"ZIP metrics for {metric_date}: {result['recomputed']} recomputed, "
+                    f"{result['carried_forward']} carried forward in {result['seconds']:.1f}s")
+        return result
+    
+    def rent_quantiles(self, metric_date: date = None, grain: Optional[str] = None) -> List[Dict]:
+        """p10/p50/p90 rent per ZIP, city, state and nationally, merged from ZIP sketches
+        
+        grain limits the rows to 'zip', 'city', 'state' or 'national'.
+        """
+        try:
+            self.cursor.execute("""
+                SELECT * FROM rental_intel.merged_rent_quantiles(%s)
+                WHERE %s IS NULL OR grain = %s
+            """, (metric_date or date.today(), grain, grain))
+            return [dict(r) for r in self.cursor.fetchall()]
+            
+        except Exception as e:
+            logger.error(f"Failed to read rent quantiles: {e}")
+            self.conn.rollback()
+            return []
+    
+    def refresh_geo_rollup(self, metric_date: date = None) -> Dict:
+        """Rebuild city/state/national rollups for a date from ZIP-level tables
+        
+        Run after refresh_zip_metrics (it merges that day's ZIP sketches).
+        Returns {'rows', 'seconds'}.
+        """
+        metric_date = metric_date or date.today()
+        start = time.monotonic()
+        try:
+            self.cursor.execute(
+                "SELECT rental_intel.refresh_geo_market_rollup(%s) AS n",
+                (metric_date,)
+            )
+            rows = self.cursor.fetchone()['n']
+            self.conn.commit()
+            
+        except Exception as e:
+            logger.error(f"Failed to refresh geo rollup for {metric_date}: {e}")
+            self.conn.rollback()
+            rows = 0
+        
+        return {'rows': rows, 'seconds': time.monotonic() - start}
+    
+    def refresh_market_snapshot(self) -> Dict:
+        """Refresh mv_market_snapshot without blocking readers
+        
+        The refresh time is recorded in materialized_view_refresh.
+        Returns {'rows', 'seconds'}; rows is 0 on failure.
+        """
+        start = time.monotonic()
+        try:
+            self.cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY rental_intel.mv_market_snapshot")
+            self.cursor.execute("SELECT COUNT(*) AS n FROM rental_intel.mv_market_snapshot")
+            rows = self.cursor.fetchone()['n']
+            self.cursor.execute("""
+                INSERT INTO rental_intel.materialized_view_refresh (view_name, refreshed_at, row_count)
+                VALUES ('mv_market_snapshot', CURRENT_TIMESTAMP, %s)
+                ON CONFLICT (view_name) DO UPDATE SET
+                    refreshed_at = EXCLUDED.refreshed_at,
+                    row_count = EXCLUDED.row_count
+            """, (rows,))
+            self.conn.commit()
+            
+        except Exception as e:
+            logger.error(f"Failed to refresh market snapshot: {e}")
+            self.conn.rollback()
+            rows = 0
+        
+        return {'rows': rows, 'seconds': time.monotonic() - start}
+    
     def get_all_zips(self) -> List[str]:
         """Get all unique ZIP codes"""
         try:
@@ -250,6 +1109,38 @@ class RentalIntelDB:
             logger.error(f"Failed to get ZIP codes: {e}")
             return []
     
+    def ensure_partitions(self, start_date: date, end_date: date = None) -> List[str]:
+        """Create any missing monthly partitions between two dates
+        
+        Returns the partitions created; call before backdated inserts.
+        """
+        try:
+            self.cursor.execute(
+                "SELECT month_created FROM rental_intel.ensure_partitions(%s, %s)",
+                (start_date, end_date or date.today())
+            )
+            results = self.cursor.fetchall()
+            self.conn.commit()
+            return [r['month_created'] for r in results]
+            
+        except Exception as e:
+            logger.error(f"Failed to ensure partitions: {e}")
+            self.conn.rollback()
+            return []
+    
+    def drain_default_partition(self) -> List[str]:
+        """Give each month held in the DEFAULT partition its own partition"""
+        try:
+            self.cursor.execute("SELECT * FROM rental_intel.drain_default_partition()")
+            results = self.cursor.fetchall()
+            self.conn.commit()
+            return [r['month_created'] for r in results]
+            
+        except Exception as e:
+            logger.error(f"Failed to drain default partition: {e}")
+            self.conn.rollback()
+            return []
+    
     def auto_create_partitions(self) -> List[str]:
         """Create partitions for next 3 months"""
         try:
@@ -298,7 +1189,7 @@ class RentalIntelDB:
                 stats.get('inserted', 0),
                 stats.get('updated', 0),
                 stats.get('price_changes', 0),
-                json.dumps(stats.get('errors', [])),
+                json.dumps(self._error_summary(stats)),
                 stats.get('status', 'completed'),
                 log_id
             ))
@@ -309,6 +1200,17 @@ class RentalIntelDB:
             logger.error(f"Failed to end ingestion log: {e}")
             self.conn.rollback()
     
+    @staticmethod
+    def _error_summary(stats: Dict):
+        """Errors as stored in ingestion_log: bounded samples plus counts"""
+        if 'error_counts' not in stats:
+            return stats.get('errors', [])
+        return {
+            'total': stats.get('error_total', 0),
+            'counts': stats['error_counts'],
+            'samples': stats.get('errors', []),
+        }
+    
     @staticmethod
     def _normalize_address(street: str, city: str, state: str, zip_code: str) -> str:
         """Normalize address for consistent hashing"""
@@ -319,78 +1221,442 @@ class RentalIntelDB:
 class DataIngestionEngine:
     """Engine for ingesting rental data from various sources"""
     
-    def __init__(self, db: RentalIntelDB):
+    def __init__(self, db: RentalIntelDB, commit_every: Optional[int] = None,
+                 commit_interval_ms: Optional[int] = None,
+                 listing_cache: Optional[ListingCache] = None):
         self.db = db
+        self.commit_every = commit_every
+        self.commit_interval_ms = commit_interval_ms
+        self.listing_cache = listing_cache
+        self._touched = []           # cached listing_ids to touch at end of run
+        self._pending_listings = []  # cache entries awaiting their price flush
+        self.error_tracker = ErrorTracker()
         self.stats = {
             'scanned': 0,
             'inserted': 0,
             'updated': 0,
             'price_changes': 0,
-            'errors': [],
+            'errors': self.error_tracker.samples,
+            'error_counts': self.error_tracker.counts,
+            'error_total': 0,
             'status': 'running'
         }
     
-    def ingest_batch(self, source: str, records: List[Dict]) -> Dict:
-        """Ingest a batch of records"""
+    def _record_error(self, error_type: str, message: str):
+        """Track an error without letting the stats grow unbounded"""
+        self.error_tracker.add(error_type, message)
+        self.stats['error_total'] = self.error_tracker.total
+    
+    def ingest_batch(self, source: str, records: Iterable[Dict], bulk: bool = False) -> Dict:
+        """Ingest a batch of records
+        
+        With bulk=True the records are streamed through ingest_stream(),
+        staged with COPY and resolved with set-based statements instead of
+        per-record upserts.
+        """
+        if bulk:
+            return self.ingest_stream(source, records)
+        
         log_id = self.db.log_ingestion_start(source)
+        observations = []
+        self._touched = []
+        self._pending_listings = []
+        self._dirty_zips = set()
+        listing_hits = self.listing_cache.hits if self.listing_cache is not None else 0
+        cache = self.db.property_cache
+        cache_start = (cache.hits, cache.misses) if cache is not None else None
+        
+        # Buffered prices are flushed before every unit-of-work commit so
+        # they land with their listings; without a unit of work each
+        # record's price is written (and committed) immediately
+        if self.commit_every or self.commit_interval_ms:
+            uow = self.db.unit_of_work(
+                self.commit_every or float('inf'), self.commit_interval_ms,
+                before_commit=lambda: self._flush_prices(observations)
+            )
+        else:
+            uow = nullcontext()
         
         try:
-            for record in records:
-                self.stats['scanned'] += 1
-                
-                try:
-                    # Create property
-                    prop = PropertyData(
-                        street_address=record['street_address'],
-                        city=record['city'],
-                        state=record['state'],
-                        zip_code=record['zip_code'],
-                        property_type=record.get('property_type'),
-                        bedrooms=record.get('bedrooms'),
-                        bathrooms=record.get('bathrooms'),
-                        square_feet=record.get('square_feet')
-                    )
+            with uow as uow_state:
+                for record in records:
+                    self.stats['scanned'] += 1
                     
-                    property_id = self.db.upsert_property(prop)
-                    if not property_id:
-                        continue
+                    try:
+                        with self.db.record_scope():
+                            self._ingest_record(source, record, observations)
+                            
+                    except Exception as e:
+                        self._record_error(type(e).__name__, str(e))
+                        logger.error(f"Failed to process record: {e}")
                     
-                    # Create listing
-                    listing = ListingData(
-                        source_platform=source,
-                        source_listing_id=record['source_listing_id'],
-                        listing_url=record.get('listing_url'),
-                        rent=record.get('rent')
-                    )
-                    
-                    listing_id = self.db.upsert_listing(property_id, listing)
-                    if listing_id:
-                        if listing.rent:
-                            price_recorded = self.db.record_price(listing_id, listing.rent)
-                            if price_recorded:
-                                self.stats['price_changes'] += 1
-                        
-                        self.stats['inserted'] += 1
-                        
-                except Exception as e:
-                    self.stats['errors'].append(str(e))
-                    logger.error(f"Failed to process record: {e}")
+                    if uow_state is None or len(observations) >= PRICE_BATCH_SIZE:
+                        with self.db.savepoint_scope():
+                            self._flush_prices(observations)
+                
+                with self.db.savepoint_scope():
+                    self._flush_prices(observations)
+                
+                if self._touched:
+                    with self.db.record_scope():
+                        self._touch_unchanged()
+                
+                with self.db.record_scope():
+                    self.db.mark_zips_dirty(self._dirty_zips)
             
+            if cache_start:
+                self.stats['property_cache_hits'] = cache.hits - cache_start[0]
+                self.stats['property_cache_misses'] = cache.misses - cache_start[1]
+            if uow_state:
+                self.stats['commits'] = uow_state['commits']
+                self.stats['records_rolled_back'] = uow_state['records_rolled_back']
+            if self.listing_cache is not None:
+                self.stats['listing_cache_hits'] = self.listing_cache.hits - listing_hits
+                self.listing_cache.save()
+            self.stats['statements'] = statement_stats()
             self.stats['status'] = 'completed'
             
         except Exception as e:
             self.stats['status'] = 'failed'
-            self.stats['errors'].append(str(e))
+            self._record_error('batch_failed', str(e))
             logger.error(f"Batch ingestion failed: {e}")
+            # Entries added during a failed run may describe rolled-back rows
+            if self.listing_cache is not None:
+                self.listing_cache.load()
+        
+        finally:
+            self.db.log_ingestion_end(log_id, self.stats)
+        
+        return self.stats
+    
+    def _ingest_record(self, source: str, record: Dict, observations: List[Tuple[int, float]]):
+        """Upsert one record's property and listing, buffering its price"""
+        # Unchanged re-observation: only touch it at the end of the run
+        fingerprint = None
+        if self.listing_cache is not None:
+            fingerprint = ListingCache.fingerprint(record)
+            listing_id = self.listing_cache.lookup(
+                source, record['source_listing_id'], fingerprint
+            )
+            if listing_id is not None:
+                self._touched.append(listing_id)
+                self.stats['inserted'] += 1
+                return
+        
+        # Create property
+        prop = PropertyData(
+            street_address=record['street_address'],
+            city=record['city'],
+            state=record['state'],
+            zip_code=record['zip_code'],
+            property_type=record.get('property_type'),
+            bedrooms=record.get('bedrooms'),
+            bathrooms=record.get('bathrooms'),
+            square_feet=record.get('square_feet')
+        )
+        
+        property_id = self.db.upsert_property(prop)
+        if not property_id:
+            self._record_error(
+                'property_upsert_failed', f"{record['source_listing_id']}: property not upserted"
+            )
+            return
+        
+        # Create listing
+        listing = ListingData(
+            source_platform=source,
+            source_listing_id=record['source_listing_id'],
+            listing_url=record.get('listing_url'),
+            rent=record.get('rent')
+        )
+        
+        listing_id = self.db.upsert_listing(property_id, listing)
+        if not listing_id:
+            self._record_error(
+                'listing_upsert_failed', f"{record['source_listing_id']}: listing not upserted"
+            )
+            return
+        
+        self._dirty_zips.add(prop.zip_code)
+        if fingerprint:
+            self._pending_listings.append(
+                (source, listing.source_listing_id, listing_id, listing.rent, fingerprint)
+            )
+        if listing.rent:
+            observations.append((listing_id, listing.rent))
+        
+        self.stats['inserted'] += 1
+    
+    def _flush_prices(self, observations: List[Tuple[int, float]]):
+        """Record buffered price observations in one batch
+        
+        Listings are added to the listing cache only once their price is
+        recorded, so a failed flush cannot hide a price change next run.
+        A failed flush is counted as a price_flush_failed error.
+        """
+        recorded = True
+        if observations:
+            counts = self.db.record_prices(observations)
+            recorded = counts is not None
+            if not recorded:
+                self._record_error(
+                    'price_flush_failed', f"{len(observations)} price observations not recorded"
+                )
+            else:
+                self.stats['price_changes'] += sum(
+                    counts.get(t, 0) for t in ('new', 'increase', 'decrease')
+                )
+            observations.clear()
+        
+        if recorded and self.listing_cache is not None:
+            for entry in self._pending_listings:
+                self.listing_cache.put(*entry)
+        self._pending_listings = []
+    
+    def _touch_unchanged(self):
+        """Refresh last_verified_date for every cached, unchanged listing"""
+        missing = self.db.touch_listings(self._touched)
+        if missing:
+            logger.warning(f"{len(missing)} cached listings no longer exist; evicting")
+            self.listing_cache.discard_listing_ids(missing)
+        self.stats['listings_touched'] = len(self._touched) - len(missing)
+        self._touched = []
+    
+    def ingest_stream(self, source: str, records: Iterable, chunk_size: int = STREAM_CHUNK_SIZE,
+                      parser: Optional[Callable] = None) -> Dict:
+        """Ingest any iterable of records with bounded memory
+        
+        Records flow through parse -> validate -> normalize -> dedupe ->
+        skip unchanged as generators and are written in fixed-size chunks
+        through the COPY + set-based bulk path, one commit per chunk. With a
+        listing cache, unchanged current observations are only touched at
+        the end. Memory stays flat whatever the input size; errors are kept
+        as bounded samples with per-type counts.
+        """
+        log_id = self.db.log_ingestion_start(source)
+        self.stats['chunks'] = 0
+        self.stats['duplicates'] = 0
+        self.stats['partitions_created'] = []
+        self._touched = []
+        listing_hits = self.listing_cache.hits if self.listing_cache is not None else 0
+        
+        try:
+            stream = self._skip_unchanged(source, self._dedupe(
+                self._normalize(self._validate(self._parse(records, parser)))
+            ))
+            for chunk in self._chunked(stream, chunk_size):
+                self._write_chunk(source, chunk)
+            if self._touched:
+                self._touch_unchanged()
+            
+            self.stats['status'] = 'completed'
+            
+        except Exception as e:
+            self.stats['status'] = 'failed'
+            self._record_error('stream_failed', str(e))
+            logger.error(f"Stream ingestion failed: {e}")
         
         finally:
             self.db.log_ingestion_end(log_id, self.stats)
         
+        # Committed chunks recorded their listings' entries
+        if self.listing_cache is not None:
+            self.stats['listing_cache_hits'] = self.listing_cache.hits - listing_hits
+            self.listing_cache.save()
+        
         return self.stats
+    
+    def _parse(self, records: Iterable, parser: Optional[Callable]) -> Iterator[Dict]:
+        """Stage 1: turn raw input (dicts, JSON lines, custom) into dicts"""
+        for raw in records:
+            self.stats['scanned'] += 1
+            try:
+                if parser is not None:
+                    record = parser(raw)
+                elif isinstance(raw, (str, bytes)):
+                    record = json.loads(raw)
+                else:
+                    record = raw
+                if not isinstance(record, dict):
+                    raise TypeError(f"expected a mapping, got {type(record).__name__}")
+            except Exception as e:
+                self._record_error('parse', f"record {self.stats['scanned']}: {e}")
+                continue
+            yield record
+    
+    def _validate(self, records: Iterator[Dict]) -> Iterator[Dict]:
+        """Stage 2: drop records the database would reject"""
+        for record in records:
+            missing = [f for f in REQUIRED_FIELDS if not record.get(f)]
+            if missing:
+                self._record_error('missing_field', f"{record.get('source_listing_id')}: missing {', '.join(missing)}")
+                continue
+            property_type = record.get('property_type')
+            if property_type is not None and property_type not in PROPERTY_TYPES:
+                self._record_error('invalid_property_type', f"{record['source_listing_id']}: {property_type!r}")
+                continue
+            rent = record.get('rent')
+            if rent is not None:
+                try:
+                    if float(rent) < 0:
+                        raise ValueError(rent)
+                except (TypeError, ValueError):
+                    self._record_error('invalid_rent', f"{record['source_listing_id']}: {rent!r}")
+                    continue
+            yield record
+    
+    def _normalize(self, records: Iterator[Dict]) -> Iterator[Dict]:
+        """Stage 3: trim text and coerce numeric fields"""
+        for record in records:
+            try:
+                yield {
+                    'street_address': str(record['street_address']).strip(),
+                    'city': str(record['city']).strip(),
+                    'state': str(record['state']).strip().upper(),
+                    'zip_code': str(record['zip_code']).strip(),
+                    'property_type': record.get('property_type'),
+                    'bedrooms': _optional(int, record.get('bedrooms')),
+                    'bathrooms': _optional(float, record.get('bathrooms')),
+                    'square_feet': _optional(int, record.get('square_feet')),
+                    'source_listing_id': str(record['source_listing_id']).strip(),
+                    'listing_url': record.get('listing_url'),
+                    'rent': _optional(float, record.get('rent')) or None,
+                    'observed_date': _optional(_as_date, record.get('observed_date')),
+                }
+            except (TypeError, ValueError) as e:
+                self._record_error('normalize', f"{record.get('source_listing_id')}: {e}")
+    
+    def _dedupe(self, records: Iterator[Dict]) -> Iterator[Dict]:
+        """Stage 4: drop exact repeats of recently seen listings"""
+        recent = OrderedDict()
+        for record in records:
+            key = record['source_listing_id']
+            fingerprint = ListingCache.fingerprint(record)
+            if recent.get(key) == fingerprint:
+                self.stats['duplicates'] += 1
+                recent.move_to_end(key)
+                continue
+            recent[key] = fingerprint
+            recent.move_to_end(key)
+            if len(recent) > DEDUPE_WINDOW:
+                recent.popitem(last=False)
+            yield record
+    
+    def _skip_unchanged(self, source: str, records: Iterator[Dict]) -> Iterator[Dict]:
+        """Stage 5: hold back cached, unchanged re-observations for a bulk touch
+
+        Backdated records (observed_date set) always take the write path.
+        """
+        for record in records:
+            if self.listing_cache is not None and record['observed_date'] is None:
+                listing_id = self.listing_cache.lookup(
+                    source, record['source_listing_id'], ListingCache.fingerprint(record)
+                )
+                if listing_id is not None:
+                    self._touched.append(listing_id)
+                    self.stats['inserted'] += 1
+                    continue
+            yield record
+    
+    @staticmethod
+    def _chunked(records: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+        """Group a stream into lists of at most `size` records"""
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, size))
+            if not chunk:
+                return
+            yield chunk
+    
+    def _write_chunk(self, source: str, chunk: List[Dict]):
+        """Stage 6: bulk-write one chunk in its own transaction"""
+        try:
+            result = self.db.bulk_ingest(source, chunk)
+            self.db.conn.commit()
+            if self.listing_cache is not None:
+                self._cache_written(source, chunk, result['listing_ids'])
+        except Exception as e:
+            self.db.conn.rollback()
+            self._record_error('chunk_failed', f"chunk {self.stats['chunks']} ({len(chunk)} records): {e}")
+            logger.error(f"Chunk {self.stats['chunks']} failed: {e}")
+            return
+        finally:
+            self.stats['chunks'] += 1
+        
+        self.stats['inserted'] += result['inserted']
+        self.stats['price_changes'] += result['price_changes']
+        self.stats['partitions_created'].extend(result['partitions_created'])
+        for error_type, message in result['errors']:
+            self._record_error(error_type, message)
+    
+    def _cache_written(self, source: str, chunk: List[Dict], listing_ids: Dict[str, int]):
+        """Record a committed chunk's current observations in the listing cache
+
+        Rejected and backdated records are evicted instead: their stored
+        state is not what the record describes.
+        """
+        for record in chunk:
+            source_listing_id = record['source_listing_id']
+            listing_id = listing_ids.get(source_listing_id)
+            if listing_id is None or record['observed_date'] is not None:
+                self.listing_cache.discard(source, [source_listing_id])
+            else:
+                self.listing_cache.put(source, source_listing_id, listing_id,
+                                       record['rent'], ListingCache.fingerprint(record))
 
 
-def run_daily_operations():
-    """Execute complete daily workflow"""
+def _optional(cast: Callable, value):
+    """Apply `cast` unless the value is missing"""
+    return None if value is None or value == '' else cast(value)
+
+
+def _text(value) -> str:
+    """Coerce to str, rejecting NUL bytes (not storable in a TEXT column)"""
+    value = str(value)
+    if '\x00' in value:
+        raise ValueError(f"NUL byte in {value!r}")
+    return value
+
+
+def _required_text(record: Dict, field: str) -> str:
+    """A non-empty text field (NOT NULL column)"""
+    value = record.get(field)
+    if value is None or not str(value).strip():
+        raise ValueError(f"missing {field}")
+    return _text(value)
+
+
+def _as_number(value) -> float:
+    """Accept a finite number or numeric string"""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"not a finite number: {value!r}")
+    return number
+
+
+def _as_int(value) -> int:
+    """Accept an integral number that fits an INTEGER column"""
+    number = value if isinstance(value, int) else _as_number(value)
+    if number != int(number) or abs(int(number)) >= INTEGER_LIMIT:
+        raise ValueError(f"not an INTEGER: {value!r}")
+    return int(number)
+
+
+def _as_date(value) -> date:
+    """Accept a date, datetime or ISO date string"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def run_daily_operations(full_rebuild: bool = False):
+    """Execute complete daily workflow
+    
+    ZIP metrics are recomputed only for ZIPs touched since the last run
+    unless full_rebuild is set.
+    """
     logger.info("=== Starting Daily Operations ===")
     start_time = datetime.now()
     
@@ -402,7 +1668,7 @@ def run_daily_operations():
     try:
         # Step 1: Create partitions
         logger.info("Creating monthly partitions...")
-        partitions = db.auto_create_partitions()
+        partitions = db.auto_create_partitions() + db.drain_default_partition()
         for p in partitions:
             logger.info(f"  {p}")
         
@@ -412,11 +1678,24 @@ def run_daily_operations():
         logger.info(f"  Marked {stale_count} listings inactive")
         
         # Step 3: Calculate ZIP metrics
-        logger.info("Calculating ZIP code metrics...")
-        zips = db.get_all_zips()
-        for zip_code in zips:
-            db.calculate_zip_metrics(zip_code)
-        logger.info(f"  Processed {len(zips)} ZIP codes")
+        logger.info(f"Calculating ZIP code metrics ({METRICS_ENGINE})...")
+        if METRICS_ENGINE == 'numpy':
+            from metrics_engine import ZipMetricsEngine  # numpy is optional
+            result = ZipMetricsEngine().run(full=full_rebuild)
+        else:
+            result = db.refresh_zip_metrics(full=full_rebuild)
+        logger.info(f"  Recomputed {result['recomputed']} ZIP codes, "
+                    f"carried forward {result['carried_forward']}")
+        
+        # Step 4: Roll ZIP metrics up to city, state and national level
+        logger.info("Refreshing city/state/national rollups...")
+        rollup = db.refresh_geo_rollup()
+        logger.info(f"  {rollup['rows']} rollup rows in {rollup['seconds']:.1f}s")
+        
+        # Step 5: Refresh the market snapshot read by reports and exports
+        logger.info("Refreshing market snapshot...")
+        snapshot = db.refresh_market_snapshot()
+        logger.info(f"  {snapshot['rows']} snapshot rows in {snapshot['seconds']:.1f}s")
         
         elapsed = (datetime.now() - start_time).total_seconds()
         logger.info(f"=== Daily Operations Complete ({elapsed:.1f}s) ===")
@@ -433,8 +1712,20 @@ def run_daily_operations():
 def run_weekly_forecast_update():
     """Execute weekly forecast update"""
     logger.info("=== Starting Weekly Forecast Update ===")
-    # TODO: Implement ML model training and prediction
-    logger.info("Forecast update not yet implemented")
+
+    try:
+        from forecasting import BatchForecaster  # numpy is optional
+        result = BatchForecaster().run()
+    except Exception as e:
+        logger.error(f"Weekly forecast update failed: {e}")
+        return False
+
+    logger.info(f"  Forecast {result['forecast_zips']} of {result['zips']} ZIP codes, "
+                f"{result['rows']} rows ({result['model_version']})")
+    logger.info(f"  {result['cold']} refitted, {result['warm']} warm-started, "
+                f"{result['carried_forward']} carried forward")
+    logger.info(f"=== Weekly Forecast Update Complete ({result['seconds']:.1f}s) ===")
+    return True
 
 
 def schedule_jobs():
@@ -459,7 +1750,7 @@ if __name__ == "__main__":
     
     if len(sys.argv) > 1:
         if sys.argv[1] == "run":
-            run_daily_operations()
+            run_daily_operations(full_rebuild="--full" in sys.argv[2:])
         elif sys.argv[1] == "schedule":
             schedule_jobs()
     else:
@@ -48,21 +48,22 @@ def generate_report():
     cursor.execute("SELECT COUNT(*) as zips FROM rental_intel.daily_zip_metrics")
     zip_metrics = cursor.fetchone()['zips']
     
-    # Get top markets
+    # Get top markets (latest state-level rollup)
     cursor.execute("""
-        SELECT state, COUNT(*) as cnt 
-        FROM rental_intel.properties 
-        GROUP BY state 
+        SELECT state, property_count as cnt 
+        FROM rental_intel.geo_market_rollup 
+        WHERE grain = 'state'
+          AND metric_date = (SELECT MAX(metric_date) FROM rental_intel.geo_market_rollup)
         ORDER BY cnt DESC 
         LIMIT 10
     """)
     top_states = cursor.fetchall()
     
-    # Get highest rent markets
+    # Get highest rent markets (precomputed city-level snapshot)
     cursor.execute("""
         SELECT state, city, median_rent, active_listings
-        FROM rental_intel.v_market_snapshot 
-        WHERE active_listings > 0
+        FROM rental_intel.mv_market_snapshot 
+        WHERE grain = 'city' AND active_listings > 0 AND median_rent IS NOT NULL
         ORDER BY median_rent DESC 
         LIMIT 10
     """)
@@ -71,13 +72,20 @@ def generate_report():
     # Get cheapest markets
     cursor.execute("""
         SELECT state, city, median_rent, active_listings
-        FROM rental_intel.v_market_snapshot 
-        WHERE active_listings > 0 AND median_rent IS NOT NULL
+        FROM rental_intel.mv_market_snapshot 
+        WHERE grain = 'city' AND active_listings > 0 AND median_rent IS NOT NULL
         ORDER BY median_rent ASC 
         LIMIT 10
     """)
     cheapest_markets = cursor.fetchall()
     
+    cursor.execute("""
+        SELECT refreshed_at FROM rental_intel.materialized_view_refresh
+        WHERE view_name = 'mv_market_snapshot'
+    """)
+    refreshed = cursor.fetchone()
+    snapshot_time = refreshed['refreshed_at'] if refreshed else None
+    
     # Get recent price changes
     cursor.execute("""
         SELECT 
@@ -192,7 +200,8 @@ def generate_report():
         
         <div class="footer">
             <p>Rental Intelligence System | 50 States | {report_date}</p>
-            <p>For detailed analytics, connect to: rental_intel.v_market_snapshot</p>
+            <p>Market snapshot refreshed: {snapshot_time.strftime('%Y-%m-%d %H:%M') if snapshot_time else 'never'}</p>
+            <p>For detailed analytics, connect to: rental_intel.mv_market_snapshot</p>
         </div>
     </body>
     </html>
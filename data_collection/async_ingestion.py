@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Async Multi-State Ingestion Pipeline
+Overlaps network collection and database writes: collector tasks fetch
+cities while writer tasks persist already-fetched listings, connected by a
+bounded queue
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from daily_operations import RentalIntelDB, ErrorTracker, ListingCache
+from multi_state_collector import US_CITIES
+from multi_state_ingestion import ingest_listings
+from craigslist_collector import CraigslistCollector
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('async_ingestion')
+
+# Concurrent fetches / writers, and fetched cities allowed to wait for a writer
+FETCH_CONCURRENCY = int(os.getenv('INGEST_FETCH_CONCURRENCY', '4'))
+WRITE_CONCURRENCY = int(os.getenv('INGEST_WRITE_CONCURRENCY', '2'))
+QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', '8'))
+
+# Marks the end of the fetched-city queue for a writer
+_DONE = None
+
+
+class AsyncIngestionPipeline:
+    """Collector and writer stages joined by a bounded asyncio queue
+
+    Collectors and writers are blocking (requests, psycopg2), so each stage
+    runs them on its own thread pool; the event loop only schedules and
+    applies back-pressure. Each writer owns one RentalIntelDB connection;
+    all writers share one persisted ListingCache.
+    Cities sharing a Craigslist domain are fetched one at a time so the
+    per-domain rate limit still holds.
+    """
+
+    def __init__(self, fetch_concurrency: int = FETCH_CONCURRENCY,
+                 write_concurrency: int = WRITE_CONCURRENCY,
+                 queue_size: int = QUEUE_SIZE, sample_mode: bool = False):
+        self.fetch_concurrency = fetch_concurrency
+        self.write_concurrency = write_concurrency
+        self.queue_size = queue_size
+        self.sample_mode = sample_mode
+        self.errors = ErrorTracker()
+        self.stats = {
+            'cities_processed': 0,
+            'listings_collected': 0,
+            'listings_upserted': 0,
+            'price_changes': 0,
+            'fetch_seconds': 0.0,
+            'write_seconds': 0.0,
+            'errors': self.errors.samples
+        }
+        self._domain_locks: Dict[str, asyncio.Lock] = {}
+        self.listing_cache = ListingCache()
+        self.listing_cache.load()
+
+    def run(self, cities: List[Tuple[str, str]]) -> Dict:
+        """Ingest (city, state) pairs; returns summary stats"""
+        return asyncio.run(self._run(cities))
+
+    async def _run(self, cities: List[Tuple[str, str]]) -> Dict:
+        start = time.monotonic()
+        work = asyncio.Queue()
+        for city_state in cities:
+            work.put_nowait(city_state)
+        fetched = asyncio.Queue(maxsize=self.queue_size)
+
+        fetch_pool = ThreadPoolExecutor(self.fetch_concurrency, thread_name_prefix='fetch')
+        write_pool = ThreadPoolExecutor(self.write_concurrency, thread_name_prefix='write')
+        try:
+            collectors = [
+                asyncio.create_task(self._collector(work, fetched, fetch_pool))
+                for _ in range(self.fetch_concurrency)
+            ]
+            writers = [
+                asyncio.create_task(self._writer(fetched, write_pool))
+                for _ in range(self.write_concurrency)
+            ]
+
+            await asyncio.gather(*collectors)
+            for _ in writers:
+                await fetched.put(_DONE)
+            await asyncio.gather(*writers)
+
+            # ZIP metrics once per run, for touched ZIPs only
+            await asyncio.get_running_loop().run_in_executor(write_pool, self._refresh_metrics)
+        finally:
+            fetch_pool.shutdown(wait=True)
+            write_pool.shutdown(wait=True)
+
+        elapsed = time.monotonic() - start
+        return {
+            'elapsed_seconds': elapsed,
+            'cities': self.stats['cities_processed'],
+            'listings': self.stats['listings_collected'],
+            'upserted': self.stats['listings_upserted'],
+            'price_changes': self.stats['price_changes'],
+            # Sum of per-city stage times; with overlap these exceed elapsed
+            'fetch_seconds': self.stats['fetch_seconds'],
+            'write_seconds': self.stats['write_seconds'],
+            'errors': self.errors.total
+        }
+
+    async def _collector(self, work: asyncio.Queue, fetched: asyncio.Queue,
+                         pool: ThreadPoolExecutor):
+        """Fetch cities until the work queue is empty"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                city, state = work.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            collector = CraigslistCollector(state)
+            domain = collector._find_domain(city)
+            lock = self._domain_locks.setdefault(domain, asyncio.Lock())
+
+            started = time.monotonic()
+            try:
+                async with lock:
+                    listings = await loop.run_in_executor(pool, collector.collect, city)
+            except Exception as e:
+                logger.error(f"Failed to collect {city}: {e}")
+                self.errors.add(type(e).__name__, f"{city}, {state}: {str(e)}")
+                continue
+            finally:
+                self.stats['fetch_seconds'] += time.monotonic() - started
+
+            if self.sample_mode and len(listings) > 10:
+                listings = random.sample(listings, 10)
+
+            # Blocks while writers are behind, bounding memory
+            await fetched.put((city, state, listings))
+
+    async def _writer(self, fetched: asyncio.Queue, pool: ThreadPoolExecutor):
+        """Persist fetched cities on a dedicated connection"""
+        loop = asyncio.get_running_loop()
+        db = RentalIntelDB(workload='ingest')
+        if not await loop.run_in_executor(pool, db.connect):
+            self.errors.add('connection_failed', 'Writer could not connect')
+            # Keep draining so collectors never block on a full queue
+            while await fetched.get() is not _DONE:
+                pass
+            return
+
+        try:
+            while True:
+                item = await fetched.get()
+                if item is _DONE:
+                    return
+                city, state, listings = item
+
+                started = time.monotonic()
+                try:
+                    result = await loop.run_in_executor(
+                        pool, self._write_city, db, city, state, listings, self.listing_cache
+                    )
+                    self.stats['listings_upserted'] += result['inserted']
+                    self.stats['price_changes'] += result['price_changes']
+                    logger.info(f"  {city}, {state}: {result['inserted']} listings, "
+                                f"{result['error_total']} errors")
+                except Exception as e:
+                    logger.error(f"Failed to write {city}: {e}")
+                    self.errors.add(type(e).__name__, f"{city}, {state}: {str(e)}")
+                finally:
+                    self.stats['write_seconds'] += time.monotonic() - started
+                    self.stats['cities_processed'] += 1
+                    self.stats['listings_collected'] += len(listings)
+        finally:
+            await loop.run_in_executor(pool, db.close)
+
+    @staticmethod
+    def _write_city(db: RentalIntelDB, city: str, state: str, listings: List,
+                    listing_cache: Optional[ListingCache] = None) -> Dict:
+        """Stream one city's listings into the database (runs on a writer thread)"""
+        return ingest_listings(db, listings, state, listing_cache)
+
+    @staticmethod
+    def _refresh_metrics():
+        """Recompute metrics for the ZIPs touched by this run"""
+        db = RentalIntelDB()
+        if db.connect():
+            try:
+                db.refresh_zip_metrics()
+            finally:
+                db.close()
+
+
+def select_cities(state: Optional[str], all_states: bool, max_cities: int) -> List[Tuple[str, str]]:
+    """(city, state) pairs for a single state or all states"""
+    states = sorted(US_CITIES.keys()) if all_states else [state]
+    return [(city, st) for st in states for city in US_CITIES.get(st, [])[:max_cities]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Async multi-state rental data ingestion')
+    parser.add_argument('--state', '-s', help='Process single state (e.g., CA)')
+    parser.add_argument('--all', '-a', action='store_true', help='Process all 50 states')
+    parser.add_argument('--max-cities', '-m', type=int, default=3, help='Max cities per state')
+    parser.add_argument('--sample', action='store_true', help='Sample mode (10 listings per city)')
+    parser.add_argument('--fetch-concurrency', type=int, default=FETCH_CONCURRENCY,
+                        help='Cities fetched concurrently')
+    parser.add_argument('--write-concurrency', type=int, default=WRITE_CONCURRENCY,
+                        help='Concurrent DB writers (one connection each)')
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE,
+                        help='Fetched cities buffered ahead of the writers')
+
+    args = parser.parse_args()
+    if not args.state and not args.all:
+        parser.error('--state or --all is required')
+
+    pipeline = AsyncIngestionPipeline(
+        fetch_concurrency=args.fetch_concurrency,
+        write_concurrency=args.write_concurrency,
+        queue_size=args.queue_size,
+        sample_mode=args.sample
+    )
+    summary = pipeline.run(select_cities(args.state, args.all, args.max_cities))
+
+    print(f"\n{summary['cities']} cities, {summary['listings']:,} listings, "
+          f"{summary['price_changes']:,} price changes, {summary['errors']} errors")
+    print(f"Completed in {summary['elapsed_seconds']:.1f}s "
+          f"(fetch {summary['fetch_seconds']:.1f}s + write {summary['write_seconds']:.1f}s overlapped)")
+
+
+if __name__ == '__main__':
+    main()
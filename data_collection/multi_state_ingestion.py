@@ -17,7 +17,7 @@ from dataclasses import dataclass
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from daily_operations import RentalIntelDB, PropertyData, ListingData
+from daily_operations import RentalIntelDB, DataIngestionEngine, ErrorTracker, ListingCache
 from multi_state_collector import MultiStateCollector, US_CITIES, ListingData as CollectorListing
 
 logging.basicConfig(
@@ -26,12 +26,52 @@ logging.basicConfig(
 )
 logger = logging.getLogger('multi_state_ingestion')
 
+def collector_listing_to_record(listing: CollectorListing, state: str) -> Dict:
+    """Map a collector listing onto the ingestion record format"""
+    return {
+        'street_address': listing.street_address,
+        'city': listing.city,
+        'state': listing.state,
+        'zip_code': listing.zipcode or f"{state}0000",
+        'property_type': listing.property_type or 'apartment',
+        'bedrooms': listing.bedrooms,
+        'bathrooms': listing.bathrooms,
+        'square_feet': listing.sqft,
+        'source_listing_id': listing.source_id,
+        'listing_url': listing.listing_url,
+        'rent': listing.rent,
+    }
+
+
+def ingest_listings(db: RentalIntelDB, listings: List[CollectorListing], state: str,
+                    listing_cache: Optional[ListingCache] = None) -> Dict:
+    """Stream collector listings into the database, one run per listing source"""
+    by_source: Dict[str, List[CollectorListing]] = {}
+    for listing in listings:
+        by_source.setdefault(listing.source, []).append(listing)
+    
+    totals = {'inserted': 0, 'price_changes': 0, 'error_total': 0}
+    for source, group in by_source.items():
+        engine = DataIngestionEngine(db, listing_cache=listing_cache)
+        result = engine.ingest_stream(
+            source, group,
+            parser=lambda listing: collector_listing_to_record(listing, state)
+        )
+        for key in totals:
+            totals[key] += result[key]
+    return totals
+
+
 class MultiStateIngestionPipeline:
     """Pipeline for ingesting rental data from all 50 states"""
     
     def __init__(self):
         self.db = RentalIntelDB()
         self.collector = MultiStateCollector()
+        self.errors = ErrorTracker()
+        # Persisted across runs: unchanged re-observations are only touched
+        self.listing_cache = ListingCache()
+        self.listing_cache.load()
         self.stats = {
             'states_processed': 0,
             'cities_processed': 0,
@@ -39,7 +79,7 @@ class MultiStateIngestionPipeline:
             'properties_upserted': 0,
             'listings_upserted': 0,
             'price_changes': 0,
-            'errors': []
+            'errors': self.errors.samples
         }
         
     def connect(self) -> bool:
@@ -69,58 +109,21 @@ class MultiStateIngestionPipeline:
             if sample_mode:
                 listings = random.sample(listings, min(10, len(listings))) if len(listings) > 10 else listings
             
-            for listing in listings:
-                try:
-                    # Create property
-                    prop = PropertyData(
-                        street_address=listing.street_address,
-                        city=listing.city,
-                        state=listing.state,
-                        zip_code=listing.zipcode or f"{state}0000",
-                        property_type=listing.property_type or 'apartment',
-                        bedrooms=listing.bedrooms,
-                        bathrooms=listing.bathrooms,
-                        square_feet=listing.sqft
-                    )
-                    
-                    property_id = self.db.upsert_property(prop)
-                    if not property_id:
-                        city_stats['errors'] += 1
-                        continue
-                    
-                    # Create listing
-                    list_data = ListingData(
-                        source_platform=listing.source,
-                        source_listing_id=listing.source_id,
-                        listing_url=listing.listing_url,
-                        rent=listing.rent
-                    )
-                    
-                    listing_id = self.db.upsert_listing(property_id, list_data)
-                    if listing_id and listing.rent:
-                        price_recorded = self.db.record_price(listing_id, listing.rent)
-                        if price_recorded:
-                            self.stats['price_changes'] += 1
-                        
-                        city_stats['listings'] += 1
-                        self.stats['properties_upserted'] += 1
-                        self.stats['listings_upserted'] += 1
-                        
-                except Exception as e:
-                    logger.error(f"Failed to ingest listing in {city}: {e}")
-                    city_stats['errors'] += 1
+            # Stream the city's listings through the bulk ingestion pipeline
+            result = ingest_listings(self.db, listings, state, self.listing_cache)
             
-            # Calculate ZIP metrics after all listings
-            if listings:
-                zip_code = listings[0].zipcode or f"{state}0000"
-                self.db.calculate_zip_metrics(zip_code)
+            city_stats['listings'] = result['inserted']
+            city_stats['errors'] = result['error_total']
+            self.stats['properties_upserted'] += result['inserted']
+            self.stats['listings_upserted'] += result['inserted']
+            self.stats['price_changes'] += result['price_changes']
             
             self.stats['listings_collected'] += len(listings)
             
         except Exception as e:
             logger.error(f"Failed to process {city}: {e}")
             city_stats['errors'] += 1
-            self.stats['errors'].append(f"{city}, {state}: {str(e)}")
+            self.errors.add(type(e).__name__, f"{city}, {state}: {str(e)}")
         
         return city_stats
     
@@ -173,7 +176,7 @@ class MultiStateIngestionPipeline:
                 self.ingest_state(state, max_cities, sample_mode)
             except Exception as e:
                 logger.error(f"Failed to process state {state}: {e}")
-                self.stats['errors'].append(f"State {state}: {str(e)}")
+                self.errors.add(type(e).__name__, f"State {state}: {str(e)}")
         
         elapsed = (datetime.now() - start_time).total_seconds()
         
@@ -184,9 +187,13 @@ class MultiStateIngestionPipeline:
             'listings': self.stats['listings_collected'],
             'properties': self.stats['properties_upserted'],
             'price_changes': self.stats['price_changes'],
-            'errors': len(self.stats['errors'])
+            'errors': self.errors.total
         }
     
+    def refresh_metrics(self, full: bool = False) -> Dict:
+        """Recompute metrics for the ZIPs this run touched (or all ZIPs)"""
+        return self.db.refresh_zip_metrics(full=full)
+    
     def generate_report(self) -> str:
         """Generate ingestion report"""
         report = f"""
@@ -200,7 +207,7 @@ Listings Collected: {self.stats['listings_collected']:,}
 Properties Upserted: {self.stats['properties_upserted']:,}
 Listings Upserted: {self.stats['listings_upserted']:,}
 Price Changes: {self.stats['price_changes']:,}
-Errors: {len(self.stats['errors'])}
+Errors: {self.errors.total}
 
 {'='*60}
 """
@@ -214,6 +221,7 @@ def main():
     parser.add_argument('--all', '-a', action='store_true', help='Process all 50 states')
     parser.add_argument('--max-cities', '-m', type=int, default=3, help='Max cities per state')
     parser.add_argument('--sample', action='store_true', help='Sample mode (10 listings per city)')
+    parser.add_argument('--full-metrics', action='store_true', help='Rebuild metrics for every ZIP')
     
     args = parser.parse_args()
     
@@ -246,6 +254,9 @@ def main():
             for city in ['San Francisco', 'Los Angeles', 'San Diego']:
                 stats = pipeline.ingest_city(city, 'CA', True)
                 print(f"  {city}: {stats['listings']} listings")
+        
+        # ZIP metrics once per run, for touched ZIPs only
+        pipeline.refresh_metrics(full=args.full_metrics)
     
     finally:
         pipeline.close()
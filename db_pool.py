@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Shared PostgreSQL Connection Pool
+One pooled connection provider for every entry point, with health checks
+and per-workload session settings
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, Tuple
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extensions import connection as _PGConnection, TRANSACTION_STATUS_IDLE
+
+# Configuration
+DB_HOST = os.getenv('DB_HOST', 'localhost')
+DB_PORT = os.getenv('DB_PORT', '5432')
+DB_NAME = os.getenv('DB_NAME', 'rental_intel')
+DB_USER = os.getenv('DB_USER', 'sngmacmini')  # macOS default user
+DB_PASSWORD = os.getenv('DB_PASSWORD', '')
+
+POOL_MIN_CONN = int(os.getenv('DB_POOL_MIN', '1'))
+POOL_MAX_CONN = int(os.getenv('DB_POOL_MAX', '10'))
+POOL_CHECKOUT_TIMEOUT = float(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', '30'))
+# Connections idle longer than this are pinged before being handed out
+HEALTH_CHECK_AFTER = float(os.getenv('DB_POOL_HEALTH_CHECK_SECS', '30'))
+
+# Session settings applied when a connection is checked out for a workload
+WORKLOAD_SETTINGS = {
+    'default': {
+        'application_name': 'rental_intel',
+    },
+    'ingest': {
+        'application_name': 'rental_intel_ingest',
+        'statement_timeout': '5min',
+        'synchronous_commit': 'off',
+        'plan_cache_mode': 'force_generic_plan',
+    },
+    'bulk': {
+        'application_name': 'rental_intel_bulk',
+        'statement_timeout': '0',
+        'synchronous_commit': 'off',
+        'work_mem': '256MB',
+        'plan_cache_mode': 'force_generic_plan',
+    },
+    'report': {
+        'application_name': 'rental_intel_report',
+        'statement_timeout': '10min',
+    },
+}
+
+logger = logging.getLogger('rental_intel.db_pool')
+
+
+class PooledConnection(_PGConnection):
+    """psycopg2 connection carrying pool bookkeeping"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.workload = None
+        self.last_used = time.monotonic()
+        # Names of PreparedStatements already prepared in this session
+        self.prepared = set()
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool that blocks instead of failing when exhausted"""
+
+    def __init__(self, minconn: int = POOL_MIN_CONN, maxconn: int = POOL_MAX_CONN):
+        self.maxconn = maxconn
+        self._pool = ThreadedConnectionPool(
+            minconn, maxconn,
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            connection_factory=PooledConnection
+        )
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self.stats = {'checkouts': 0, 'health_checks': 0, 'discarded': 0}
+
+    def getconn(self, workload: str = 'default') -> PooledConnection:
+        """Check out a healthy connection configured for `workload`"""
+        if workload not in WORKLOAD_SETTINGS:
+            raise ValueError(f"Unknown workload: {workload}")
+        if not self._slots.acquire(timeout=POOL_CHECKOUT_TIMEOUT):
+            raise psycopg2.pool.PoolError(
+                f"No connection available after {POOL_CHECKOUT_TIMEOUT:.0f}s (max {self.maxconn})"
+            )
+
+        try:
+            # A broken connection is discarded and replaced; give up after
+            # cycling through the whole pool once
+            for _ in range(self.maxconn + 1):
+                conn = self._pool.getconn()
+                if self._is_healthy(conn):
+                    break
+                self.stats['discarded'] += 1
+                self._pool.putconn(conn, close=True)
+            else:
+                raise psycopg2.OperationalError("Could not obtain a healthy connection")
+
+            if conn.workload != workload:
+                self._apply_settings(conn, workload)
+            self.stats['checkouts'] += 1
+            return conn
+
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn: PooledConnection, close: bool = False):
+        """Return a connection, rolling back any open transaction"""
+        try:
+            if not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+            conn.last_used = time.monotonic()
+            self._pool.putconn(conn, close=close or bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        """Close every pooled connection"""
+        if not self._pool.closed:
+            self._pool.closeall()
+
+    def _is_healthy(self, conn: PooledConnection) -> bool:
+        """Reject closed connections; ping ones that sat idle too long"""
+        if conn.closed:
+            return False
+        if time.monotonic() - conn.last_used < HEALTH_CHECK_AFTER:
+            return True
+
+        self.stats['health_checks'] += 1
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            logger.warning(f"Discarding unhealthy connection: {e}")
+            return False
+
+    @staticmethod
+    def _apply_settings(conn: PooledConnection, workload: str):
+        """Reset the session and apply the workload's settings in one round trip"""
+        settings = WORKLOAD_SETTINGS[workload]
+        statements = ["RESET ALL"] + [f"SET {name} = %s" for name in settings]
+        with conn.cursor() as cur:
+            cur.execute("; ".join(statements), tuple(settings.values()))
+        conn.commit()
+        conn.workload = workload
+
+
+_statement_stats: Dict[str, Dict] = {}
+_stats_lock = threading.Lock()
+
+
+class PreparedStatement:
+    """A hot statement prepared once per pooled connection and run by name
+
+    `sql` uses PostgreSQL's $1..$n placeholders and `types` gives their
+    types. The first execution on a connection PREPAREs the statement
+    (timing parse/analyze) and samples its planning time with EXPLAIN;
+    later executions skip both and send only EXECUTE.
+    """
+
+    def __init__(self, name: str, sql: str, types: Sequence[str]):
+        self.name = name
+        self.sql = sql
+        self.types = tuple(types)
+        self._execute_sql = f"EXECUTE {name} ({', '.join(['%s'] * len(self.types))})"
+        with _stats_lock:
+            _statement_stats.setdefault(name, {
+                'prepares': 0, 'prepare_ms': 0.0,
+                'plans_sampled': 0, 'plan_ms': 0.0,
+                'executions': 0, 'execute_ms': 0.0,
+            })
+
+    def execute(self, cursor, params: Tuple):
+        """Run the statement on `cursor`, preparing it on first use"""
+        if self.name not in cursor.connection.prepared:
+            self._prepare(cursor, params)
+
+        start = time.perf_counter()
+        cursor.execute(self._execute_sql, params)
+        self._record(executions=1, execute_ms=(time.perf_counter() - start) * 1000)
+
+    def _prepare(self, cursor, params: Tuple):
+        """PREPARE the statement and sample what planning it costs"""
+        start = time.perf_counter()
+        cursor.execute(f"PREPARE {self.name} ({', '.join(self.types)}) AS {self.sql}")
+        self._record(prepares=1, prepare_ms=(time.perf_counter() - start) * 1000)
+        # Prepared statements outlive transaction rollbacks, so the name is
+        # valid for the rest of the session
+        cursor.connection.prepared.add(self.name)
+
+        # EXPLAIN without ANALYZE plans but does not execute
+        cursor.execute(f"EXPLAIN (SUMMARY) {self._execute_sql}", params)
+        for row in cursor.fetchall():
+            line = row['QUERY PLAN'] if isinstance(row, dict) else row[0]
+            if line.startswith('Planning Time:'):
+                self._record(plans_sampled=1, plan_ms=float(line.split()[2]))
+
+    def _record(self, **increments):
+        with _stats_lock:
+            stats = _statement_stats[self.name]
+            for key, value in increments.items():
+                stats[key] += value
+
+
+def statement_stats() -> Dict[str, Dict]:
+    """Per-statement prepare, planning and execution timings (ms)"""
+    with _stats_lock:
+        return {name: dict(stats) for name, stats in _statement_stats.items()}
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+                atexit.register(_pool.closeall)
+    return _pool
+
+
+def get_connection(workload: str = 'default') -> PooledConnection:
+    """Check out a pooled connection; hand it back with release_connection()"""
+    return get_pool().getconn(workload)
+
+
+def release_connection(conn: PooledConnection, close: bool = False):
+    """Return a connection obtained from get_connection()"""
+    get_pool().putconn(conn, close=close)
+
+
+@contextmanager
+def pooled_connection(workload: str = 'default'):
+    """Context manager around get_connection()/release_connection()"""
+    conn = get_connection(workload)
+    try:
+        yield conn
+    finally:
+        release_connection(conn)
+
+
+def pool_stats() -> Dict:
+    """Checkout, health-check and discard counters for the shared pool"""
+    return dict(get_pool().stats)
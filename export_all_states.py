@@ -63,16 +63,19 @@ def export_data():
     
     print(f"✅ Properties CSV: {csv_file}")
     
-    # Export state summary
+    # Export state summary (latest state/city rollups)
     cur.execute("""
         SELECT 
-            state,
-            COUNT(*) as property_count,
-            COUNT(DISTINCT city) as city_count,
-            COUNT(DISTINCT zip) as zip_count
-        FROM rental_intel.properties
-        GROUP BY state
-        ORDER BY state
+            s.state,
+            s.property_count,
+            (SELECT COUNT(*) FROM rental_intel.geo_market_rollup c
+             WHERE c.grain = 'city' AND c.metric_date = s.metric_date
+               AND c.state = s.state) as city_count,
+            s.zip_count
+        FROM rental_intel.geo_market_rollup s
+        WHERE s.grain = 'state'
+          AND s.metric_date = (SELECT MAX(metric_date) FROM rental_intel.geo_market_rollup)
+        ORDER BY s.state
     """)
     
     states_data = []
@@ -94,9 +97,10 @@ def export_data():
         SELECT 
             city,
             state,
-            COUNT(*) as listing_count
-        FROM rental_intel.properties
-        GROUP BY city, state
+            property_count as listing_count
+        FROM rental_intel.geo_market_rollup
+        WHERE grain = 'city'
+          AND metric_date = (SELECT MAX(metric_date) FROM rental_intel.geo_market_rollup)
         ORDER BY listing_count DESC
         LIMIT 500
     """)
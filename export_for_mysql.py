@@ -93,13 +93,15 @@ def export_properties_sample(output_dir='/tmp/rental_export', sample_size=50000)
     
     print(f"✅ JSON exported: {json_file}")
     
-    # Export summary by state
+    # Export summary by state (latest state/city rollups)
     cur.execute("""
-        SELECT state, COUNT(*) as count, 
-               (SELECT AVG(observed_rent) FROM rental_intel.rent_price_history) as avg_rent,
-               COUNT(DISTINCT city) as cities
-        FROM rental_intel.properties p
-        GROUP BY state
+        SELECT s.state, s.property_count as count, s.avg_rent,
+               (SELECT COUNT(*) FROM rental_intel.geo_market_rollup c
+                WHERE c.grain = 'city' AND c.metric_date = s.metric_date
+                  AND c.state = s.state) as cities
+        FROM rental_intel.geo_market_rollup s
+        WHERE s.grain = 'state'
+          AND s.metric_date = (SELECT MAX(metric_date) FROM rental_intel.geo_market_rollup)
         ORDER BY count DESC
     """)
     
@@ -118,14 +120,20 @@ def export_properties_sample(output_dir='/tmp/rental_export', sample_size=50000)
     
     print(f"✅ State summary: {summary_file}")
     
-    # Export top markets
+    # Export top markets by property count (trigger-maintained ZIP counts,
+    # rents from the market snapshot)
     cur.execute("""
-        SELECT city, state, COUNT(*) as listings,
-               (SELECT AVG(observed_rent) FROM rental_intel.rent_price_history) as avg_rent
-        FROM rental_intel.properties p
-        GROUP BY city, state
-        ORDER BY listings DESC
-        LIMIT 100
+        SELECT p.city, p.state, p.listings, s.avg_rent
+        FROM (
+            SELECT city, state, SUM(property_count) as listings
+            FROM rental_intel.zip_property_counts
+            GROUP BY city, state
+            ORDER BY listings DESC
+            LIMIT 100
+        ) p
+        LEFT JOIN rental_intel.mv_market_snapshot s
+            ON s.grain = 'city' AND s.state = p.state AND s.city = p.city
+        ORDER BY p.listings DESC
     """)
     
     markets_file = f"{output_dir}/top_markets.json"
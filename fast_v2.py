@@ -8,10 +8,11 @@ import os
 import sys
 import time
 import random
-import psycopg2
 from datetime import datetime
 from psycopg2.extras import execute_values
 
+from db_pool import get_connection, release_connection
+
 TARGET = 10_000_000
 BATCH_SIZE = 10000
 
@@ -74,12 +75,12 @@ STREETS = ['Main St', 'Oak Ave', 'Pine St', 'Elm Dr', 'Maple Ave', 'Cedar Ln', '
 STATES = list(STATES_DATA.keys())
 
 def get_count():
-    conn = psycopg2.connect(host='localhost', database='rental_intel', user='sngmacmini')
+    conn = get_connection('report')
     cur = conn.cursor()
     cur.execute("SELECT COUNT(*) FROM rental_intel.properties")
     count = cur.fetchone()[0]
     cur.close()
-    conn.close()
+    release_connection(conn)
     return count
 
 def generate_props(batch_num):
@@ -116,8 +117,7 @@ def main():
     print(f"Start: {start_count:,} | Target: {TARGET:,} | Batch: {BATCH_SIZE}")
     print("="*70)
     
-    conn = psycopg2.connect(host='localhost', database='rental_intel', user='sngmacmini')
-    conn.autocommit = False
+    conn = get_connection('bulk')
     
     start_time = time.time()
     batch_num = 0
@@ -165,7 +165,7 @@ def main():
         print("\nStopping...")
         conn.commit()
     
-    conn.close()
+    release_connection(conn)
     
     final = get_count()
     elapsed = time.time() - start_time
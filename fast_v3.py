@@ -8,9 +8,10 @@ import os
 import sys
 import time
 import random
-import psycopg2
 from datetime import datetime
-from psycopg2.extras import execute_values
+
+from db_pool import get_connection, release_connection, PreparedStatement
+from checkpoints import IngestionRun
 
 TARGET = 10_000_000
 BATCH_SIZE = 5000  # Reduced for reliability
@@ -73,13 +74,44 @@ STREETS = ['Main St', 'Oak Ave', 'Pine St', 'Elm Dr', 'Maple Ave', 'Cedar Ln', '
 
 STATES = list(STATES_DATA.keys())
 
+# Batch inserts take one array per column, so each statement is prepared
+# once per connection whatever the batch size
+INSERT_PROPERTIES = PreparedStatement('fast_insert_properties', """
+    INSERT INTO rental_intel.properties 
+    (street_address, city, state, zip, normalized_full_address, address_hash,
+     property_type, bedrooms, bathrooms, square_feet)
+    SELECT * FROM unnest($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+    ON CONFLICT (address_hash) DO UPDATE SET updated_at = CURRENT_TIMESTAMP
+    RETURNING property_id, address_hash
+""", ('TEXT[]', 'TEXT[]', 'TEXT[]', 'TEXT[]', 'TEXT[]', 'TEXT[]', 'TEXT[]',
+      'INTEGER[]', 'DECIMAL[]', 'INTEGER[]'))
+
+INSERT_LISTINGS = PreparedStatement('fast_insert_listings', """
+    INSERT INTO rental_intel.listings 
+    (property_id, source_platform, source_listing_id, listing_status, listing_url)
+    SELECT * FROM unnest($1, $2, $3, $4, $5)
+    ON CONFLICT DO NOTHING RETURNING listing_id, property_id
+""", ('BIGINT[]', 'TEXT[]', 'TEXT[]', 'TEXT[]', 'TEXT[]'))
+
+INSERT_PRICES = PreparedStatement('fast_insert_prices', """
+    INSERT INTO rental_intel.rent_price_history 
+    (listing_id, property_id, observed_rent, rent_per_sqft, change_type, observed_date)
+    SELECT *, 'new', CURRENT_DATE FROM unnest($1, $2, $3, $4)
+    ON CONFLICT DO NOTHING
+""", ('BIGINT[]', 'BIGINT[]', 'DECIMAL[]', 'DECIMAL[]'))
+
+def columns(rows):
+    """Transpose row tuples into per-column lists for unnest()"""
+    return tuple(list(col) for col in zip(*rows))
+
 def get_count():
-    conn = psycopg2.connect(host='localhost', database='rental_intel', user='sngmacmini')
+    """Current property count from the trigger-maintained zip_property_counts"""
+    conn = get_connection('report')
     cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM rental_intel.properties")
+    cur.execute("SELECT COALESCE(SUM(property_count), 0) FROM rental_intel.zip_property_counts")
     count = cur.fetchone()[0]
     cur.close()
-    conn.close()
+    release_connection(conn)
     return count
 
 def generate_props(batch_num):
@@ -113,33 +145,37 @@ def main():
     print("HIGH-SPEED INGESTION v3 - 50,000/hour TARGET")
     print("="*70)
     
+    # Resume an unfinished run's batch cursor; the property total is read
+    # fresh (other loaders add properties between runs) without a scan
+    run = IngestionRun('fast_v3')
+    resumed = run.start()
+    if resumed:
+        batch_num = resumed['cursor']['batch_num']
+        counters = {'inserted': resumed['counters'].get('inserted', 0)}
+    else:
+        batch_num = 0
+        counters = {'inserted': 0}
     start_count = get_count()
+    total = start_count
     print(f"Start: {start_count:,} | Target: {TARGET:,} | Batch: {BATCH_SIZE}")
     print("="*70)
     
-    conn = psycopg2.connect(host='localhost', database='rental_intel', user='sngmacmini')
-    conn.autocommit = False
+    conn = get_connection('bulk')
     
     start_time = time.time()
-    batch_num = 0
+    status = 'completed'
     
     try:
-        while get_count() < TARGET:
+        while total < TARGET:
             cur = conn.cursor()
             
             # Generate batch
             batch = generate_props(batch_num)
             
             # Insert properties
-            execute_values(cur, """
-                INSERT INTO rental_intel.properties 
-                (street_address, city, state, zip, normalized_full_address, address_hash,
-                 property_type, bedrooms, bathrooms, square_feet)
-                VALUES %s
-                ON CONFLICT (address_hash) DO UPDATE SET updated_at = CURRENT_TIMESTAMP
-                RETURNING property_id, address_hash
-            """, [(p['addr'],p['city'],p['state'],p['zip'],p['normalized'],p['hash'],
-                   p['type'],p['beds'],p['baths'],p['sqft']) for p in batch])
+            INSERT_PROPERTIES.execute(cur, columns(
+                (p['addr'],p['city'],p['state'],p['zip'],p['normalized'],p['hash'],
+                 p['type'],p['beds'],p['baths'],p['sqft']) for p in batch))
             
             props = cur.fetchall()
             
@@ -152,11 +188,7 @@ def main():
                     listings.append((pid, 'fast50k', f"list_{hash_val}", 'active', f"http://r.com/{hash_val}"))
             
             if listings:
-                execute_values(cur, """
-                    INSERT INTO rental_intel.listings 
-                    (property_id, source_platform, source_listing_id, listing_status, listing_url)
-                    VALUES %s ON CONFLICT DO NOTHING RETURNING listing_id, property_id
-                """, listings)
+                INSERT_LISTINGS.execute(cur, columns(listings))
                 
                 listings_result = cur.fetchall()
                 
@@ -168,17 +200,15 @@ def main():
                         prices.append((lid, pid, prop['rent'], prop['rent_sqft']))
                 
                 if prices:
-                    execute_values(cur, """
-                        INSERT INTO rental_intel.rent_price_history 
-                        (listing_id, property_id, observed_rent, rent_per_sqft, change_type, observed_date)
-                        VALUES %s ON CONFLICT DO NOTHING
-                    """, [(p[0],p[1],p[2],p[3],'new',datetime.now().date()) for p in prices])
+                    INSERT_PRICES.execute(cur, columns(prices))
             
             conn.commit()
             cur.close()
             
             batch_num += 1
-            total = get_count()
+            total += len(props)
+            counters['inserted'] += len(props)
+            run.checkpoint({'batch_num': batch_num}, counters)
             
             # Report every 10 batches (50k)
             if batch_num % 10 == 0:
@@ -191,13 +221,17 @@ def main():
     except KeyboardInterrupt:
         print("\nStopping...")
         conn.commit()
+        status = 'interrupted'
     except Exception as e:
         print(f"\nError: {e}")
         conn.rollback()
+        status = 'failed'
     
-    conn.close()
+    release_connection(conn)
+    run.checkpoint({'batch_num': batch_num}, counters, force=True)
+    run.finish(status)
     
-    final = get_count()
+    final = total
     elapsed = time.time() - start_time
     rate = (final - start_count) / elapsed if elapsed > 0 else 0
     
@@ -0,0 +1,829 @@
+#!/usr/bin/env python3
+"""
+Batch Rent Forecaster
+Fits one exponentially weighted least-squares model per ZIP (log median
+rent on a linear trend plus day-of-week terms) for every ZIP at once: the
+daily_zip_metrics history is loaded as a dense ZIP x date matrix and all
+normal equations are built and solved with batched NumPy operations.
+ZIPs are sharded by state across a process pool that reads the history
+from shared memory. Writes 30/60/90-day projections with bands to
+forecast_zip_rent and per-shard timings to forecast_shard_log.
+
+Each ZIP's normal-equation statistics are kept in forecast_model_state, so
+later runs only fold in new observations for ZIPs whose rents changed and
+carry the previous forecasts forward for the rest.
+"""
+
+import io
+import os
+import csv
+import time
+import argparse
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from datetime import date, datetime, timedelta
+from statistics import NormalDist
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from db_pool import get_connection, release_connection
+from metrics_engine import copy_columns, group_index
+
+# Days of history per fit, and the half-life of the observation weights
+HISTORY_DAYS = int(os.getenv('FORECAST_HISTORY_DAYS', '365'))
+HALF_LIFE_DAYS = float(os.getenv('FORECAST_HALF_LIFE_DAYS', '90'))
+# ZIPs with fewer observed days in the window are not forecast
+MIN_OBSERVATIONS = int(os.getenv('FORECAST_MIN_OBSERVATIONS', '21'))
+# Days a carried-forward forecast may age before the ZIP is warm-started
+MAX_CARRY_DAYS = int(os.getenv('FORECAST_MAX_CARRY_DAYS', '28'))
+# Worker processes for state shards; 0 uses every core, 1 fits in-process
+WORKERS = int(os.getenv('FORECAST_WORKERS', '0'))
+
+HORIZONS = (30, 60, 90)
+# Central probability covered by projected_low..projected_high
+BAND_LEVEL = 0.8
+# Keeps the normal equations solvable when a ZIP lacks some weekdays
+RIDGE = 1e-6
+
+
+def model_version(half_life: float = HALF_LIFE_DAYS) -> str:
+    """forecast_zip_rent.model_version for the EWLS model at a half-life"""
+    return f"ewls-trend-dow-v1-hl{half_life:g}"
+
+
+MODEL_VERSION = model_version()
+
+HISTORY_DTYPE = [('zip', 'U'), ('day', 'i4'), ('rent', 'f8')]
+
+# Backtests: rolling-origin cutoffs, days between them, ZIPs per vectorized block
+BACKTEST_CUTOFFS = 12
+BACKTEST_STEP_DAYS = 14
+BACKTEST_CHUNK_ZIPS = 2000
+
+# Trend is measured in years from a fixed origin so fits are comparable
+# across runs
+TREND_ORIGIN = date(2020, 1, 1).toordinal()
+N_FEATURES = 8  # intercept, trend, six weekday indicators (Monday is the base)
+
+
+def design(days: np.ndarray) -> np.ndarray:
+    """Feature rows for date ordinals: intercept, trend (years), weekday dummies
+
+    Works on any shape of days; features are added as a last axis.
+    """
+    days = np.asarray(days)
+    X = np.zeros(days.shape + (N_FEATURES,))
+    X[..., 0] = 1.0
+    X[..., 1] = (days - TREND_ORIGIN) / 365.25
+    weekday = (days - 1) % 7  # date.fromordinal(1) is a Monday
+    X[..., 2:] = weekday[..., None] == np.arange(1, 7)
+    return X
+
+
+def decay_weights(days: np.ndarray, as_of: int, half_life: float = HALF_LIFE_DAYS) -> np.ndarray:
+    """Exponential observation weights, 1.0 on as_of"""
+    return np.power(0.5, (as_of - np.asarray(days)) / half_life)
+
+
+def sufficient_stats(days: np.ndarray, Y: np.ndarray, as_of: int,
+                     half_life: float = HALF_LIFE_DAYS) -> Dict[str, np.ndarray]:
+    """Weighted normal-equation statistics for every ZIP row of Y at once
+
+    Y is ZIP x len(days) log rents with NaN where unobserved. Returns
+    XtWX (Z x P x P), XtWy (Z x P), yWy, sum of weights and observation
+    counts (Z each). Backtests stack cutoffs in front: days (C x T), Y
+    (C x Z x T) and as_of (C,) give per-cutoff statistics in one pass.
+    """
+    X = design(days)
+    observed = ~np.isnan(Y)
+    weights = decay_weights(days, np.asarray(as_of)[..., None], half_life)
+    W = observed * weights[..., None, :]
+    Yz = np.where(observed, Y, 0.0)
+    WY = W * Yz
+
+    outer = (X[..., :, None] * X[..., None, :]).reshape(X.shape[:-1] + (-1,))
+    return {
+        'xtwx': (W @ outer).reshape(Y.shape[:-1] + (N_FEATURES, N_FEATURES)),
+        'xtwy': WY @ X,
+        'ywy': (WY * Yz).sum(axis=-1),
+        'weight': W.sum(axis=-1),
+        'count': observed.sum(axis=-1)
+    }
+
+
+def solve(stats: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Coefficients, residual sigma and inverse XtWX for every ZIP"""
+    A = stats['xtwx'] + RIDGE * np.eye(N_FEATURES)
+    A_inv = np.linalg.inv(A)
+    beta = np.einsum('...pq,...q->...p', A_inv, stats['xtwy'])
+
+    rss = stats['ywy'] - np.einsum('...p,...p->...', beta, stats['xtwy'])
+    dof = np.maximum(stats['count'] - N_FEATURES, 1)
+    # Weighted RSS per unit weight, scaled to unbiased per-observation variance
+    sigma2 = np.maximum(rss, 0) / np.maximum(stats['weight'], 1e-12) * stats['count'] / dof
+    return beta, np.sqrt(sigma2), A_inv
+
+
+def project(beta: np.ndarray, sigma: np.ndarray, A_inv: np.ndarray, as_of: int,
+            horizons=HORIZONS, level: float = BAND_LEVEL) -> Dict[str, np.ndarray]:
+    """Point forecast and band per ZIP and horizon (Z x H, rent dollars)
+
+    With stacked cutoffs as_of is (C,) and results are C x Z x H.
+    """
+    Xh = design(np.asarray(as_of)[..., None] + np.array(horizons))
+    mean = np.einsum('...zp,...hp->...zh', beta, Xh)
+    leverage = np.einsum('...hp,...zpq,...hq->...zh', Xh, A_inv, Xh)
+    spread = sigma[..., None] * np.sqrt(1 + leverage)
+    z = NormalDist().inv_cdf((1 + level) / 2)
+    return {
+        'point': np.exp(mean),
+        'low': np.exp(mean - z * spread),
+        'high': np.exp(mean + z * spread)
+    }
+
+
+def confidence(point: np.ndarray, low: np.ndarray, high: np.ndarray,
+               count: np.ndarray, window: int) -> np.ndarray:
+    """0-1 score: narrow bands and a well-covered history score high"""
+    tightness = np.clip(1 - (high - low) / (2 * point), 0, 1)
+    coverage = np.clip(count / window, 0, 1)
+    return tightness * coverage[..., None]
+
+
+def dense_history(rows: np.ndarray, first: date, n_days: int, zips: Optional[np.ndarray] = None):
+    """(zips, day ordinals, Y) from (zip, day offset, rent) rows; NaN where missing
+
+    zips, when given, must be sorted and fixes the row order of Y.
+    """
+    if zips is None:
+        zips, zi = np.unique(rows['zip'], return_inverse=True)
+    else:
+        zi = group_index(zips, rows['zip'])
+    Y = np.full((len(zips), n_days), np.nan)
+    Y[zi, rows['day']] = np.log(rows['rent'])
+    days = np.arange(first.toordinal(), first.toordinal() + n_days)
+    return zips, days, Y
+
+
+def load_history(cur, as_of: date, history_days: int = HISTORY_DAYS,
+                 zips: Optional[np.ndarray] = None):
+    """Dense ZIP x day matrix of log median rent ending on as_of
+
+    Returns (zips, day ordinals, Y) with NaN for missing days. Limited to
+    zips (sorted) when given.
+    """
+    first = as_of - timedelta(days=history_days - 1)
+    zip_list = None if zips is None else zips.tolist()
+    rows = copy_columns(cur, cur.mogrify("""
+        SELECT zip, metric_date - %s::date, median_rent
+        FROM rental_intel.daily_zip_metrics
+        WHERE metric_date BETWEEN %s AND %s
+          AND median_rent > 0
+          AND (%s::text[] IS NULL OR zip = ANY(%s::text[]))
+    """, (first, first, as_of, zip_list, zip_list)).decode(), HISTORY_DTYPE)
+    return dense_history(rows, first, history_days, zips)
+
+
+def load_new_observations(cur, zips: np.ndarray, as_of: date):
+    """Dense matrix of each ZIP's observations after its saved last_metric_date"""
+    cur.execute("""
+        SELECT MIN(last_metric_date) FROM rental_intel.forecast_model_state
+        WHERE zip = ANY(%s)
+    """, (zips.tolist(),))
+    first = cur.fetchone()[0] + timedelta(days=1)
+    rows = copy_columns(cur, cur.mogrify("""
+        SELECT m.zip, m.metric_date - %s::date, m.median_rent
+        FROM rental_intel.daily_zip_metrics m
+        JOIN rental_intel.forecast_model_state s ON s.zip = m.zip
+        WHERE m.zip = ANY(%s)
+          AND m.metric_date > s.last_metric_date
+          AND m.metric_date <= %s
+          AND m.median_rent > 0
+    """, (first, zips.tolist(), as_of)).decode(), HISTORY_DTYPE)
+    return dense_history(rows, first, (as_of - first).days + 1, zips)
+
+
+def load_window_counts(cur, zips: np.ndarray, as_of: date,
+                       history_days: int = HISTORY_DAYS) -> np.ndarray:
+    """Observed days of each ZIP (sorted) in the history window ending on as_of"""
+    first = as_of - timedelta(days=history_days - 1)
+    cur.execute("""
+        SELECT zip, COUNT(*)
+        FROM rental_intel.daily_zip_metrics
+        WHERE zip = ANY(%s)
+          AND metric_date BETWEEN %s AND %s
+          AND median_rent > 0
+        GROUP BY zip
+    """, (zips.tolist(), first, as_of))
+    counts = dict(cur.fetchall())
+    return np.array([counts.get(z, 0) for z in zips.tolist()])
+
+
+def last_observed(days: np.ndarray, Y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Ordinal and rent of each row's latest observation"""
+    idx = Y.shape[1] - 1 - np.argmax(~np.isnan(Y[:, ::-1]), axis=1)
+    return days[idx], np.exp(Y[np.arange(len(Y)), idx])
+
+
+def load_zip_states(cur, zips: np.ndarray) -> np.ndarray:
+    """State of each ZIP (the one with most properties), '' when unknown"""
+    rows = copy_columns(cur, """
+        SELECT DISTINCT ON (zip) zip, state
+        FROM rental_intel.zip_property_counts
+        ORDER BY zip, property_count DESC
+    """, [('zip', 'U'), ('state', 'U')])
+    if not len(rows):
+        return np.full(len(zips), '', dtype='U8')
+    rows = rows[np.argsort(rows['zip'])]
+    idx = group_index(rows['zip'], zips)
+    return np.where(idx >= 0, rows['state'][idx], '')
+
+
+def shard_by_state(states: np.ndarray) -> List[Tuple[str, np.ndarray]]:
+    """(state, row indices) per state, largest first so big shards start early"""
+    labels, inverse = np.unique(states, return_inverse=True)
+    shards = [(label or 'unknown', np.flatnonzero(inverse == i)) for i, label in enumerate(labels)]
+    return sorted(shards, key=lambda shard: -len(shard[1]))
+
+
+def forecast_rows(zips: np.ndarray, as_of: date, stats: Dict[str, np.ndarray],
+                  window: int = HISTORY_DAYS, horizons=HORIZONS):
+    """forecast_zip_rent rows for ZIPs with enough history
+
+    The MIN_OBSERVATIONS gate and the coverage score use window_count, the
+    observed days inside the window, so warm and cold fits agree on them.
+    """
+    keep = stats['window_count'] >= MIN_OBSERVATIONS
+    if not keep.any():
+        return []
+    beta, sigma, A_inv = solve({k: v[keep] for k, v in stats.items()})
+    bands = project(beta, sigma, A_inv, as_of.toordinal(), horizons)
+    score = confidence(bands['point'], bands['low'], bands['high'],
+                       stats['window_count'][keep], window)
+
+    rows = []
+    for i, zip_code in enumerate(zips[keep]):
+        for h, horizon in enumerate(horizons):
+            point, low, high = bands['point'][i, h], bands['low'][i, h], bands['high'][i, h]
+            # DECIMAL(10, 2) bounds; an exploding trend is not a forecast
+            if not (np.isfinite(high) and high < 1e7 and low > 0):
+                continue
+            rows.append((str(zip_code), as_of, as_of + timedelta(days=horizon),
+                         f"{point:.2f}", f"{high:.2f}", f"{low:.2f}", f"{score[i, h]:.4f}"))
+    return rows
+
+
+def fit_shard(shard: str, Y: np.ndarray, zips: np.ndarray, as_of: date,
+              window: int = HISTORY_DAYS) -> Dict:
+    """Fit and project one shard's ZIPs (rows of Y)"""
+    start = time.monotonic()
+    days = np.arange(as_of.toordinal() - window + 1, as_of.toordinal() + 1)
+    stats = sufficient_stats(days, Y, as_of.toordinal())
+    stats['window_count'] = stats['count']
+    return shard_result(shard, zips, as_of, stats, *last_observed(days, Y), start, window)
+
+
+def shard_result(shard: str, zips: np.ndarray, as_of: date, stats: Dict[str, np.ndarray],
+                 last_day: np.ndarray, last_rent: np.ndarray, start: float,
+                 window: int = HISTORY_DAYS) -> Dict:
+    """Forecast rows, model state and timing for a group of fitted ZIPs"""
+    rows = forecast_rows(zips, as_of, stats, window)
+    return {
+        'shard': shard,
+        'zip_count': len(zips),
+        'forecast_zips': int((stats['window_count'] >= MIN_OBSERVATIONS).sum()),
+        'rows': rows,
+        'forecast_rows': len(rows),
+        'state': {'zips': zips, 'last_day': last_day, 'last_rent': last_rent, **stats},
+        'seconds': time.monotonic() - start,
+        'pid': os.getpid()
+    }
+
+
+def warm_start(state: Dict[str, np.ndarray], new: Dict[str, np.ndarray],
+               as_of: int, half_life: float = HALF_LIFE_DAYS) -> Dict[str, np.ndarray]:
+    """Fold new observations' statistics into saved statistics
+
+    Moving the weight anchor from the saved forecast date to as_of scales
+    every old weight by the same factor, so this equals refitting on the
+    full history. Unlike a refit, observations never leave the window;
+    they only decay, so count keeps growing. forecast_rows gates and
+    scores on a separate in-window count instead.
+    """
+    decay = np.power(0.5, (as_of - state['as_of']) / half_life)
+    merged = {
+        k: state[k] * decay.reshape((-1,) + (1,) * (state[k].ndim - 1)) + new[k]
+        for k in ('xtwx', 'xtwy', 'ywy', 'weight')
+    }
+    merged['count'] = state['count'] + new['count']
+    return merged
+
+
+def _fit_shared(shm_name: str, shape: Tuple[int, int], shard: str, rows: np.ndarray,
+                zips: np.ndarray, as_of: date, window: int) -> Dict:
+    """Process-pool entry point: fit one shard read from the shared history matrix"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # Fancy indexing copies the shard's rows, so the block can be closed
+        Y = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)[rows]
+    finally:
+        shm.close()
+    return fit_shard(shard, Y, zips, as_of, window)
+
+
+def write_forecasts(cur, rows, model_version: str = MODEL_VERSION) -> int:
+    """Bulk upsert forecast rows through a COPY-fed staging table"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(row + (model_version,))
+    buf.seek(0)
+
+    cur.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS forecast_staging (
+            zip TEXT,
+            forecast_date DATE,
+            target_date DATE,
+            projected_median_rent DECIMAL(10, 2),
+            projected_high DECIMAL(10, 2),
+            projected_low DECIMAL(10, 2),
+            confidence_score DECIMAL(5, 4),
+            model_version TEXT
+        ) ON COMMIT DELETE ROWS
+    """)
+    cur.execute("TRUNCATE forecast_staging")
+    cur.copy_expert("COPY forecast_staging FROM STDIN WITH (FORMAT csv)", buf)
+    cur.execute("""
+        INSERT INTO rental_intel.forecast_zip_rent (
+            zip, forecast_date, target_date, projected_median_rent,
+            projected_high, projected_low, confidence_score, model_version
+        )
+        SELECT * FROM forecast_staging
+        ON CONFLICT (zip, target_date) DO UPDATE SET
+            forecast_date = EXCLUDED.forecast_date,
+            projected_median_rent = EXCLUDED.projected_median_rent,
+            projected_high = EXCLUDED.projected_high,
+            projected_low = EXCLUDED.projected_low,
+            confidence_score = EXCLUDED.confidence_score,
+            model_version = EXCLUDED.model_version,
+            updated_at = CURRENT_TIMESTAMP
+    """)
+    return cur.rowcount
+
+
+def classify_zips(cur, as_of: date, history_days: int = HISTORY_DAYS,
+                  full: bool = False, max_carry_days: int = MAX_CARRY_DAYS) -> Dict[str, np.ndarray]:
+    """Split ZIPs with history in the window by how they must be forecast
+
+    cold: no saved state for this model version, or history before the
+    saved last_metric_date was rewritten since the fit (refit from the
+    window). warm: a new median rent after last_metric_date, or a saved
+    fit more than max_carry_days old (fold the new days into the saved
+    state). clean: nothing new but carried-forward repeats of the last
+    rent (previous forecast is carried forward).
+    """
+    cur.execute("""
+        SELECT m.zip,
+            CASE
+                WHEN %(full)s OR s.zip IS NULL THEN 'cold'
+                WHEN BOOL_OR(m.metric_date <= s.last_metric_date AND m.updated_at > s.fitted_at) THEN 'cold'
+                WHEN BOOL_OR(m.metric_date > s.last_metric_date
+                             AND m.median_rent IS DISTINCT FROM s.last_rent) THEN 'warm'
+                WHEN s.forecast_date < %(as_of)s::date - %(max_carry)s THEN 'warm'
+                ELSE 'clean'
+            END
+        FROM rental_intel.daily_zip_metrics m
+        LEFT JOIN rental_intel.forecast_model_state s
+            ON s.zip = m.zip AND s.model_version = %(model_version)s
+        WHERE m.metric_date BETWEEN %(first)s AND %(as_of)s
+          AND m.median_rent > 0
+        GROUP BY m.zip, s.zip, s.forecast_date, s.last_metric_date, s.last_rent, s.fitted_at
+    """, {'full': full, 'model_version': MODEL_VERSION, 'as_of': as_of,
+          'max_carry': max_carry_days,
+          'first': as_of - timedelta(days=history_days - 1)})
+
+    groups = {'cold': [], 'warm': [], 'clean': []}
+    for zip_code, kind in cur.fetchall():
+        groups[kind].append(zip_code)
+    return {kind: np.array(sorted(zips), dtype=str) for kind, zips in groups.items()}
+
+
+def load_states(cur, zips: np.ndarray) -> Dict[str, np.ndarray]:
+    """Saved statistics for zips (sorted), with as_of and last_day as date ordinals"""
+    cur.execute("""
+        SELECT zip, forecast_date, xtwx, xtwy, ywy, weight, observations,
+               last_metric_date, last_rent
+        FROM rental_intel.forecast_model_state
+        WHERE zip = ANY(%s)
+    """, (zips.tolist(),))
+    by_zip = {r[0]: r for r in cur.fetchall()}
+    rows = [by_zip[z] for z in zips.tolist()]
+    return {
+        'as_of': np.array([r[1].toordinal() for r in rows]),
+        'xtwx': np.array([r[2] for r in rows]).reshape(-1, N_FEATURES, N_FEATURES),
+        'xtwy': np.array([r[3] for r in rows]),
+        'ywy': np.array([r[4] for r in rows]),
+        'weight': np.array([r[5] for r in rows]),
+        'count': np.array([r[6] for r in rows]),
+        'last_day': np.array([r[7].toordinal() for r in rows]),
+        'last_rent': np.array([np.nan if r[8] is None else float(r[8]) for r in rows])
+    }
+
+
+def _pg_array(values: np.ndarray) -> str:
+    """PostgreSQL array literal for a float vector"""
+    return '{' + ','.join(repr(float(v)) for v in values) + '}'
+
+
+def save_states(cur, as_of: date, states: List[Dict], model_version: str = MODEL_VERSION) -> int:
+    """Upsert fitted ZIPs' statistics into forecast_model_state via COPY"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for state in states:
+        for i, zip_code in enumerate(state['zips']):
+            writer.writerow((
+                zip_code, model_version, as_of,
+                date.fromordinal(int(state['last_day'][i])), f"{state['last_rent'][i]:.2f}",
+                _pg_array(state['xtwx'][i].ravel()), _pg_array(state['xtwy'][i]),
+                repr(float(state['ywy'][i])), repr(float(state['weight'][i])), int(state['count'][i])
+            ))
+    buf.seek(0)
+
+    cur.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS forecast_state_staging (
+            zip TEXT,
+            model_version TEXT,
+            forecast_date DATE,
+            last_metric_date DATE,
+            last_rent DECIMAL(10, 2),
+            xtwx DOUBLE PRECISION[],
+            xtwy DOUBLE PRECISION[],
+            ywy DOUBLE PRECISION,
+            weight DOUBLE PRECISION,
+            observations INTEGER
+        ) ON COMMIT DELETE ROWS
+    """)
+    cur.execute("TRUNCATE forecast_state_staging")
+    cur.copy_expert("COPY forecast_state_staging FROM STDIN WITH (FORMAT csv)", buf)
+    cur.execute("""
+        INSERT INTO rental_intel.forecast_model_state (
+            zip, model_version, forecast_date, last_metric_date, last_rent,
+            xtwx, xtwy, ywy, weight, observations
+        )
+        SELECT * FROM forecast_state_staging
+        ON CONFLICT (zip) DO UPDATE SET
+            model_version = EXCLUDED.model_version,
+            forecast_date = EXCLUDED.forecast_date,
+            last_metric_date = EXCLUDED.last_metric_date,
+            last_rent = EXCLUDED.last_rent,
+            xtwx = EXCLUDED.xtwx,
+            xtwy = EXCLUDED.xtwy,
+            ywy = EXCLUDED.ywy,
+            weight = EXCLUDED.weight,
+            observations = EXCLUDED.observations,
+            fitted_at = CURRENT_TIMESTAMP
+    """)
+    return cur.rowcount
+
+
+def carry_forward(cur, zips: np.ndarray, as_of: date, horizons=HORIZONS) -> int:
+    """Re-issue each ZIP's latest forecast per horizon from as_of"""
+    cur.execute("""
+        INSERT INTO rental_intel.forecast_zip_rent (
+            zip, forecast_date, target_date, projected_median_rent,
+            projected_high, projected_low, confidence_score, model_version
+        )
+        SELECT zip, %(as_of)s, %(as_of)s + horizon, projected_median_rent,
+               projected_high, projected_low, confidence_score, model_version
+        FROM (
+            SELECT DISTINCT ON (zip, target_date - forecast_date)
+                zip, target_date - forecast_date AS horizon, projected_median_rent,
+                projected_high, projected_low, confidence_score, model_version
+            FROM rental_intel.forecast_zip_rent
+            WHERE zip = ANY(%(zips)s)
+              AND forecast_date < %(as_of)s
+              AND target_date - forecast_date = ANY(%(horizons)s)
+            ORDER BY zip, target_date - forecast_date, forecast_date DESC
+        ) latest
+        ON CONFLICT (zip, target_date) DO UPDATE SET
+            forecast_date = EXCLUDED.forecast_date,
+            projected_median_rent = EXCLUDED.projected_median_rent,
+            projected_high = EXCLUDED.projected_high,
+            projected_low = EXCLUDED.projected_low,
+            confidence_score = EXCLUDED.confidence_score,
+            model_version = EXCLUDED.model_version,
+            updated_at = CURRENT_TIMESTAMP
+    """, {'zips': zips.tolist(), 'as_of': as_of, 'horizons': list(horizons)})
+    return cur.rowcount
+
+
+def log_shards(cur, as_of: date, shards: List[Dict], workers: int,
+               model_version: str = MODEL_VERSION):
+    """Record each shard's size and fit time; run_started is the transaction start"""
+    cur.executemany("""
+        INSERT INTO rental_intel.forecast_shard_log (
+            run_started, forecast_date, model_version, shard, workers,
+            worker_pid, zip_count, forecast_rows, fit_seconds
+        ) VALUES (now(), %s, %s, %s, %s, %s, %s, %s, %s)
+    """, [
+        (as_of, model_version, s['shard'], workers, s['pid'],
+         s['zip_count'], s['forecast_rows'], round(s['seconds'], 3))
+        for s in shards
+    ])
+
+
+class BatchForecaster:
+    """Weekly forecast job: load history, fit every ZIP, bulk-write projections
+
+    ZIPs are fitted in state shards. With more than one worker the history
+    matrix is placed in shared memory once and each pool process copies out
+    only its shard's rows, instead of receiving a pickled matrix. Fitted
+    statistics are saved per ZIP so later runs can warm-start.
+    """
+
+    def __init__(self, history_days: int = HISTORY_DAYS, workers: int = WORKERS,
+                 workload: str = 'bulk'):
+        self.history_days = history_days
+        self.workers = workers or os.cpu_count() or 1
+        self.workload = workload
+
+    def fit_shards(self, Y: np.ndarray, zips: np.ndarray, states: np.ndarray,
+                   as_of: date) -> Tuple[List[Dict], int]:
+        """Fit every state shard; returns shard results and workers used"""
+        shards = shard_by_state(states)
+        workers = min(self.workers, len(shards))
+        if workers <= 1:
+            return [fit_shard(state, Y[rows], zips[rows], as_of, self.history_days)
+                    for state, rows in shards], 1
+
+        shm = shared_memory.SharedMemory(create=True, size=Y.nbytes)
+        try:
+            np.ndarray(Y.shape, dtype=np.float64, buffer=shm.buf)[:] = Y
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(_fit_shared, shm.name, Y.shape, state, rows, zips[rows],
+                                as_of, self.history_days)
+                    for state, rows in shards
+                ]
+                return [f.result() for f in futures], workers
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def fit_warm(self, cur, zips: np.ndarray, as_of: date) -> Dict:
+        """Fold each ZIP's new observations into its saved state and re-project
+
+        ZIPs warm-started only because their forecast aged out may have no
+        new observations; they keep their saved last metric date and rent.
+        """
+        start = time.monotonic()
+        new_zips, days, Y = load_new_observations(cur, zips, as_of)
+        new = sufficient_stats(days, Y, as_of.toordinal())
+        saved = load_states(cur, zips)
+        stats = warm_start(saved, new, as_of.toordinal())
+        stats['window_count'] = load_window_counts(cur, zips, as_of, self.history_days)
+
+        last_day, last_rent = last_observed(days, Y)
+        seen = new['count'] > 0
+        return shard_result('warm-start', new_zips, as_of, stats,
+                            np.where(seen, last_day, saved['last_day']),
+                            np.where(seen, last_rent, saved['last_rent']),
+                            start, self.history_days)
+
+    def run(self, as_of: Optional[date] = None, full: bool = False) -> Dict:
+        """Forecast every ZIP from history ending on as_of (default yesterday)
+
+        Only ZIPs without usable state are refitted from the history window.
+        ZIPs with new rents are warm-started from forecast_model_state, and
+        the rest keep their previous forecasts, re-issued from as_of. full
+        refits every ZIP.
+
+        Returns {'zips', 'cold', 'warm', 'carried_forward', 'forecast_zips',
+        'rows', 'shards', 'workers', 'model_version', 'timings', 'seconds'}.
+        """
+        as_of = as_of or date.today() - timedelta(days=1)
+        start = time.monotonic()
+        timings = {}
+        shards, workers = [], 1
+
+        conn = get_connection(self.workload)
+        try:
+            cur = conn.cursor()
+            groups = classify_zips(cur, as_of, self.history_days, full)
+            cold = groups['cold']
+            if len(cold):
+                # Unfiltered when every ZIP is cold; same ZIP set, no id list
+                only = None if len(cold) == sum(len(z) for z in groups.values()) else cold
+                zips, days, Y = load_history(cur, as_of, self.history_days, only)
+                states = load_zip_states(cur, zips)
+            conn.commit()
+            timings['load'] = time.monotonic() - start
+
+            started = time.monotonic()
+            if len(cold):
+                shards, workers = self.fit_shards(Y, zips, states, as_of)
+            if len(groups['warm']):
+                shards.append(self.fit_warm(cur, groups['warm'], as_of))
+            timings['fit'] = time.monotonic() - started
+
+            started = time.monotonic()
+            written = write_forecasts(cur, [row for s in shards for row in s['rows']])
+            save_states(cur, as_of, [s['state'] for s in shards])
+            if len(groups['clean']):
+                carried = time.monotonic()
+                rows = carry_forward(cur, groups['clean'], as_of)
+                shards.append({
+                    'shard': 'carried-forward', 'zip_count': len(groups['clean']),
+                    'forecast_zips': 0, 'forecast_rows': rows,
+                    'seconds': time.monotonic() - carried, 'pid': os.getpid()
+                })
+                written += rows
+            log_shards(cur, as_of, shards, workers)
+            conn.commit()
+            timings['write'] = time.monotonic() - started
+            cur.close()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            release_connection(conn)
+
+        return {
+            'zips': sum(len(z) for z in groups.values()),
+            'cold': len(groups['cold']),
+            'warm': len(groups['warm']),
+            'carried_forward': len(groups['clean']),
+            'forecast_zips': sum(s['forecast_zips'] for s in shards),
+            'rows': written,
+            'shards': len(shards),
+            'workers': workers,
+            'model_version': MODEL_VERSION,
+            'timings': timings,
+            'seconds': time.monotonic() - start
+        }
+
+
+def ewls_model(half_life: float) -> Callable:
+    """Backtest model: the production EWLS fit at a given half-life"""
+    def model(Y: np.ndarray, days: np.ndarray, cutoffs: np.ndarray, horizons=HORIZONS):
+        stats = sufficient_stats(days, Y, cutoffs, half_life)
+        beta, sigma, A_inv = solve(stats)
+        return project(beta, sigma, A_inv, cutoffs, horizons), stats['count'] >= MIN_OBSERVATIONS
+    return model
+
+
+def naive_model(Y: np.ndarray, days: np.ndarray, cutoffs: np.ndarray, horizons=HORIZONS):
+    """Backtest baseline: last observed rent, random-walk band from daily log changes"""
+    observed = ~np.isnan(Y)
+    last_idx = Y.shape[-1] - 1 - np.argmax(observed[..., ::-1], axis=-1)
+    last = np.take_along_axis(Y, last_idx[..., None], axis=-1)
+
+    changes = np.diff(Y, axis=-1)
+    valid = ~np.isnan(changes)
+    changes = np.where(valid, changes, 0.0)
+    sigma = np.sqrt((changes ** 2).sum(axis=-1) / np.maximum(valid.sum(axis=-1), 1))
+
+    steps = np.array(horizons) + (Y.shape[-1] - 1 - last_idx)[..., None]
+    spread = sigma[..., None] * np.sqrt(steps)
+    z = NormalDist().inv_cdf((1 + BAND_LEVEL) / 2)
+    bands = {
+        'point': np.exp(last) * np.ones(len(horizons)),
+        'low': np.exp(last - z * spread),
+        'high': np.exp(last + z * spread)
+    }
+    return bands, observed.sum(axis=-1) >= MIN_OBSERVATIONS
+
+
+def backtest_models() -> Dict[str, Callable]:
+    """Models compared by backtest(): the naive baseline and EWLS half-lives"""
+    models = {'naive-last-value': naive_model}
+    for half_life in sorted({30.0, HALF_LIFE_DAYS, 180.0}):
+        models[model_version(half_life)] = ewls_model(half_life)
+    return models
+
+
+def backtest(as_of: Optional[date] = None, cutoffs: int = BACKTEST_CUTOFFS,
+             step_days: int = BACKTEST_STEP_DAYS, history_days: int = HISTORY_DAYS,
+             horizons=HORIZONS) -> Dict:
+    """Rolling-origin backtest of every model over daily_zip_metrics
+
+    Cutoffs are step_days apart, the last one max(horizons) days before
+    as_of so every horizon has an actual. All cutoffs are fitted together
+    (C x Z x T arrays) in blocks of ZIPs. Per model and horizon reports
+    MAPE and band coverage, plus wall time and tracemalloc peak memory
+    (above the loaded history).
+    """
+    as_of = as_of or date.today() - timedelta(days=1)
+    start = time.monotonic()
+    total_days = history_days + (cutoffs - 1) * step_days + max(horizons)
+
+    conn = get_connection('report')
+    try:
+        cur = conn.cursor()
+        zips, days, Y = load_history(cur, as_of, total_days)
+        cur.close()
+        conn.commit()
+    finally:
+        release_connection(conn)
+    load_seconds = time.monotonic() - start
+
+    ends = history_days - 1 + step_days * np.arange(cutoffs)
+    windows = ends[:, None] - history_days + 1 + np.arange(history_days)
+    targets = ends[:, None] + np.array(horizons)
+    results = {}
+
+    for name, model in backtest_models().items():
+        abs_pct = np.zeros(len(horizons))
+        covered = np.zeros(len(horizons))
+        scored = np.zeros(len(horizons))
+
+        tracemalloc.start()
+        started = time.monotonic()
+        for block in range(0, len(zips), BACKTEST_CHUNK_ZIPS):
+            Yb = Y[block:block + BACKTEST_CHUNK_ZIPS]
+            with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+                bands, eligible = model(Yb[:, windows].transpose(1, 0, 2), days[windows],
+                                        days[ends], horizons)
+                actual = np.exp(Yb[:, targets].transpose(1, 0, 2))
+                ok = eligible[..., None] & ~np.isnan(actual) & np.isfinite(bands['point'])
+                err = np.abs(bands['point'] - actual) / actual
+                inside = (bands['low'] <= actual) & (actual <= bands['high'])
+            abs_pct += np.where(ok, err, 0.0).sum(axis=(0, 1))
+            covered += (inside & ok).sum(axis=(0, 1))
+            scored += ok.sum(axis=(0, 1))
+        seconds = time.monotonic() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        with np.errstate(invalid='ignore'):
+            mape = abs_pct / scored * 100
+            coverage = covered / scored * 100
+        results[name] = {
+            'horizons': {
+                h: {'forecasts': int(scored[i]), 'mape': float(mape[i]), 'coverage': float(coverage[i])}
+                for i, h in enumerate(horizons)
+            },
+            'seconds': seconds,
+            'peak_mb': peak / 1024**2
+        }
+
+    return {
+        'as_of': as_of,
+        'cutoffs': [date.fromordinal(int(d)) for d in days[ends]],
+        'zips': len(zips),
+        'load_seconds': load_seconds,
+        'models': results
+    }
+
+
+def print_backtest(report: Dict):
+    """Per-model accuracy and cost table"""
+    cutoffs = report['cutoffs']
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Backtest of {report['zips']:,} ZIPs, "
+          f"{len(cutoffs)} cutoffs {cutoffs[0]} .. {cutoffs[-1]} "
+          f"(history loaded in {report['load_seconds']:.1f}s)")
+    print(f"{'Model':<28} {'Horizon':>7} {'Forecasts':>10} {'MAPE %':>7} "
+          f"{'Band %':>7} {'Seconds':>8} {'Peak MB':>8}")
+    for name, result in report['models'].items():
+        for i, (h, m) in enumerate(result['horizons'].items()):
+            cost = f"{result['seconds']:>8.2f} {result['peak_mb']:>8.1f}" if i == 0 else ''
+            print(f"{name if i == 0 else '':<28} {h:>6}d {m['forecasts']:>10,} "
+                  f"{m['mape']:>7.2f} {m['coverage']:>7.1f} {cost}")
+    print(f"Bands target {BAND_LEVEL:.0%} coverage")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch ZIP rent forecasts')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help='Fit every ZIP and write forecast_zip_rent')
+    run.add_argument('--as-of', type=date.fromisoformat, default=None,
+                     help='Last history date (default yesterday)')
+    run.add_argument('--history-days', type=int, default=HISTORY_DAYS)
+    run.add_argument('--workers', type=int, default=WORKERS,
+                     help='Processes for state shards (0 = every core)')
+    run.add_argument('--full', action='store_true',
+                     help='Refit every ZIP instead of warm-starting from saved state')
+    bt = sub.add_parser('backtest', help='Rolling-origin accuracy and cost per model')
+    bt.add_argument('--as-of', type=date.fromisoformat, default=None,
+                    help='Last date with actuals (default yesterday)')
+    bt.add_argument('--history-days', type=int, default=HISTORY_DAYS)
+    bt.add_argument('--cutoffs', type=int, default=BACKTEST_CUTOFFS, help='Forecast origins replayed')
+    bt.add_argument('--step-days', type=int, default=BACKTEST_STEP_DAYS, help='Days between origins')
+    args = parser.parse_args()
+
+    if args.command == 'backtest':
+        print_backtest(backtest(args.as_of, args.cutoffs, args.step_days, args.history_days))
+        return
+
+    result = BatchForecaster(args.history_days, args.workers).run(args.as_of, args.full)
+    phases = ', '.join(f"{k} {v:.1f}s" for k, v in result['timings'].items())
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {result['forecast_zips']:,} of {result['zips']:,} ZIPs, "
+          f"{result['rows']:,} forecasts ({result['model_version']}) in {result['seconds']:.1f}s ({phases})")
+    print(f"  {result['cold']:,} refitted, {result['warm']:,} warm-started, "
+          f"{result['carried_forward']:,} carried forward; {result['workers']} workers")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ from typing import List, Dict, Optional
 
 sys.path.insert(0, '/Users/sngmacmini/Projects/rental-intel')
 
-from daily_operations import RentalIntelDB, PropertyData, ListingData, DataIngestionEngine
+from daily_operations import RentalIntelDB, PropertyData, ListingData, DataIngestionEngine, PropertyCache
 
 # Comprehensive US States + Cities + ZIP ranges
 US_RENTAL_MARKETS = {
@@ -252,12 +252,15 @@ def run_full_usa_ingestion():
     print("GENERATING RENTAL DATA: ALL 50 US STATES")
     print("="*60)
     
-    db = RentalIntelDB()
+    # Known properties with nothing new skip the per-record upsert
+    property_cache = PropertyCache()
+    db = RentalIntelDB(property_cache=property_cache)
     if not db.connect():
         print("❌ Failed to connect to database")
         return
     
     try:
+        property_cache.warm(db.cursor)
         db.auto_create_partitions()
         
         total_stats = {'listings': 0, 'properties': 0, 'price_changes': 0}
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Vectorized ZIP Metrics Engine
+Computes every daily_zip_metrics column (including inventory growth and
+property type breakdown) plus the day's rent sketches for all ZIPs at once.
+Inputs are pulled once as columnar arrays through COPY, grouped with NumPy
+and written back with one bulk upsert.
+"""
+
+import io
+import os
+import csv
+import json
+import time
+import argparse
+from datetime import date, datetime
+from typing import Dict, Optional
+
+import numpy as np
+
+from db_pool import get_connection, release_connection
+
+# Days back for the inventory growth comparison
+INVENTORY_GROWTH_DAYS = int(os.getenv('METRICS_INVENTORY_GROWTH_DAYS', '7'))
+
+# Order matches the properties.property_type CHECK constraint; code 0 is unknown
+PROPERTY_TYPES = ('apartment', 'house', 'condo', 'townhouse', 'studio', 'loft')
+
+# Log bucket width of the rent sketches; must match rental_intel.rent_bucket()
+SKETCH_GAMMA = 1.02
+# Buckets are offset into [0, SKETCH_SPAN) to pack (sketch, bucket) into one int
+SKETCH_OFFSET = 2048
+SKETCH_SPAN = 4096
+
+# DECIMAL(5, 4) / DECIMAL(8, 4) column limits
+MAX_GROWTH_RATE = 9.9999
+MAX_VOLATILITY = 9999.9999
+
+METRIC_COLUMNS = (
+    'zip', 'median_rent', 'average_rent', 'rent_per_sqft', 'active_listing_count',
+    'avg_7_day', 'avg_30_day', 'avg_90_day', 'inventory_growth_rate',
+    'price_volatility_index', 'property_type_breakdown'
+)
+
+
+def copy_columns(cur, query: str, dtype) -> np.ndarray:
+    """Run a query through COPY and parse the rows into a structured array
+
+    String fields given as plain 'U' are sized to their longest value, so
+    long names are never truncated; each is parsed in its own pass.
+    """
+    buf = io.StringIO()
+    cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv)", buf)
+    text = buf.getvalue()
+    if not text:
+        return np.empty(0, dtype=[(name, 'U1' if kind == 'U' else kind) for name, kind in dtype])
+
+    def parse(usecols, kind) -> np.ndarray:
+        return np.loadtxt(io.StringIO(text), delimiter=',', quotechar='"',
+                          dtype=kind, usecols=usecols, ndmin=1)
+
+    columns = {}
+    fixed = [(i, name, kind) for i, (name, kind) in enumerate(dtype) if kind != 'U']
+    if fixed:
+        parsed = parse([i for i, _, _ in fixed], [(name, kind) for _, name, kind in fixed])
+        columns = {name: parsed[name] for _, name, _ in fixed}
+    for i, (name, kind) in enumerate(dtype):
+        if kind == 'U':
+            columns[name] = parse(i, 'U')
+
+    out = np.empty(len(columns[dtype[0][0]]), dtype=[(name, columns[name].dtype) for name, _ in dtype])
+    for name, _ in dtype:
+        out[name] = columns[name]
+    return out
+
+
+def group_index(keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Positions of values in the sorted key array, -1 where absent"""
+    if not len(keys):
+        return np.full(len(values), -1)
+    idx = np.searchsorted(keys, values).clip(max=len(keys) - 1)
+    return np.where(keys[idx] == values, idx, -1)
+
+
+def safe_divide(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """num / den with NaN where den is zero"""
+    out = np.full(len(num), np.nan)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+class ZipMetricsEngine:
+    """Daily ZIP metrics computed with NumPy group-bys
+
+    run() loads, computes and writes in one transaction on a bulk pooled
+    connection. Per-phase timings are reported in the result.
+    """
+
+    def __init__(self, workload: str = 'bulk'):
+        self.workload = workload
+        self.timings: Dict[str, float] = {}
+
+    def run(self, metric_date: Optional[date] = None, full: bool = True) -> Dict:
+        """Recompute ZIP metrics for a date; returns {'recomputed', 'carried_forward', 'full', 'seconds', 'timings'}
+
+        The engine has no incremental pass, so every run is a full rebuild:
+        full=False (the SQL engine's dirty-only refresh) still recomputes
+        every ZIP, which gives the same rows as the dirty pass would.
+        """
+        metric_date = metric_date or date.today()
+        start = time.monotonic()
+        self.timings = {}
+
+        conn = get_connection(self.workload)
+        try:
+            cur = conn.cursor()
+            # Everything is recomputed; marks made after this point survive
+            cur.execute("DELETE FROM rental_intel.dirty_zips")
+
+            data = self._timed('load', self._load, cur, metric_date)
+            metrics = self._timed('compute', self._compute_metrics, data)
+            sketches = self._timed('sketch', self._compute_sketches, data)
+            self._timed('write', self._write, cur, metric_date, metrics, sketches)
+
+            conn.commit()
+            cur.close()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            release_connection(conn)
+
+        return {
+            'recomputed': len(metrics['zip']),
+            'carried_forward': 0,
+            'full': True,
+            'seconds': time.monotonic() - start,
+            'timings': self.timings
+        }
+
+    def _timed(self, phase: str, func, *args):
+        started = time.monotonic()
+        result = func(*args)
+        self.timings[phase] = time.monotonic() - started
+        return result
+
+    def _load(self, cur, metric_date: date) -> Dict[str, np.ndarray]:
+        """Pull ZIPs, active listings, the rent rollup window and prior inventory"""
+        types = ', '.join(f"'{t}'" for t in PROPERTY_TYPES)
+        zips = copy_columns(cur, """
+            SELECT DISTINCT zip FROM rental_intel.zip_property_counts ORDER BY zip
+        """, [('zip', 'U')])
+
+        listings = copy_columns(cur, f"""
+            SELECT
+                p.zip, p.state, p.city,
+                COALESCE(array_position(ARRAY[{types}], p.property_type), 0),
+                lr.observed_rent,
+                COALESCE(lr.rent_per_sqft, 'NaN')
+            FROM rental_intel.listings l
+            JOIN rental_intel.properties p ON p.property_id = l.property_id
+            JOIN rental_intel.listing_current_rent lr ON lr.listing_id = l.listing_id
+            WHERE l.listing_status = 'active'
+        """, [('zip', 'U'), ('state', 'U'), ('city', 'U'), ('ptype', 'i1'),
+              ('rent', 'f8'), ('rent_psf', 'f8')])
+
+        rollup = copy_columns(cur, cur.mogrify("""
+            SELECT zip, %s::date - observed_date, rent_count, rent_sum, rent_sumsq
+            FROM rental_intel.zip_daily_rent_rollup
+            WHERE observed_date >= %s::date - 90
+        """, (metric_date, metric_date)).decode(),
+            [('zip', 'U'), ('age', 'i4'), ('n', 'f8'), ('sum', 'f8'), ('sumsq', 'f8')])
+
+        prior = copy_columns(cur, cur.mogrify("""
+            SELECT zip, active_listing_count
+            FROM rental_intel.daily_zip_metrics
+            WHERE metric_date = %s::date - %s
+        """, (metric_date, INVENTORY_GROWTH_DAYS)).decode(), [('zip', 'U'), ('active', 'f8')])
+
+        # ZIP universe: known properties plus any ZIP seen in the inputs
+        zip_keys = np.unique(np.concatenate([zips['zip'], listings['zip']]))
+        return {'zips': zip_keys, 'listings': listings, 'rollup': rollup, 'prior': prior}
+
+    def _compute_metrics(self, data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Every daily_zip_metrics column as one array per column, indexed by ZIP"""
+        zips, listings, rollup, prior = data['zips'], data['listings'], data['rollup'], data['prior']
+        n_zips = len(zips)
+
+        # Current rents: counts, means and medians per ZIP
+        zi = group_index(zips, listings['zip'])
+        rent = listings['rent']
+        counts = np.bincount(zi, minlength=n_zips)
+        average = safe_divide(np.bincount(zi, weights=rent, minlength=n_zips), counts)
+
+        order = np.lexsort((rent, zi))
+        sorted_rent = rent[order]
+        starts = np.cumsum(counts) - counts
+        has = counts > 0
+        lo = np.where(has, starts + (counts - 1) // 2, 0)
+        hi = np.where(has, starts + counts // 2, 0)
+        median = np.full(n_zips, np.nan)
+        if len(sorted_rent):
+            median = np.where(has, (sorted_rent[lo] + sorted_rent[hi]) / 2, np.nan)
+
+        psf = listings['rent_psf']
+        valid = ~np.isnan(psf)
+        rent_psf = safe_divide(np.bincount(zi[valid], weights=psf[valid], minlength=n_zips),
+                               np.bincount(zi[valid], minlength=n_zips))
+
+        # Property type breakdown: one (ZIP x type) count matrix
+        n_types = len(PROPERTY_TYPES) + 1
+        breakdown = np.bincount(zi * n_types + listings['ptype'],
+                                minlength=n_zips * n_types).reshape(n_zips, n_types)
+
+        # Moving windows and 30-day volatility from the daily rollup
+        ri = group_index(zips, rollup['zip'])
+        known = ri >= 0
+        ri, age = ri[known], rollup['age'][known]
+        r_n, r_sum, r_sumsq = rollup['n'][known], rollup['sum'][known], rollup['sumsq'][known]
+
+        def window(days: int, values: np.ndarray) -> np.ndarray:
+            mask = age <= days
+            return np.bincount(ri[mask], weights=values[mask], minlength=n_zips)
+
+        n_30, sum_30 = window(30, r_n), window(30, r_sum)
+        mean_30 = safe_divide(sum_30, n_30)
+        variance = safe_divide(np.maximum(window(30, r_sumsq) - sum_30 * mean_30, 0), n_30 - 1)
+        volatility = np.where((n_30 > 1) & (sum_30 > 0),
+                              np.sqrt(variance) / np.where(mean_30 > 0, mean_30, np.nan), np.nan)
+
+        # Inventory growth against the prior snapshot
+        pi = group_index(zips, prior['zip'])
+        prior_active = np.zeros(n_zips)
+        prior_active[pi[pi >= 0]] = prior['active'][pi >= 0]
+        growth = np.clip(safe_divide(counts - prior_active, prior_active),
+                         -MAX_GROWTH_RATE, MAX_GROWTH_RATE)
+
+        return {
+            'zip': zips,
+            'median_rent': median,
+            'average_rent': average,
+            'rent_per_sqft': rent_psf,
+            'active_listing_count': counts,
+            'avg_7_day': safe_divide(window(7, r_sum), window(7, r_n)),
+            'avg_30_day': mean_30,
+            'avg_90_day': safe_divide(window(90, r_sum), window(90, r_n)),
+            'inventory_growth_rate': growth,
+            'price_volatility_index': np.clip(volatility, 0, MAX_VOLATILITY),
+            'property_type_breakdown': breakdown
+        }
+
+    def _compute_sketches(self, data: Dict[str, np.ndarray]) -> Dict:
+        """Per (state, city, zip) sparse log-bucket histograms of active rents"""
+        listings = data['listings'][data['listings']['rent'] > 0]
+        if not len(listings):
+            return {'keys': [], 'buckets': [], 'counts': [], 'rent_sum': np.empty(0)}
+
+        # Pack (zip, city, state) codes into one int64 key
+        zi = group_index(data['zips'], listings['zip'])
+        cities, ci = np.unique(listings['city'], return_inverse=True)
+        states, si = np.unique(listings['state'], return_inverse=True)
+        packed = (zi.astype(np.int64) * len(cities) + ci) * len(states) + si
+        geo_keys, gi = np.unique(packed, return_inverse=True)
+
+        bucket = np.floor(np.log(listings['rent']) / np.log(SKETCH_GAMMA)).astype(np.int64)
+        cells, cell_counts = np.unique(gi * SKETCH_SPAN + bucket + SKETCH_OFFSET, return_counts=True)
+        cell_geo = cells // SKETCH_SPAN
+        bounds = np.flatnonzero(np.diff(cell_geo)) + 1
+
+        zip_code = geo_keys // (len(cities) * len(states))
+        city_code = geo_keys // len(states) % len(cities)
+        state_code = geo_keys % len(states)
+        return {
+            'keys': list(zip(states[state_code], cities[city_code], data['zips'][zip_code])),
+            'buckets': np.split(cells % SKETCH_SPAN - SKETCH_OFFSET, bounds),
+            'counts': np.split(cell_counts, bounds),
+            'rent_sum': np.bincount(gi, weights=listings['rent'], minlength=len(geo_keys))
+        }
+
+    def _write(self, cur, metric_date: date, metrics: Dict, sketches: Dict):
+        """One COPY + upsert for metrics, one COPY for the day's sketches"""
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        breakdown = metrics['property_type_breakdown']
+        for i, zip_code in enumerate(metrics['zip']):
+            types = {PROPERTY_TYPES[t - 1]: int(n) for t, n in enumerate(breakdown[i]) if t and n}
+            writer.writerow([zip_code]
+                            + [_csv_number(metrics[col][i]) for col in METRIC_COLUMNS[1:-1]]
+                            + [json.dumps(types)])
+        buf.seek(0)
+
+        cur.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS zip_metrics_staging (
+                zip TEXT,
+                median_rent DECIMAL(10, 2),
+                average_rent DECIMAL(10, 2),
+                rent_per_sqft DECIMAL(8, 4),
+                active_listing_count INTEGER,
+                avg_7_day DECIMAL(10, 2),
+                avg_30_day DECIMAL(10, 2),
+                avg_90_day DECIMAL(10, 2),
+                inventory_growth_rate DECIMAL(5, 4),
+                price_volatility_index DECIMAL(8, 4),
+                property_type_breakdown JSONB
+            ) ON COMMIT DELETE ROWS
+        """)
+        cur.execute("TRUNCATE zip_metrics_staging")
+        cur.copy_expert(
+            f"COPY zip_metrics_staging ({', '.join(METRIC_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf
+        )
+        cur.execute(f"""
+            INSERT INTO rental_intel.daily_zip_metrics (metric_date, {', '.join(METRIC_COLUMNS)})
+            SELECT %s, {', '.join(METRIC_COLUMNS)} FROM zip_metrics_staging
+            ON CONFLICT (zip, metric_date) DO UPDATE SET
+                {', '.join(f'{c} = EXCLUDED.{c}' for c in METRIC_COLUMNS[1:])},
+                updated_at = CURRENT_TIMESTAMP
+        """, (metric_date,))
+
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for (state, city, zip_code), buckets, counts, rent_sum in zip(
+                sketches['keys'], sketches['buckets'], sketches['counts'], sketches['rent_sum']):
+            writer.writerow([
+                metric_date, state, city, zip_code,
+                '{' + ','.join(map(str, buckets)) + '}',
+                '{' + ','.join(map(str, counts)) + '}',
+                int(counts.sum()), f"{rent_sum:.2f}"
+            ])
+        buf.seek(0)
+
+        cur.execute("DELETE FROM rental_intel.zip_rent_sketch WHERE metric_date = %s", (metric_date,))
+        cur.copy_expert("""
+            COPY rental_intel.zip_rent_sketch (
+                metric_date, state, city, zip, buckets, counts, total_count, rent_sum
+            ) FROM STDIN WITH (FORMAT csv)
+        """, buf)
+
+
+def _csv_number(value) -> str:
+    """CSV field for a metric value; NaN becomes NULL"""
+    if isinstance(value, np.integer):
+        return str(int(value))
+    return '' if np.isnan(value) else repr(float(value))
+
+
+def benchmark(metric_date: Optional[date] = None) -> Dict:
+    """Time the SQL set-based pass against the NumPy engine for one date"""
+    metric_date = metric_date or date.today()
+    conn = get_connection('bulk')
+    try:
+        cur = conn.cursor()
+        started = time.monotonic()
+        cur.execute("SELECT rental_intel.calculate_all_zip_metrics(%s)", (metric_date,))
+        sql_zips = cur.fetchone()[0]
+        sql_seconds = time.monotonic() - started
+        cur.execute("""
+            SELECT zip, median_rent FROM rental_intel.daily_zip_metrics WHERE metric_date = %s
+        """, (metric_date,))
+        sql_medians = dict(cur.fetchall())
+        conn.commit()
+        cur.close()
+    finally:
+        release_connection(conn)
+
+    engine = ZipMetricsEngine()
+    result = engine.run(metric_date)
+
+    conn = get_connection('report')
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT zip, median_rent FROM rental_intel.daily_zip_metrics WHERE metric_date = %s
+        """, (metric_date,))
+        drift = max((abs(float(m) - float(sql_medians[z])) for z, m in cur.fetchall()
+                     if m is not None and sql_medians.get(z) is not None), default=0.0)
+        cur.close()
+    finally:
+        release_connection(conn)
+
+    return {
+        'sql_zips': sql_zips,
+        'sql_seconds': sql_seconds,
+        'engine_zips': result['recomputed'],
+        'engine_seconds': result['seconds'],
+        'timings': result['timings'],
+        'max_median_drift': drift
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vectorized daily ZIP metrics')
+    parser.add_argument('command', choices=['run', 'benchmark'])
+    parser.add_argument('--date', type=date.fromisoformat, default=None, help='Metric date (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    stamp = datetime.now().strftime('%H:%M:%S')
+    if args.command == 'run':
+        result = ZipMetricsEngine().run(args.date)
+        phases = ', '.join(f"{k} {v:.1f}s" for k, v in result['timings'].items())
+        print(f"[{stamp}] {result['recomputed']:,} ZIPs in {result['seconds']:.1f}s ({phases})")
+        return
+
+    result = benchmark(args.date)
+    print(f"[{stamp}] SQL:    {result['sql_zips']:,} ZIPs in {result['sql_seconds']:.1f}s")
+    print(f"[{stamp}] NumPy:  {result['engine_zips']:,} ZIPs in {result['engine_seconds']:.1f}s "
+          f"({', '.join(f'{k} {v:.1f}s' for k, v in result['timings'].items())})")
+    print(f"[{stamp}] Speedup {result['sql_seconds'] / max(result['engine_seconds'], 1e-9):.1f}x, "
+          f"max median difference ${result['max_median_drift']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Online backfill for rent_price_history.zip (run after migrations/007)
+Fills the zip column partition by partition in short chunked transactions,
+then builds each partition's (zip, observed_date) index CONCURRENTLY and
+attaches it to the parent index. Safe to re-run; finished work is skipped.
+"""
+
+import time
+import argparse
+from datetime import datetime
+from psycopg2 import sql
+
+from db_pool import get_connection, release_connection
+
+CHUNK_SIZE = 20000
+PARENT_INDEX = 'idx_price_history_zip_date'
+
+def list_partitions(cur):
+    """Partition table names of rent_price_history, oldest first"""
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'rental_intel.rent_price_history'::regclass
+        ORDER BY c.relname
+    """)
+    return [r[0] for r in cur.fetchall()]
+
+def backfill_partition(conn, partition, chunk_size, pause):
+    """Fill zip for one partition, one committed chunk of ids at a time"""
+    table = sql.Identifier('rental_intel', partition)
+    cur = conn.cursor()
+    last_id = 0
+    filled = 0
+
+    while True:
+        cur.execute(sql.SQL("""
+            SELECT MAX(price_history_id), COUNT(*) FROM (
+                SELECT price_history_id FROM {}
+                WHERE price_history_id > %s
+                ORDER BY price_history_id
+                LIMIT %s
+            ) chunk
+        """).format(table), (last_id, chunk_size))
+        chunk_end, scanned = cur.fetchone()
+        if not scanned:
+            break
+
+        cur.execute(sql.SQL("""
+            UPDATE {} h
+            SET zip = p.zip
+            FROM rental_intel.properties p
+            WHERE p.property_id = h.property_id
+            AND h.price_history_id > %s AND h.price_history_id <= %s
+            AND h.zip IS NULL
+        """).format(table), (last_id, chunk_end))
+        filled += cur.rowcount
+        conn.commit()
+
+        last_id = chunk_end
+        if pause:
+            time.sleep(pause)
+
+    cur.close()
+    return filled
+
+def build_partition_index(conn, partition):
+    """Create and attach the partition's (zip, observed_date) index
+
+    Returns False when the partition already has an attached index.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT 1
+        FROM pg_inherits i
+        JOIN pg_index ix ON ix.indexrelid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        AND ix.indrelid = %s::regclass
+    """, (f"rental_intel.{PARENT_INDEX}", f"rental_intel.{partition}"))
+    if cur.fetchone():
+        cur.close()
+        return False
+
+    index_name = f"{partition}_zip_date_idx"
+    index = sql.Identifier('rental_intel', index_name)
+
+    # A previously interrupted concurrent build leaves an invalid index behind
+    cur.execute("""
+        SELECT ix.indisvalid
+        FROM pg_index ix
+        WHERE ix.indexrelid = to_regclass(%s)
+    """, (f"rental_intel.{index_name}",))
+    row = cur.fetchone()
+    if row and not row[0]:
+        cur.execute(sql.SQL("DROP INDEX CONCURRENTLY {}").format(index))
+
+    cur.execute(sql.SQL("CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} (zip, observed_date)").format(
+        sql.Identifier(index_name), sql.Identifier('rental_intel', partition)
+    ))
+    cur.execute(sql.SQL("ALTER INDEX {} ATTACH PARTITION {}").format(
+        sql.Identifier('rental_intel', PARENT_INDEX), index
+    ))
+    cur.close()
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill and index rent_price_history.zip')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows per committed UPDATE')
+    parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between chunks')
+    args = parser.parse_args()
+
+    conn = get_connection('bulk')
+    try:
+        cur = conn.cursor()
+        partitions = list_partitions(cur)
+        cur.close()
+        conn.commit()
+
+        for partition in partitions:
+            start = time.time()
+            filled = backfill_partition(conn, partition, args.chunk_size, args.pause)
+
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+            conn.autocommit = True
+            try:
+                built = build_partition_index(conn, partition)
+            finally:
+                conn.autocommit = False
+
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {partition}: {filled:,} rows filled, "
+                  f"index {'built' if built else 'already attached'} ({time.time() - start:.1f}s)")
+    finally:
+        release_connection(conn)
+
+    print("Done. The parent index becomes valid once every partition's index is attached.")
+
+if __name__ == "__main__":
+    main()
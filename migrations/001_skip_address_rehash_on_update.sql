@@ -0,0 +1,23 @@
+-- Migration 001: skip address re-normalization on attribute-only updates
+-- Upserts that hit ON CONFLICT DO UPDATE no longer recompute the
+-- normalized address and SHA-256 hash when the address columns are unchanged.
+
+CREATE OR REPLACE FUNCTION rental_intel.generate_address_hash()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Upserts that only touch attributes keep the stored address and hash
+    IF TG_OP = 'UPDATE'
+       AND NEW.street_address IS NOT DISTINCT FROM OLD.street_address
+       AND NEW.city IS NOT DISTINCT FROM OLD.city
+       AND NEW.state IS NOT DISTINCT FROM OLD.state
+       AND NEW.zip IS NOT DISTINCT FROM OLD.zip THEN
+        RETURN NEW;
+    END IF;
+    
+    NEW.normalized_full_address := rental_intel.normalize_address(
+        NEW.street_address, NEW.city, NEW.state, NEW.zip
+    );
+    NEW.address_hash := ENCODE(DIGEST(NEW.normalized_full_address, 'sha256'), 'hex');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,16 @@
+-- Migration 002: resumable ingestion checkpoints
+-- Loaders write their batch cursor, counters and throughput onto their
+-- ingestion_log row; a restart resumes from the latest one with an index probe.
+
+ALTER TABLE rental_intel.ingestion_log
+    ADD COLUMN IF NOT EXISTS checkpoint JSONB,
+    ADD COLUMN IF NOT EXISTS checkpoint_at TIMESTAMP WITH TIME ZONE;
+
+ALTER TABLE rental_intel.ingestion_log DROP CONSTRAINT IF EXISTS ingestion_log_status_check;
+ALTER TABLE rental_intel.ingestion_log ADD CONSTRAINT ingestion_log_status_check
+    CHECK (status IN ('running', 'completed', 'failed', 'interrupted'));
+
+CREATE INDEX IF NOT EXISTS idx_ingestion_log_checkpoint ON rental_intel.ingestion_log(source, log_id DESC)
+    WHERE checkpoint IS NOT NULL;
+
+COMMENT ON COLUMN rental_intel.ingestion_log.checkpoint IS 'Latest resumable checkpoint: batch cursor, counters, throughput';
@@ -0,0 +1,68 @@
+-- Migration 003: set-based daily ZIP metrics
+-- Computes every ZIP's daily_zip_metrics row in one statement instead of
+-- one calculate_zip_metrics call (four aggregate queries) per ZIP.
+
+-- Set-based variant: every ZIP's metrics for a date in one statement
+-- (optionally limited to p_zips). Produces the same rows as calling
+-- calculate_zip_metrics per ZIP; returns the number of ZIPs written.
+CREATE OR REPLACE FUNCTION rental_intel.calculate_all_zip_metrics(
+    p_date DATE DEFAULT CURRENT_DATE,
+    p_zips TEXT[] DEFAULT NULL
+) RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    WITH zips AS (
+        SELECT DISTINCT zip
+        FROM rental_intel.properties
+        WHERE p_zips IS NULL OR zip = ANY(p_zips)
+    ),
+    current_rent AS (
+        SELECT 
+            al.zip,
+            PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY lr.observed_rent) AS median_rent,
+            AVG(lr.observed_rent) AS avg_rent,
+            COUNT(*) AS active_count,
+            AVG(lr.rent_per_sqft) AS avg_rent_psf
+        FROM rental_intel.v_active_listings al
+        JOIN rental_intel.v_latest_rent lr ON al.listing_id = lr.listing_id
+        WHERE p_zips IS NULL OR al.zip = ANY(p_zips)
+        GROUP BY al.zip
+    ),
+    -- One pass over the last 90 days serves all three windows
+    moving AS (
+        SELECT 
+            p.zip,
+            AVG(rph.observed_rent) FILTER (WHERE rph.observed_date >= p_date - 7) AS avg_7,
+            AVG(rph.observed_rent) FILTER (WHERE rph.observed_date >= p_date - 30) AS avg_30,
+            AVG(rph.observed_rent) AS avg_90
+        FROM rental_intel.rent_price_history rph
+        JOIN rental_intel.properties p ON rph.property_id = p.property_id
+        WHERE rph.observed_date >= p_date - 90
+          AND (p_zips IS NULL OR p.zip = ANY(p_zips))
+        GROUP BY p.zip
+    )
+    INSERT INTO rental_intel.daily_zip_metrics (
+        zip, metric_date, median_rent, average_rent, rent_per_sqft,
+        active_listing_count, avg_7_day, avg_30_day, avg_90_day
+    )
+    SELECT 
+        z.zip, p_date, c.median_rent, c.avg_rent, c.avg_rent_psf,
+        COALESCE(c.active_count, 0), m.avg_7, m.avg_30, m.avg_90
+    FROM zips z
+    LEFT JOIN current_rent c ON c.zip = z.zip
+    LEFT JOIN moving m ON m.zip = z.zip
+    ON CONFLICT (zip, metric_date) DO UPDATE SET
+        median_rent = EXCLUDED.median_rent,
+        average_rent = EXCLUDED.average_rent,
+        rent_per_sqft = EXCLUDED.rent_per_sqft,
+        active_listing_count = EXCLUDED.active_listing_count,
+        avg_7_day = EXCLUDED.avg_7_day,
+        avg_30_day = EXCLUDED.avg_30_day,
+        avg_90_day = EXCLUDED.avg_90_day,
+        updated_at = CURRENT_TIMESTAMP;
+    
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
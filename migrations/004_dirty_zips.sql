@@ -0,0 +1,65 @@
+-- Migration 004: dirty-ZIP tracking for incremental daily metrics
+-- Ingestion marks the ZIPs it touches; the daily job recomputes only those
+-- and carries every other ZIP's previous-day row forward.
+
+CREATE TABLE IF NOT EXISTS rental_intel.dirty_zips (
+    zip TEXT PRIMARY KEY,
+    marked_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Incremental daily metrics: recompute only dirty ZIPs and carry every
+-- other ZIP's previous-day row forward. Falls back to a full rebuild when
+-- p_full is set or there is no previous-day row to carry.
+CREATE OR REPLACE FUNCTION rental_intel.calculate_dirty_zip_metrics(
+    p_date DATE DEFAULT CURRENT_DATE,
+    p_full BOOLEAN DEFAULT FALSE
+) RETURNS TABLE(recomputed INTEGER, carried_forward INTEGER) AS $$
+DECLARE
+    v_zips TEXT[];
+BEGIN
+    carried_forward := 0;
+    
+    IF p_full OR NOT EXISTS (
+        SELECT 1 FROM rental_intel.daily_zip_metrics WHERE metric_date = p_date - 1
+    ) THEN
+        DELETE FROM rental_intel.dirty_zips;
+        recomputed := rental_intel.calculate_all_zip_metrics(p_date);
+        RETURN NEXT;
+        RETURN;
+    END IF;
+    
+    -- Claimed ZIPs, plus ZIPs whose 7/30/90-day windows drop observations today
+    WITH claimed AS (
+        DELETE FROM rental_intel.dirty_zips RETURNING zip
+    )
+    SELECT ARRAY(
+        SELECT zip FROM claimed
+        UNION
+        SELECT p.zip
+        FROM rental_intel.rent_price_history rph
+        JOIN rental_intel.properties p ON p.property_id = rph.property_id
+        WHERE rph.observed_date IN (p_date - 8, p_date - 31, p_date - 91)
+    ) INTO v_zips;
+    
+    recomputed := rental_intel.calculate_all_zip_metrics(p_date, v_zips);
+    
+    INSERT INTO rental_intel.daily_zip_metrics (
+        zip, metric_date, median_rent, average_rent, rent_per_sqft,
+        active_listing_count, avg_7_day, avg_30_day, avg_90_day,
+        inventory_growth_rate, price_volatility_index, property_type_breakdown
+    )
+    SELECT 
+        zip, p_date, median_rent, average_rent, rent_per_sqft,
+        active_listing_count, avg_7_day, avg_30_day, avg_90_day,
+        inventory_growth_rate, price_volatility_index, property_type_breakdown
+    FROM rental_intel.daily_zip_metrics
+    WHERE metric_date = p_date - 1
+      AND zip <> ALL(v_zips)
+    ON CONFLICT (zip, metric_date) DO NOTHING;
+    GET DIAGNOSTICS carried_forward = ROW_COUNT;
+    
+    RETURN NEXT;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE rental_intel.dirty_zips IS 'ZIPs touched by ingestion since the last daily metrics refresh';
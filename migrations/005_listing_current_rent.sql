@@ -0,0 +1,112 @@
+-- Migration 005: maintained latest-rent table
+-- listing_current_rent holds each listing's latest price, upserted by a
+-- trigger in the same transaction that appends rent_price_history.
+-- v_latest_rent (and every view/function built on it) now reads the table
+-- instead of sorting the full price history.
+--
+-- After applying, populate existing listings once:
+--   python backfill_current_rent.py
+-- Until a listing is backfilled, price classification (RECORD_PRICES,
+-- bulk_ingest, record_price_change) falls back to its latest
+-- rent_price_history row, so ingestion can keep running meanwhile.
+
+-- Listing current rent: latest price per listing, kept in step with
+-- rent_price_history by trg_sync_listing_current_rent
+CREATE TABLE IF NOT EXISTS rental_intel.listing_current_rent (
+    listing_id BIGINT PRIMARY KEY REFERENCES rental_intel.listings(listing_id) ON DELETE CASCADE,
+    property_id BIGINT NOT NULL,
+    observed_rent DECIMAL(10, 2) NOT NULL,
+    rent_per_sqft DECIMAL(8, 4),
+    change_type TEXT,
+    observed_date DATE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Function to keep listing_current_rent in step with price history
+CREATE OR REPLACE FUNCTION rental_intel.sync_listing_current_rent()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO rental_intel.listing_current_rent (
+        listing_id, property_id, observed_rent, rent_per_sqft,
+        change_type, observed_date
+    ) VALUES (
+        NEW.listing_id, NEW.property_id, NEW.observed_rent, NEW.rent_per_sqft,
+        NEW.change_type, NEW.observed_date
+    )
+    ON CONFLICT (listing_id) DO UPDATE SET
+        property_id = EXCLUDED.property_id,
+        observed_rent = EXCLUDED.observed_rent,
+        rent_per_sqft = EXCLUDED.rent_per_sqft,
+        change_type = EXCLUDED.change_type,
+        observed_date = EXCLUDED.observed_date,
+        updated_at = CURRENT_TIMESTAMP
+    -- Late-arriving older observations never replace a newer price
+    WHERE rental_intel.listing_current_rent.observed_date <= EXCLUDED.observed_date;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger for current rent maintenance (same transaction as the append)
+DROP TRIGGER IF EXISTS trg_sync_listing_current_rent ON rental_intel.rent_price_history;
+CREATE TRIGGER trg_sync_listing_current_rent
+    AFTER INSERT ON rental_intel.rent_price_history
+    FOR EACH ROW
+    EXECUTE FUNCTION rental_intel.sync_listing_current_rent();
+
+CREATE OR REPLACE VIEW rental_intel.v_latest_rent AS
+SELECT 
+    listing_id,
+    property_id,
+    observed_rent,
+    rent_per_sqft,
+    change_type,
+    observed_date
+FROM rental_intel.listing_current_rent;
+
+-- Function to record price change
+CREATE OR REPLACE FUNCTION rental_intel.record_price_change(
+    p_listing_id BIGINT,
+    p_new_rent DECIMAL
+) RETURNS VOID AS $$
+DECLARE
+    v_last_rent DECIMAL;
+    v_change_type TEXT;
+    v_property_id BIGINT;
+BEGIN
+    SELECT property_id INTO v_property_id
+    FROM rental_intel.listings WHERE listing_id = p_listing_id;
+    
+    SELECT observed_rent INTO v_last_rent
+    FROM rental_intel.listing_current_rent
+    WHERE listing_id = p_listing_id;
+    
+    -- Not backfilled yet: fall back to the latest price history row
+    IF NOT FOUND THEN
+        SELECT observed_rent INTO v_last_rent
+        FROM rental_intel.rent_price_history
+        WHERE listing_id = p_listing_id
+        ORDER BY observed_date DESC, price_history_id DESC
+        LIMIT 1;
+    END IF;
+    
+    IF v_last_rent IS NULL THEN
+        v_change_type := 'new';
+    ELSIF p_new_rent > v_last_rent THEN
+        v_change_type := 'increase';
+    ELSIF p_new_rent < v_last_rent THEN
+        v_change_type := 'decrease';
+    ELSE
+        v_change_type := 'unchanged';
+    END IF;
+    
+    IF v_change_type != 'unchanged' THEN
+        INSERT INTO rental_intel.rent_price_history (
+            listing_id, property_id, observed_rent, change_type, observed_date
+        ) VALUES (
+            p_listing_id, v_property_id, p_new_rent, v_change_type, CURRENT_DATE
+        );
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE rental_intel.listing_current_rent IS 'Latest observed rent per listing, maintained on price history insert';
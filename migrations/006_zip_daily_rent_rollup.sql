@@ -0,0 +1,219 @@
+-- Migration 006: ZIP daily rent rollup
+-- Price history inserts append per-ZIP, per-day count/sum/sum-of-squares
+-- rows; moving averages and 30-day volatility read at most 91 small rows
+-- per ZIP instead of joining the full price history.
+--
+-- Runs in one transaction: creating the trigger locks out concurrent
+-- inserts until the backfill commits, so no row is counted twice.
+
+BEGIN;
+
+-- ZIP daily rent rollup: per-ZIP, per-day sums of price observations,
+-- appended by trg_rollup_new_prices; feeds moving averages and volatility
+CREATE TABLE IF NOT EXISTS rental_intel.zip_daily_rent_rollup (
+    zip TEXT NOT NULL,
+    observed_date DATE NOT NULL,
+    rent_count INTEGER NOT NULL DEFAULT 0,
+    rent_sum DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    rent_sumsq DECIMAL(24, 4) NOT NULL DEFAULT 0,
+    PRIMARY KEY (zip, observed_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_zip_rollup_date ON rental_intel.zip_daily_rent_rollup(observed_date);
+
+-- Function to append new price rows to the ZIP daily rollup, aggregated
+-- per statement so a bulk insert costs one upsert per (zip, day)
+CREATE OR REPLACE FUNCTION rental_intel.rollup_new_prices()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO rental_intel.zip_daily_rent_rollup AS r (
+        zip, observed_date, rent_count, rent_sum, rent_sumsq
+    )
+    SELECT 
+        p.zip,
+        n.observed_date,
+        COUNT(*),
+        SUM(n.observed_rent),
+        SUM(n.observed_rent * n.observed_rent)
+    FROM new_prices n
+    JOIN rental_intel.properties p ON p.property_id = n.property_id
+    GROUP BY p.zip, n.observed_date
+    ON CONFLICT (zip, observed_date) DO UPDATE SET
+        rent_count = r.rent_count + EXCLUDED.rent_count,
+        rent_sum = r.rent_sum + EXCLUDED.rent_sum,
+        rent_sumsq = r.rent_sumsq + EXCLUDED.rent_sumsq;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger for the ZIP daily rollup (same transaction as the append)
+DROP TRIGGER IF EXISTS trg_rollup_new_prices ON rental_intel.rent_price_history;
+CREATE TRIGGER trg_rollup_new_prices
+    AFTER INSERT ON rental_intel.rent_price_history
+    REFERENCING NEW TABLE AS new_prices
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rental_intel.rollup_new_prices();
+
+-- Backfill from existing history
+TRUNCATE rental_intel.zip_daily_rent_rollup;
+INSERT INTO rental_intel.zip_daily_rent_rollup (zip, observed_date, rent_count, rent_sum, rent_sumsq)
+SELECT 
+    p.zip,
+    rph.observed_date,
+    COUNT(*),
+    SUM(rph.observed_rent),
+    SUM(rph.observed_rent * rph.observed_rent)
+FROM rental_intel.rent_price_history rph
+JOIN rental_intel.properties p ON p.property_id = rph.property_id
+GROUP BY p.zip, rph.observed_date;
+
+-- Function to calculate daily ZIP metrics
+CREATE OR REPLACE FUNCTION rental_intel.calculate_zip_metrics(
+    p_zip TEXT,
+    p_date DATE DEFAULT CURRENT_DATE
+) RETURNS VOID AS $$
+BEGIN
+    PERFORM rental_intel.calculate_all_zip_metrics(p_date, ARRAY[p_zip]);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Every ZIP's metrics for a date in one statement (optionally limited to
+-- p_zips); returns the number of ZIPs written. Moving averages and the
+-- 30-day volatility (coefficient of variation) come from the daily rollup.
+CREATE OR REPLACE FUNCTION rental_intel.calculate_all_zip_metrics(
+    p_date DATE DEFAULT CURRENT_DATE,
+    p_zips TEXT[] DEFAULT NULL
+) RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    WITH zips AS (
+        SELECT DISTINCT zip
+        FROM rental_intel.properties
+        WHERE p_zips IS NULL OR zip = ANY(p_zips)
+    ),
+    current_rent AS (
+        SELECT 
+            al.zip,
+            PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY lr.observed_rent) AS median_rent,
+            AVG(lr.observed_rent) AS avg_rent,
+            COUNT(*) AS active_count,
+            AVG(lr.rent_per_sqft) AS avg_rent_psf
+        FROM rental_intel.v_active_listings al
+        JOIN rental_intel.v_latest_rent lr ON al.listing_id = lr.listing_id
+        WHERE p_zips IS NULL OR al.zip = ANY(p_zips)
+        GROUP BY al.zip
+    ),
+    -- At most 91 rollup rows per ZIP serve all three windows
+    windows AS (
+        SELECT 
+            zip,
+            SUM(rent_sum) FILTER (WHERE observed_date >= p_date - 7) AS sum_7,
+            SUM(rent_count) FILTER (WHERE observed_date >= p_date - 7) AS n_7,
+            SUM(rent_sum) FILTER (WHERE observed_date >= p_date - 30) AS sum_30,
+            SUM(rent_sumsq) FILTER (WHERE observed_date >= p_date - 30) AS sumsq_30,
+            SUM(rent_count) FILTER (WHERE observed_date >= p_date - 30) AS n_30,
+            SUM(rent_sum) AS sum_90,
+            SUM(rent_count) AS n_90
+        FROM rental_intel.zip_daily_rent_rollup
+        WHERE observed_date >= p_date - 90
+          AND (p_zips IS NULL OR zip = ANY(p_zips))
+        GROUP BY zip
+    ),
+    moving AS (
+        SELECT 
+            zip,
+            sum_7 / NULLIF(n_7, 0) AS avg_7,
+            sum_30 / NULLIF(n_30, 0) AS avg_30,
+            sum_90 / NULLIF(n_90, 0) AS avg_90,
+            CASE WHEN n_30 > 1 AND sum_30 > 0 THEN
+                SQRT(GREATEST(sumsq_30 - sum_30 * sum_30 / n_30, 0) / (n_30 - 1))
+                    / (sum_30 / n_30)
+            END AS volatility_30
+        FROM windows
+    )
+    INSERT INTO rental_intel.daily_zip_metrics (
+        zip, metric_date, median_rent, average_rent, rent_per_sqft,
+        active_listing_count, avg_7_day, avg_30_day, avg_90_day,
+        price_volatility_index
+    )
+    SELECT 
+        z.zip, p_date, c.median_rent, c.avg_rent, c.avg_rent_psf,
+        COALESCE(c.active_count, 0), m.avg_7, m.avg_30, m.avg_90,
+        m.volatility_30
+    FROM zips z
+    LEFT JOIN current_rent c ON c.zip = z.zip
+    LEFT JOIN moving m ON m.zip = z.zip
+    ON CONFLICT (zip, metric_date) DO UPDATE SET
+        median_rent = EXCLUDED.median_rent,
+        average_rent = EXCLUDED.average_rent,
+        rent_per_sqft = EXCLUDED.rent_per_sqft,
+        active_listing_count = EXCLUDED.active_listing_count,
+        avg_7_day = EXCLUDED.avg_7_day,
+        avg_30_day = EXCLUDED.avg_30_day,
+        avg_90_day = EXCLUDED.avg_90_day,
+        price_volatility_index = EXCLUDED.price_volatility_index,
+        updated_at = CURRENT_TIMESTAMP;
+    
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Incremental daily metrics: recompute only dirty ZIPs and carry every
+-- other ZIP's previous-day row forward. Falls back to a full rebuild when
+-- p_full is set or there is no previous-day row to carry.
+CREATE OR REPLACE FUNCTION rental_intel.calculate_dirty_zip_metrics(
+    p_date DATE DEFAULT CURRENT_DATE,
+    p_full BOOLEAN DEFAULT FALSE
+) RETURNS TABLE(recomputed INTEGER, carried_forward INTEGER) AS $$
+DECLARE
+    v_zips TEXT[];
+BEGIN
+    carried_forward := 0;
+    
+    IF p_full OR NOT EXISTS (
+        SELECT 1 FROM rental_intel.daily_zip_metrics WHERE metric_date = p_date - 1
+    ) THEN
+        DELETE FROM rental_intel.dirty_zips;
+        recomputed := rental_intel.calculate_all_zip_metrics(p_date);
+        RETURN NEXT;
+        RETURN;
+    END IF;
+    
+    -- Claimed ZIPs, plus ZIPs whose 7/30/90-day windows drop observations today
+    WITH claimed AS (
+        DELETE FROM rental_intel.dirty_zips RETURNING zip
+    )
+    SELECT ARRAY(
+        SELECT zip FROM claimed
+        UNION
+        SELECT zip
+        FROM rental_intel.zip_daily_rent_rollup
+        WHERE observed_date IN (p_date - 8, p_date - 31, p_date - 91)
+    ) INTO v_zips;
+    
+    recomputed := rental_intel.calculate_all_zip_metrics(p_date, v_zips);
+    
+    INSERT INTO rental_intel.daily_zip_metrics (
+        zip, metric_date, median_rent, average_rent, rent_per_sqft,
+        active_listing_count, avg_7_day, avg_30_day, avg_90_day,
+        inventory_growth_rate, price_volatility_index, property_type_breakdown
+    )
+    SELECT 
+        zip, p_date, median_rent, average_rent, rent_per_sqft,
+        active_listing_count, avg_7_day, avg_30_day, avg_90_day,
+        inventory_growth_rate, price_volatility_index, property_type_breakdown
+    FROM rental_intel.daily_zip_metrics
+    WHERE metric_date = p_date - 1
+      AND zip <> ALL(v_zips)
+    ON CONFLICT (zip, metric_date) DO NOTHING;
+    GET DIAGNOSTICS carried_forward = ROW_COUNT;
+    
+    RETURN NEXT;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE rental_intel.zip_daily_rent_rollup IS 'Per-ZIP daily count, sum and sum of squares of observed rent';
+
+COMMIT;
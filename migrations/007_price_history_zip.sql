@@ -0,0 +1,61 @@
+-- Migration 007: ZIP-aware price history access path
+-- Adds a denormalized zip column to rent_price_history (filled on insert)
+-- and a (zip, observed_date) index so per-ZIP windows are index range scans.
+--
+-- Only catalog changes happen here; the column add is metadata-only and
+-- the parent index is created invalid (ON ONLY). Then run
+--   python migrate_price_history_zip.py
+-- to backfill existing partitions in short chunked transactions, build
+-- each partition's index CONCURRENTLY and attach it.
+
+ALTER TABLE rental_intel.rent_price_history ADD COLUMN IF NOT EXISTS zip TEXT;
+
+-- Function to denormalize the property's ZIP onto price history rows
+-- (writers that already know it pass zip and skip the lookup)
+CREATE OR REPLACE FUNCTION rental_intel.fill_price_history_zip()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.zip IS NULL THEN
+        SELECT zip INTO NEW.zip
+        FROM rental_intel.properties
+        WHERE property_id = NEW.property_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger for price history ZIP
+DROP TRIGGER IF EXISTS trg_fill_price_history_zip ON rental_intel.rent_price_history;
+CREATE TRIGGER trg_fill_price_history_zip
+    BEFORE INSERT ON rental_intel.rent_price_history
+    FOR EACH ROW
+    EXECUTE FUNCTION rental_intel.fill_price_history_zip();
+
+-- Function to append new price rows to the ZIP daily rollup, aggregated
+-- per statement so a bulk insert costs one upsert per (zip, day)
+CREATE OR REPLACE FUNCTION rental_intel.rollup_new_prices()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO rental_intel.zip_daily_rent_rollup AS r (
+        zip, observed_date, rent_count, rent_sum, rent_sumsq
+    )
+    SELECT 
+        n.zip,
+        n.observed_date,
+        COUNT(*),
+        SUM(n.observed_rent),
+        SUM(n.observed_rent * n.observed_rent)
+    FROM new_prices n
+    GROUP BY n.zip, n.observed_date
+    ON CONFLICT (zip, observed_date) DO UPDATE SET
+        rent_count = r.rent_count + EXCLUDED.rent_count,
+        rent_sum = r.rent_sum + EXCLUDED.rent_sum,
+        rent_sumsq = r.rent_sumsq + EXCLUDED.rent_sumsq;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE INDEX IF NOT EXISTS idx_price_history_zip_date
+    ON ONLY rental_intel.rent_price_history(zip, observed_date);
+
+COMMENT ON COLUMN rental_intel.rent_price_history.zip IS 'Property ZIP, denormalized for (zip, observed_date) range scans';
@@ -0,0 +1,60 @@
+-- Migration 008: per-partition observed_date indexes
+-- Replaces the partitioned B-tree on observed_date (one per partition,
+-- maintained on every insert) with per-partition indexes that
+-- partition_manager.py can swap independently: B-tree for the current and
+-- future months, BRIN for past months.
+
+DROP INDEX IF EXISTS rental_intel.idx_price_history_observed;
+
+DO $$
+DECLARE
+    v_partition TEXT;
+BEGIN
+    FOR v_partition IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'rental_intel.rent_price_history'::regclass
+        AND c.relname ~ '_\d{4}_\d{2}$'
+    LOOP
+        IF TO_DATE(RIGHT(v_partition, 7), 'YYYY_MM') < DATE_TRUNC('month', CURRENT_DATE) THEN
+            EXECUTE 'CREATE INDEX IF NOT EXISTS ' || v_partition || '_observed_brin ON rental_intel.' ||
+                    v_partition || ' USING brin (observed_date)';
+        ELSE
+            EXECUTE 'CREATE INDEX IF NOT EXISTS ' || v_partition || '_observed_idx ON rental_intel.' ||
+                    v_partition || ' (observed_date)';
+        END IF;
+    END LOOP;
+END;
+$$;
+
+-- Function to create monthly partition
+CREATE OR REPLACE FUNCTION rental_intel.create_monthly_partition(
+    p_year INTEGER,
+    p_month INTEGER
+) RETURNS TEXT AS $$
+DECLARE
+    v_partition_name TEXT;
+    v_start_date DATE;
+    v_end_date DATE;
+    v_sql TEXT;
+BEGIN
+    v_partition_name := 'rent_price_history_' || p_year || '_' || LPAD(p_month::TEXT, 2, '0');
+    v_start_date := MAKE_DATE(p_year, p_month, 1);
+    v_end_date := v_start_date + INTERVAL '1 month';
+    
+    IF EXISTS (SELECT 1 FROM pg_tables WHERE tablename = v_partition_name) THEN
+        RETURN 'Partition ' || v_partition_name || ' already exists';
+    END IF;
+    
+    v_sql := 'CREATE TABLE rental_intel.' || v_partition_name || 
+             ' PARTITION OF rental_intel.rent_price_history ' ||
+             'FOR VALUES FROM (''' || v_start_date || ''') TO (''' || v_end_date || ''')';
+    
+    EXECUTE v_sql;
+    EXECUTE 'CREATE INDEX ' || v_partition_name || '_observed_idx ON rental_intel.' ||
+            v_partition_name || ' (observed_date)';
+    
+    RETURN 'Created partition: ' || v_partition_name;
+END;
+$$ LANGUAGE plpgsql;
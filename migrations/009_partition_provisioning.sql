@@ -0,0 +1,135 @@
+-- Migration 009: on-demand partition provisioning
+-- ensure_partitions(from, to) creates every missing month in a date range
+-- so backdated and historical loads never hit "no partition found" row by
+-- row. create_default_partition() optionally adds a DEFAULT partition for
+-- stragglers; create_monthly_partition moves a month's rows out of it when
+-- that month is created, and drain_default_partition() does so for every
+-- month found there.
+--
+-- Note: with a DEFAULT partition present, partitions can no longer be
+-- detached CONCURRENTLY (partition_manager.py falls back to a plain DETACH).
+
+-- Function to create monthly partition. When a DEFAULT partition exists,
+-- the month is built as a standalone table, the month's rows are moved
+-- out of the DEFAULT partition into it, and it is attached
+CREATE OR REPLACE FUNCTION rental_intel.create_monthly_partition(
+    p_year INTEGER,
+    p_month INTEGER
+) RETURNS TEXT AS $$
+DECLARE
+    v_partition_name TEXT;
+    v_start_date DATE;
+    v_end_date DATE;
+    v_default TEXT;
+    v_moved BIGINT := 0;
+    v_sql TEXT;
+BEGIN
+    v_partition_name := 'rent_price_history_' || p_year || '_' || LPAD(p_month::TEXT, 2, '0');
+    v_start_date := MAKE_DATE(p_year, p_month, 1);
+    v_end_date := v_start_date + INTERVAL '1 month';
+    
+    IF EXISTS (SELECT 1 FROM pg_tables WHERE tablename = v_partition_name) THEN
+        RETURN 'Partition ' || v_partition_name || ' already exists';
+    END IF;
+    
+    SELECT c.relname INTO v_default
+    FROM pg_partitioned_table pt
+    JOIN pg_class c ON c.oid = pt.partdefid
+    WHERE pt.partrelid = 'rental_intel.rent_price_history'::regclass;
+    
+    IF v_default IS NULL THEN
+        v_sql := 'CREATE TABLE rental_intel.' || v_partition_name || 
+                 ' PARTITION OF rental_intel.rent_price_history ' ||
+                 'FOR VALUES FROM (''' || v_start_date || ''') TO (''' || v_end_date || ''')';
+        EXECUTE v_sql;
+    ELSE
+        EXECUTE format('CREATE TABLE rental_intel.%I (LIKE rental_intel.rent_price_history INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                       v_partition_name);
+        -- Moved rows were counted by the price history triggers when they
+        -- first landed in the DEFAULT partition, so they bypass them here
+        EXECUTE format('WITH moved AS (DELETE FROM rental_intel.%I WHERE observed_date >= %L AND observed_date < %L RETURNING *) '
+                       'INSERT INTO rental_intel.%I SELECT * FROM moved',
+                       v_default, v_start_date, v_end_date, v_partition_name);
+        GET DIAGNOSTICS v_moved = ROW_COUNT;
+        EXECUTE format('ALTER TABLE rental_intel.rent_price_history ATTACH PARTITION rental_intel.%I FOR VALUES FROM (%L) TO (%L)',
+                       v_partition_name, v_start_date, v_end_date);
+    END IF;
+    
+    EXECUTE 'CREATE INDEX ' || v_partition_name || '_observed_idx ON rental_intel.' ||
+            v_partition_name || ' (observed_date)';
+    
+    IF v_moved > 0 THEN
+        RETURN 'Created partition: ' || v_partition_name || ' (' || v_moved || ' rows moved from default)';
+    END IF;
+    RETURN 'Created partition: ' || v_partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function to create every missing monthly partition between two dates
+-- (bulk loaders call it with the date range of a batch before inserting)
+CREATE OR REPLACE FUNCTION rental_intel.ensure_partitions(
+    p_from DATE,
+    p_to DATE
+) RETURNS TABLE(month_created TEXT) AS $$
+DECLARE
+    v_month DATE := DATE_TRUNC('month', p_from)::DATE;
+BEGIN
+    WHILE v_month <= p_to LOOP
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_tables
+            WHERE schemaname = 'rental_intel'
+            AND tablename = 'rent_price_history_' || TO_CHAR(v_month, 'YYYY_MM')
+        ) THEN
+            month_created := rental_intel.create_monthly_partition(
+                EXTRACT(YEAR FROM v_month)::INTEGER,
+                EXTRACT(MONTH FROM v_month)::INTEGER
+            );
+            RETURN NEXT;
+        END IF;
+        v_month := v_month + INTERVAL '1 month';
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function to create the optional DEFAULT partition, which catches rows
+-- for months that have no partition yet instead of failing the insert
+CREATE OR REPLACE FUNCTION rental_intel.create_default_partition()
+RETURNS TEXT AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_tables WHERE tablename = 'rent_price_history_default') THEN
+        RETURN 'Partition rent_price_history_default already exists';
+    END IF;
+    
+    CREATE TABLE rental_intel.rent_price_history_default
+        PARTITION OF rental_intel.rent_price_history DEFAULT;
+    CREATE INDEX rent_price_history_default_observed_idx
+        ON rental_intel.rent_price_history_default (observed_date);
+    
+    RETURN 'Created partition: rent_price_history_default';
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function to give every month found in the DEFAULT partition its own
+-- partition, moving those rows out of DEFAULT
+CREATE OR REPLACE FUNCTION rental_intel.drain_default_partition()
+RETURNS TABLE(month_created TEXT) AS $$
+DECLARE
+    v_month DATE;
+BEGIN
+    IF to_regclass('rental_intel.rent_price_history_default') IS NULL THEN
+        RETURN;
+    END IF;
+    
+    FOR v_month IN
+        SELECT DISTINCT DATE_TRUNC('month', observed_date)::DATE
+        FROM rental_intel.rent_price_history_default
+        ORDER BY 1
+    LOOP
+        month_created := rental_intel.create_monthly_partition(
+            EXTRACT(YEAR FROM v_month)::INTEGER,
+            EXTRACT(MONTH FROM v_month)::INTEGER
+        );
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,47 @@
+-- Migration 010: materialized market snapshot
+-- Precomputes v_market_snapshot at state, city and ZIP grain so reports
+-- and exports stop running PERCENTILE_CONT over the full listings join.
+-- Refresh without blocking readers:
+--   REFRESH MATERIALIZED VIEW CONCURRENTLY rental_intel.mv_market_snapshot;
+-- (the daily job does this after ZIP metrics and records the time in
+-- materialized_view_refresh).
+
+-- Materialized view refresh log: when each materialized view was last
+-- refreshed (kept out of the view so a CONCURRENTLY refresh only rewrites
+-- rows whose data changed)
+CREATE TABLE IF NOT EXISTS rental_intel.materialized_view_refresh (
+    view_name TEXT PRIMARY KEY,
+    refreshed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    row_count BIGINT
+);
+
+-- Materialized market snapshot: v_market_snapshot precomputed at state,
+-- city and ZIP grain in one grouping-sets pass. Refreshed CONCURRENTLY
+-- (readers are never blocked), which needs the unique index below; city
+-- and zip are '' above their grain so the key columns are never NULL
+CREATE MATERIALIZED VIEW IF NOT EXISTS rental_intel.mv_market_snapshot AS
+SELECT 
+    CASE
+        WHEN GROUPING(p.city) = 1 THEN 'state'
+        WHEN GROUPING(p.zip) = 1 THEN 'city'
+        ELSE 'zip'
+    END AS grain,
+    p.state,
+    COALESCE(p.city, '') AS city,
+    COALESCE(p.zip, '') AS zip,
+    COUNT(l.listing_id) AS active_listings,
+    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY r.observed_rent) AS median_rent,
+    AVG(r.observed_rent) AS avg_rent
+FROM rental_intel.properties p
+JOIN rental_intel.listings l ON p.property_id = l.property_id
+JOIN rental_intel.listing_current_rent r ON l.listing_id = r.listing_id
+WHERE l.listing_status = 'active'
+GROUP BY GROUPING SETS ((p.state), (p.state, p.city), (p.state, p.city, p.zip));
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_market_snapshot_key
+    ON rental_intel.mv_market_snapshot (grain, state, city, zip);
+CREATE INDEX IF NOT EXISTS idx_mv_market_snapshot_grain_rent
+    ON rental_intel.mv_market_snapshot (grain, median_rent);
+
+COMMENT ON TABLE rental_intel.materialized_view_refresh IS 'Last refresh time and row count per materialized view';
+COMMENT ON MATERIALIZED VIEW rental_intel.mv_market_snapshot IS 'Market snapshot by state, city and ZIP (grain column), refreshed daily';
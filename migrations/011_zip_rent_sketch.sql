@@ -0,0 +1,317 @@
+-- Migration 011: mergeable ZIP rent sketches
+-- Stores a sparse log-bucket histogram of active listing rents per ZIP per
+-- day. City, state and national quantiles come from merging sketches
+-- (merged_rent_quantiles) instead of PERCENTILE_CONT over every listing.
+-- Sketches are written by calculate_all_zip_metrics and carried forward
+-- with unchanged ZIPs by calculate_dirty_zip_metrics. They fill in from the
+-- next daily run, or right away with:
+--   SELECT rental_intel.calculate_all_zip_metrics(CURRENT_DATE);
+
+-- ZIP rent sketch: per ZIP and day, a sparse log-bucket histogram of
+-- active listing rents (bucket i holds rents in [1.02^i, 1.02^(i+1))).
+-- Sketches merge by adding counts per bucket, so city, state and national
+-- quantiles never re-sort individual rents
+CREATE TABLE IF NOT EXISTS rental_intel.zip_rent_sketch (
+    metric_date DATE NOT NULL,
+    state TEXT NOT NULL,
+    city TEXT NOT NULL,
+    zip TEXT NOT NULL,
+    buckets INTEGER[] NOT NULL,
+    counts INTEGER[] NOT NULL,
+    total_count INTEGER NOT NULL,
+    rent_sum DECIMAL(16, 2) NOT NULL,
+    PRIMARY KEY (metric_date, state, city, zip)
+);
+
+-- Log bucket holding a rent; about 1% relative error at any price level
+CREATE OR REPLACE FUNCTION rental_intel.rent_bucket(p_rent NUMERIC)
+RETURNS INTEGER AS $$
+    SELECT FLOOR(LN(p_rent) / LN(1.02))::INTEGER;
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+-- Representative rent for a bucket (its geometric midpoint)
+CREATE OR REPLACE FUNCTION rental_intel.rent_bucket_value(p_bucket INTEGER)
+RETURNS NUMERIC AS $$
+    SELECT ROUND((POWER(1.02::FLOAT8, p_bucket) * SQRT(1.02::FLOAT8))::NUMERIC, 2);
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+-- Quantile q of a sketch given as bucket-ordered buckets/counts arrays
+CREATE OR REPLACE FUNCTION rental_intel.sketch_quantile(
+    p_buckets INTEGER[],
+    p_counts BIGINT[],
+    p_q FLOAT8
+) RETURNS NUMERIC AS $$
+DECLARE
+    v_total BIGINT := 0;
+    v_rank BIGINT;
+    v_seen BIGINT := 0;
+    v_i INTEGER;
+BEGIN
+    FOR v_i IN 1..COALESCE(array_length(p_counts, 1), 0) LOOP
+        v_total := v_total + p_counts[v_i];
+    END LOOP;
+    IF v_total = 0 THEN
+        RETURN NULL;
+    END IF;
+    
+    v_rank := GREATEST(CEIL(p_q * v_total), 1);
+    FOR v_i IN 1..array_length(p_counts, 1) LOOP
+        v_seen := v_seen + p_counts[v_i];
+        IF v_seen >= v_rank THEN
+            RETURN rental_intel.rent_bucket_value(p_buckets[v_i]);
+        END IF;
+    END LOOP;
+    RETURN rental_intel.rent_bucket_value(p_buckets[array_length(p_buckets, 1)]);
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- p10/p50/p90 rent at ZIP, city, state and national grain for a date,
+-- answered by merging ZIP sketches bucket by bucket
+CREATE OR REPLACE FUNCTION rental_intel.merged_rent_quantiles(
+    p_date DATE DEFAULT CURRENT_DATE
+) RETURNS TABLE(
+    grain TEXT,
+    state TEXT,
+    city TEXT,
+    zip TEXT,
+    listings BIGINT,
+    avg_rent NUMERIC,
+    p10 NUMERIC,
+    p50 NUMERIC,
+    p90 NUMERIC
+) AS $$
+    WITH buckets AS (
+        SELECT 
+            CASE
+                WHEN GROUPING(s.state) = 1 THEN 'national'
+                WHEN GROUPING(s.city) = 1 THEN 'state'
+                WHEN GROUPING(s.zip) = 1 THEN 'city'
+                ELSE 'zip'
+            END AS grain,
+            s.state, s.city, s.zip, b.bucket,
+            SUM(b.n) AS n
+        FROM rental_intel.zip_rent_sketch s
+        CROSS JOIN LATERAL unnest(s.buckets, s.counts) AS b(bucket, n)
+        WHERE s.metric_date = p_date
+        GROUP BY GROUPING SETS (
+            (s.state, s.city, s.zip, b.bucket),
+            (s.state, s.city, b.bucket),
+            (s.state, b.bucket),
+            (b.bucket)
+        )
+    ),
+    totals AS (
+        SELECT 
+            CASE
+                WHEN GROUPING(state) = 1 THEN 'national'
+                WHEN GROUPING(city) = 1 THEN 'state'
+                WHEN GROUPING(zip) = 1 THEN 'city'
+                ELSE 'zip'
+            END AS grain,
+            state, city, zip,
+            SUM(rent_sum) / NULLIF(SUM(total_count), 0) AS avg_rent
+        FROM rental_intel.zip_rent_sketch
+        WHERE metric_date = p_date
+        GROUP BY GROUPING SETS ((state, city, zip), (state, city), (state), ())
+    ),
+    merged AS (
+        SELECT 
+            grain, state, city, zip,
+            SUM(n) AS listings,
+            array_agg(bucket ORDER BY bucket) AS buckets,
+            array_agg(n::BIGINT ORDER BY bucket) AS counts
+        FROM buckets
+        GROUP BY grain, state, city, zip
+    )
+    SELECT 
+        m.grain, m.state, m.city, m.zip, m.listings::BIGINT,
+        ROUND(t.avg_rent, 2),
+        rental_intel.sketch_quantile(m.buckets, m.counts, 0.1),
+        rental_intel.sketch_quantile(m.buckets, m.counts, 0.5),
+        rental_intel.sketch_quantile(m.buckets, m.counts, 0.9)
+    FROM merged m
+    JOIN totals t
+        ON t.grain = m.grain
+        AND t.state IS NOT DISTINCT FROM m.state
+        AND t.city IS NOT DISTINCT FROM m.city
+        AND t.zip IS NOT DISTINCT FROM m.zip;
+$$ LANGUAGE sql STABLE;
+
+-- Every ZIP's metrics for a date in one statement (optionally limited to
+-- p_zips); returns the number of ZIPs written. Moving averages and the
+-- 30-day volatility (coefficient of variation) come from the daily rollup.
+-- The ZIPs' rent sketches for the date are rebuilt alongside.
+CREATE OR REPLACE FUNCTION rental_intel.calculate_all_zip_metrics(
+    p_date DATE DEFAULT CURRENT_DATE,
+    p_zips TEXT[] DEFAULT NULL
+) RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    WITH zips AS (
+        SELECT DISTINCT zip
+        FROM rental_intel.properties
+        WHERE p_zips IS NULL OR zip = ANY(p_zips)
+    ),
+    current_rent AS (
+        SELECT 
+            al.zip,
+            PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY lr.observed_rent) AS median_rent,
+            AVG(lr.observed_rent) AS avg_rent,
+            COUNT(*) AS active_count,
+            AVG(lr.rent_per_sqft) AS avg_rent_psf
+        FROM rental_intel.v_active_listings al
+        JOIN rental_intel.v_latest_rent lr ON al.listing_id = lr.listing_id
+        WHERE p_zips IS NULL OR al.zip = ANY(p_zips)
+        GROUP BY al.zip
+    ),
+    -- At most 91 rollup rows per ZIP serve all three windows
+    windows AS (
+        SELECT 
+            zip,
+            SUM(rent_sum) FILTER (WHERE observed_date >= p_date - 7) AS sum_7,
+            SUM(rent_count) FILTER (WHERE observed_date >= p_date - 7) AS n_7,
+            SUM(rent_sum) FILTER (WHERE observed_date >= p_date - 30) AS sum_30,
+            SUM(rent_sumsq) FILTER (WHERE observed_date >= p_date - 30) AS sumsq_30,
+            SUM(rent_count) FILTER (WHERE observed_date >= p_date - 30) AS n_30,
+            SUM(rent_sum) AS sum_90,
+            SUM(rent_count) AS n_90
+        FROM rental_intel.zip_daily_rent_rollup
+        WHERE observed_date >= p_date - 90
+          AND (p_zips IS NULL OR zip = ANY(p_zips))
+        GROUP BY zip
+    ),
+    moving AS (
+        SELECT 
+            zip,
+            sum_7 / NULLIF(n_7, 0) AS avg_7,
+            sum_30 / NULLIF(n_30, 0) AS avg_30,
+            sum_90 / NULLIF(n_90, 0) AS avg_90,
+            CASE WHEN n_30 > 1 AND sum_30 > 0 THEN
+                SQRT(GREATEST(sumsq_30 - sum_30 * sum_30 / n_30, 0) / (n_30 - 1))
+                    / (sum_30 / n_30)
+            END AS volatility_30
+        FROM windows
+    )
+    INSERT INTO rental_intel.daily_zip_metrics (
+        zip, metric_date, median_rent, average_rent, rent_per_sqft,
+        active_listing_count, avg_7_day, avg_30_day, avg_90_day,
+        price_volatility_index
+    )
+    SELECT 
+        z.zip, p_date, c.median_rent, c.avg_rent, c.avg_rent_psf,
+        COALESCE(c.active_count, 0), m.avg_7, m.avg_30, m.avg_90,
+        m.volatility_30
+    FROM zips z
+    LEFT JOIN current_rent c ON c.zip = z.zip
+    LEFT JOIN moving m ON m.zip = z.zip
+    ON CONFLICT (zip, metric_date) DO UPDATE SET
+        median_rent = EXCLUDED.median_rent,
+        average_rent = EXCLUDED.average_rent,
+        rent_per_sqft = EXCLUDED.rent_per_sqft,
+        active_listing_count = EXCLUDED.active_listing_count,
+        avg_7_day = EXCLUDED.avg_7_day,
+        avg_30_day = EXCLUDED.avg_30_day,
+        avg_90_day = EXCLUDED.avg_90_day,
+        price_volatility_index = EXCLUDED.price_volatility_index,
+        updated_at = CURRENT_TIMESTAMP;
+    
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    
+    DELETE FROM rental_intel.zip_rent_sketch
+    WHERE metric_date = p_date
+      AND (p_zips IS NULL OR zip = ANY(p_zips));
+    
+    INSERT INTO rental_intel.zip_rent_sketch (
+        metric_date, state, city, zip, buckets, counts, total_count, rent_sum
+    )
+    SELECT 
+        p_date, state, city, zip,
+        array_agg(bucket ORDER BY bucket),
+        array_agg(n ORDER BY bucket),
+        SUM(n),
+        SUM(rent_sum)
+    FROM (
+        SELECT 
+            p.state, p.city, p.zip,
+            rental_intel.rent_bucket(lr.observed_rent) AS bucket,
+            COUNT(*)::INTEGER AS n,
+            SUM(lr.observed_rent) AS rent_sum
+        FROM rental_intel.listings l
+        JOIN rental_intel.properties p ON p.property_id = l.property_id
+        JOIN rental_intel.listing_current_rent lr ON lr.listing_id = l.listing_id
+        WHERE l.listing_status = 'active'
+          AND lr.observed_rent > 0
+          AND (p_zips IS NULL OR p.zip = ANY(p_zips))
+        GROUP BY p.state, p.city, p.zip, bucket
+    ) b
+    GROUP BY state, city, zip;
+    
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Incremental daily metrics: recompute only dirty ZIPs and carry every
+-- other ZIP's previous-day row forward. Falls back to a full rebuild when
+-- p_full is set or there is no previous-day row to carry.
+CREATE OR REPLACE FUNCTION rental_intel.calculate_dirty_zip_metrics(
+    p_date DATE DEFAULT CURRENT_DATE,
+    p_full BOOLEAN DEFAULT FALSE
+) RETURNS TABLE(recomputed INTEGER, carried_forward INTEGER) AS $$
+DECLARE
+    v_zips TEXT[];
+BEGIN
+    carried_forward := 0;
+    
+    IF p_full OR NOT EXISTS (
+        SELECT 1 FROM rental_intel.daily_zip_metrics WHERE metric_date = p_date - 1
+    ) THEN
+        DELETE FROM rental_intel.dirty_zips;
+        recomputed := rental_intel.calculate_all_zip_metrics(p_date);
+        RETURN NEXT;
+        RETURN;
+    END IF;
+    
+    -- Claimed ZIPs, plus ZIPs whose 7/30/90-day windows drop observations today
+    WITH claimed AS (
+        DELETE FROM rental_intel.dirty_zips RETURNING zip
+    )
+    SELECT ARRAY(
+        SELECT zip FROM claimed
+        UNION
+        SELECT zip
+        FROM rental_intel.zip_daily_rent_rollup
+        WHERE observed_date IN (p_date - 8, p_date - 31, p_date - 91)
+    ) INTO v_zips;
+    
+    recomputed := rental_intel.calculate_all_zip_metrics(p_date, v_zips);
+    
+    INSERT INTO rental_intel.daily_zip_metrics (
+        zip, metric_date, median_rent, average_rent, rent_per_sqft,
+        active_listing_count, avg_7_day, avg_30_day, avg_90_day,
+        inventory_growth_rate, price_volatility_index, property_type_breakdown
+    )
+    SELECT 
+        zip, p_date, median_rent, average_rent, rent_per_sqft,
+        active_listing_count, avg_7_day, avg_30_day, avg_90_day,
+        inventory_growth_rate, price_volatility_index, property_type_breakdown
+    FROM rental_intel.daily_zip_metrics
+    WHERE metric_date = p_date - 1
+      AND zip <> ALL(v_zips)
+    ON CONFLICT (zip, metric_date) DO NOTHING;
+    GET DIAGNOSTICS carried_forward = ROW_COUNT;
+    
+    INSERT INTO rental_intel.zip_rent_sketch (
+        metric_date, state, city, zip, buckets, counts, total_count, rent_sum
+    )
+    SELECT p_date, state, city, zip, buckets, counts, total_count, rent_sum
+    FROM rental_intel.zip_rent_sketch
+    WHERE metric_date = p_date - 1
+      AND zip <> ALL(v_zips)
+    ON CONFLICT (metric_date, state, city, zip) DO NOTHING;
+    
+    RETURN NEXT;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE rental_intel.zip_rent_sketch IS 'Per-ZIP daily log-bucket rent histogram, mergeable into city/state/national quantiles';
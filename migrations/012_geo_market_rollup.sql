@@ -0,0 +1,289 @@
+-- Migration 012: city/state/national market rollups
+-- geo_market_rollup holds a daily city, state and national summary built
+-- only from ZIP-level tables: zip_property_counts (new, trigger-maintained),
+-- zip_rent_sketch and zip_daily_rent_rollup (which now also counts
+-- increases and decreases). Summary queries read hundreds of rows instead
+-- of grouping all of properties.
+--
+-- Ingestion keeps running. The first transaction only swaps the triggers
+-- and records the highest price_history_id and property_id; inserts wait
+-- for that short transaction, not for the backfills. Rows up to those ids
+-- are then backfilled in committed batches; rows after them are counted by
+-- the new triggers. Progress is kept in migration_backfill, so re-running
+-- resumes and never counts a row twice. Run with psql in autocommit mode
+-- (not --single-transaction): the backfill DO blocks commit per batch.
+-- The rollup key is a COALESCE expression index rather than UNIQUE NULLS
+-- NOT DISTINCT, so no PostgreSQL 15 feature is needed.
+
+BEGIN;
+
+-- Blocks inserts (not reads) until COMMIT and waits for in-flight writers,
+-- so every row up to the recorded ids was counted by the old triggers
+LOCK TABLE rental_intel.rent_price_history IN SHARE ROW EXCLUSIVE MODE;
+LOCK TABLE rental_intel.properties IN SHARE ROW EXCLUSIVE MODE;
+
+ALTER TABLE rental_intel.zip_daily_rent_rollup
+    ADD COLUMN IF NOT EXISTS increase_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS decrease_count INTEGER NOT NULL DEFAULT 0;
+
+-- Function to append new price rows to the ZIP daily rollup, aggregated
+-- per statement so a bulk insert costs one upsert per (zip, day)
+CREATE OR REPLACE FUNCTION rental_intel.rollup_new_prices()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO rental_intel.zip_daily_rent_rollup AS r (
+        zip, observed_date, rent_count, rent_sum, rent_sumsq,
+        increase_count, decrease_count
+    )
+    SELECT 
+        n.zip,
+        n.observed_date,
+        COUNT(*),
+        SUM(n.observed_rent),
+        SUM(n.observed_rent * n.observed_rent),
+        COUNT(*) FILTER (WHERE n.change_type = 'increase'),
+        COUNT(*) FILTER (WHERE n.change_type = 'decrease')
+    FROM new_prices n
+    GROUP BY n.zip, n.observed_date
+    ON CONFLICT (zip, observed_date) DO UPDATE SET
+        rent_count = r.rent_count + EXCLUDED.rent_count,
+        rent_sum = r.rent_sum + EXCLUDED.rent_sum,
+        rent_sumsq = r.rent_sumsq + EXCLUDED.rent_sumsq,
+        increase_count = r.increase_count + EXCLUDED.increase_count,
+        decrease_count = r.decrease_count + EXCLUDED.decrease_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ZIP property counts: properties per (state, city, zip), maintained by
+-- trg_count_new_properties so rollups never scan properties
+CREATE TABLE IF NOT EXISTS rental_intel.zip_property_counts (
+    state TEXT NOT NULL,
+    city TEXT NOT NULL,
+    zip TEXT NOT NULL,
+    property_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (state, city, zip)
+);
+
+-- Geo market rollup: daily city, state and national market summary,
+-- refreshed from the ZIP-level tables by refresh_geo_market_rollup
+CREATE TABLE IF NOT EXISTS rental_intel.geo_market_rollup (
+    metric_date DATE NOT NULL,
+    grain TEXT NOT NULL CHECK (grain IN ('city', 'state', 'national')),
+    state TEXT,
+    city TEXT,
+    zip_count INTEGER NOT NULL DEFAULT 0,
+    property_count INTEGER NOT NULL DEFAULT 0,
+    active_listings INTEGER NOT NULL DEFAULT 0,
+    avg_rent DECIMAL(10, 2),
+    median_rent DECIMAL(10, 2),
+    p10_rent DECIMAL(10, 2),
+    p90_rent DECIMAL(10, 2),
+    price_observations INTEGER NOT NULL DEFAULT 0,
+    increases INTEGER NOT NULL DEFAULT 0,
+    decreases INTEGER NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- One row per (date, grain, state, city); state/city are NULL above their
+-- grain, so the key COALESCEs them
+CREATE UNIQUE INDEX IF NOT EXISTS idx_geo_market_rollup_key
+    ON rental_intel.geo_market_rollup (metric_date, grain, COALESCE(state, ''), COALESCE(city, ''));
+
+-- Function to count new properties per (state, city, zip), aggregated per
+-- statement so a bulk insert costs one upsert per ZIP
+CREATE OR REPLACE FUNCTION rental_intel.count_new_properties()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO rental_intel.zip_property_counts AS c (state, city, zip, property_count)
+    SELECT n.state, n.city, n.zip, COUNT(*)
+    FROM new_properties n
+    GROUP BY n.state, n.city, n.zip
+    ON CONFLICT (state, city, zip) DO UPDATE SET
+        property_count = c.property_count + EXCLUDED.property_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger for ZIP property counts (upsert conflicts are not in new_properties)
+DROP TRIGGER IF EXISTS trg_count_new_properties ON rental_intel.properties;
+CREATE TRIGGER trg_count_new_properties
+    AFTER INSERT ON rental_intel.properties
+    REFERENCING NEW TABLE AS new_properties
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rental_intel.count_new_properties();
+
+-- Migration backfill progress: rows up to last_id predate the triggers
+-- and are backfilled in batches; done_through is committed with each batch
+CREATE TABLE IF NOT EXISTS rental_intel.migration_backfill (
+    name TEXT PRIMARY KEY,
+    last_id BIGINT NOT NULL,
+    done_through BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO rental_intel.migration_backfill (name, last_id)
+SELECT '012_price_changes', COALESCE(MAX(price_history_id), 0) FROM rental_intel.rent_price_history
+ON CONFLICT (name) DO NOTHING;
+
+INSERT INTO rental_intel.migration_backfill (name, last_id)
+SELECT '012_property_counts', COALESCE(MAX(property_id), 0) FROM rental_intel.properties
+ON CONFLICT (name) DO NOTHING;
+
+-- City, state and national rollup for a date from ZIP-level tables only:
+-- property counts, merged rent sketches and the ZIP daily rollup (a ZIP
+-- spanning cities attributes its price changes to its largest city).
+-- Returns the number of rollup rows written.
+CREATE OR REPLACE FUNCTION rental_intel.refresh_geo_market_rollup(
+    p_date DATE DEFAULT CURRENT_DATE
+) RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    WITH props AS (
+        SELECT 
+            CASE
+                WHEN GROUPING(state) = 1 THEN 'national'
+                WHEN GROUPING(city) = 1 THEN 'state'
+                ELSE 'city'
+            END AS grain,
+            state, city,
+            COUNT(DISTINCT zip) AS zip_count,
+            SUM(property_count) AS property_count
+        FROM rental_intel.zip_property_counts
+        GROUP BY GROUPING SETS ((state, city), (state), ())
+    ),
+    rents AS (
+        SELECT grain, state, city, listings, avg_rent, p10, p50, p90
+        FROM rental_intel.merged_rent_quantiles(p_date)
+        WHERE grain <> 'zip'
+    ),
+    zip_home AS (
+        SELECT DISTINCT ON (zip) zip, state, city
+        FROM rental_intel.zip_property_counts
+        ORDER BY zip, property_count DESC
+    ),
+    changes AS (
+        SELECT 
+            CASE
+                WHEN GROUPING(h.state) = 1 THEN 'national'
+                WHEN GROUPING(h.city) = 1 THEN 'state'
+                ELSE 'city'
+            END AS grain,
+            h.state, h.city,
+            SUM(r.rent_count) AS observations,
+            SUM(r.increase_count) AS increases,
+            SUM(r.decrease_count) AS decreases
+        FROM rental_intel.zip_daily_rent_rollup r
+        JOIN zip_home h ON h.zip = r.zip
+        WHERE r.observed_date = p_date
+        GROUP BY GROUPING SETS ((h.state, h.city), (h.state), ())
+    )
+    INSERT INTO rental_intel.geo_market_rollup (
+        metric_date, grain, state, city, zip_count, property_count,
+        active_listings, avg_rent, median_rent, p10_rent, p90_rent,
+        price_observations, increases, decreases, refreshed_at
+    )
+    SELECT 
+        p_date, p.grain, p.state, p.city, p.zip_count, p.property_count,
+        COALESCE(r.listings, 0), r.avg_rent, r.p50, r.p10, r.p90,
+        COALESCE(c.observations, 0), COALESCE(c.increases, 0), COALESCE(c.decreases, 0),
+        CURRENT_TIMESTAMP
+    FROM props p
+    LEFT JOIN rents r
+        ON r.grain = p.grain
+        AND r.state IS NOT DISTINCT FROM p.state
+        AND r.city IS NOT DISTINCT FROM p.city
+    LEFT JOIN changes c
+        ON c.grain = p.grain
+        AND c.state IS NOT DISTINCT FROM p.state
+        AND c.city IS NOT DISTINCT FROM p.city
+    ON CONFLICT (metric_date, grain, COALESCE(state, ''), COALESCE(city, '')) DO UPDATE SET
+        zip_count = EXCLUDED.zip_count,
+        property_count = EXCLUDED.property_count,
+        active_listings = EXCLUDED.active_listings,
+        avg_rent = EXCLUDED.avg_rent,
+        median_rent = EXCLUDED.median_rent,
+        p10_rent = EXCLUDED.p10_rent,
+        p90_rent = EXCLUDED.p90_rent,
+        price_observations = EXCLUDED.price_observations,
+        increases = EXCLUDED.increases,
+        decreases = EXCLUDED.decreases,
+        refreshed_at = EXCLUDED.refreshed_at;
+    
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE rental_intel.zip_property_counts IS 'Properties per state, city and ZIP, maintained on property insert';
+COMMENT ON TABLE rental_intel.geo_market_rollup IS 'Daily city, state and national market summary built from ZIP-level tables';
+COMMENT ON TABLE rental_intel.migration_backfill IS 'Batched backfill progress of online migrations';
+
+COMMIT;
+
+-- Backfill increase/decrease counts for price rows that predate the new
+-- rollup trigger, one committed price_history_id range at a time (added
+-- to, not overwriting, what the trigger has counted since)
+DO $$
+DECLARE
+    v_last BIGINT;
+    v_from BIGINT;
+    v_to BIGINT;
+BEGIN
+    SELECT last_id, done_through INTO v_last, v_from
+    FROM rental_intel.migration_backfill WHERE name = '012_price_changes';
+    
+    WHILE v_from < v_last LOOP
+        v_to := LEAST(v_from + 100000, v_last);
+        
+        UPDATE rental_intel.zip_daily_rent_rollup r
+        SET increase_count = r.increase_count + h.increases,
+            decrease_count = r.decrease_count + h.decreases
+        FROM (
+            SELECT 
+                zip, observed_date,
+                COUNT(*) FILTER (WHERE change_type = 'increase') AS increases,
+                COUNT(*) FILTER (WHERE change_type = 'decrease') AS decreases
+            FROM rental_intel.rent_price_history
+            WHERE price_history_id > v_from AND price_history_id <= v_to
+            AND change_type IN ('increase', 'decrease')
+            GROUP BY zip, observed_date
+        ) h
+        WHERE r.zip = h.zip AND r.observed_date = h.observed_date;
+        
+        UPDATE rental_intel.migration_backfill SET done_through = v_to
+        WHERE name = '012_price_changes';
+        COMMIT;
+        v_from := v_to;
+    END LOOP;
+END;
+$$;
+
+-- Backfill property counts for properties that predate the new trigger
+DO $$
+DECLARE
+    v_last BIGINT;
+    v_from BIGINT;
+    v_to BIGINT;
+BEGIN
+    SELECT last_id, done_through INTO v_last, v_from
+    FROM rental_intel.migration_backfill WHERE name = '012_property_counts';
+    
+    WHILE v_from < v_last LOOP
+        v_to := LEAST(v_from + 100000, v_last);
+        
+        INSERT INTO rental_intel.zip_property_counts AS c (state, city, zip, property_count)
+        SELECT state, city, zip, COUNT(*)
+        FROM rental_intel.properties
+        WHERE property_id > v_from AND property_id <= v_to
+        GROUP BY state, city, zip
+        ON CONFLICT (state, city, zip) DO UPDATE SET
+            property_count = c.property_count + EXCLUDED.property_count;
+        
+        UPDATE rental_intel.migration_backfill SET done_through = v_to
+        WHERE name = '012_property_counts';
+        COMMIT;
+        v_from := v_to;
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,22 @@
+-- Migration 013: per-shard forecast run log
+-- The weekly forecast fits ZIPs in state shards across a process pool;
+-- each shard's ZIP count, fit time, worker and model version is recorded
+-- so runs with different worker counts can be compared.
+
+CREATE TABLE IF NOT EXISTS rental_intel.forecast_shard_log (
+    shard_log_id BIGSERIAL PRIMARY KEY,
+    run_started TIMESTAMP WITH TIME ZONE NOT NULL,
+    forecast_date DATE NOT NULL,
+    model_version TEXT NOT NULL,
+    shard TEXT NOT NULL,
+    workers INTEGER NOT NULL,
+    worker_pid INTEGER,
+    zip_count INTEGER NOT NULL,
+    forecast_rows INTEGER NOT NULL,
+    fit_seconds DECIMAL(10, 3) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_forecast_shard_log_run
+    ON rental_intel.forecast_shard_log(run_started);
+
+COMMENT ON TABLE rental_intel.forecast_shard_log IS 'Per-state-shard timing and model version of weekly forecast runs';
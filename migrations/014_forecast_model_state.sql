@@ -0,0 +1,23 @@
+-- Migration 014: warm-start forecast state
+-- forecast_model_state keeps each ZIP's weighted normal-equation statistics
+-- (X'WX, X'Wy, y'Wy, weight sum, observation count) as of its last forecast,
+-- plus the last daily_zip_metrics date and rent folded in. The weekly job
+-- decays and extends these for ZIPs with new rents, and carries previous
+-- forecasts forward for ZIPs without them. The table fills on the first run
+-- after this migration, which refits every ZIP.
+
+CREATE TABLE IF NOT EXISTS rental_intel.forecast_model_state (
+    zip TEXT PRIMARY KEY,
+    model_version TEXT NOT NULL,
+    forecast_date DATE NOT NULL,
+    last_metric_date DATE NOT NULL,
+    last_rent DECIMAL(10, 2),
+    xtwx DOUBLE PRECISION[] NOT NULL,
+    xtwy DOUBLE PRECISION[] NOT NULL,
+    ywy DOUBLE PRECISION NOT NULL,
+    weight DOUBLE PRECISION NOT NULL,
+    observations INTEGER NOT NULL,
+    fitted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE rental_intel.forecast_model_state IS 'Per-ZIP forecast model statistics for warm-start updates';
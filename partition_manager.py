@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Partition Lifecycle Manager for rent_price_history
+Keeps the hot working set small: months past the cold window get a BRIN
+index on observed_date instead of a B-tree, and months past the retention
+window are exported to gzip CSV, verified, then detached and archived or
+dropped
+"""
+
+import os
+import csv
+import gzip
+import argparse
+from datetime import date, datetime
+from typing import List, Dict
+from psycopg2 import sql
+
+from db_pool import get_connection, release_connection
+
+# Months kept attached, months kept on B-tree indexes, and archive location
+RETENTION_MONTHS = int(os.getenv('PARTITION_RETENTION_MONTHS', '24'))
+COLD_AFTER_MONTHS = int(os.getenv('PARTITION_COLD_AFTER_MONTHS', '2'))
+ARCHIVE_DIR = os.getenv('PARTITION_ARCHIVE_DIR', os.path.expanduser('~/.rental_intel/archive'))
+
+# Suffix given to detached partitions kept in the database, followed by
+# the archive time so the same month can be archived more than once
+ARCHIVED_SUFFIX = '_archived'
+
+def months_ago(n: int, today: date = None) -> date:
+    """First day of the month n months before today's month"""
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - n
+    return date(index // 12, index % 12 + 1, 1)
+
+def list_partitions(cur) -> List[Dict]:
+    """Monthly partitions with their start month, size and observed_date index kind"""
+    cur.execute(r"""
+        SELECT
+            c.relname AS name,
+            TO_DATE(RIGHT(c.relname, 7), 'YYYY_MM') AS month,
+            pg_total_relation_size(c.oid) AS total_bytes,
+            EXISTS (
+                SELECT 1 FROM pg_index ix
+                JOIN pg_class ic ON ic.oid = ix.indexrelid
+                JOIN pg_am am ON am.oid = ic.relam
+                WHERE ix.indrelid = c.oid AND am.amname = 'brin'
+            ) AS has_brin
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'rental_intel.rent_price_history'::regclass
+        AND c.relname ~ '_\d{4}_\d{2}$'
+        ORDER BY month
+    """)
+    return [
+        {'name': name, 'month': month, 'total_bytes': total_bytes, 'has_brin': has_brin}
+        for name, month, total_bytes, has_brin in cur.fetchall()
+    ]
+
+def compact_partition(conn, partition: str) -> int:
+    """Swap a cold partition's observed_date B-tree for BRIN; returns bytes saved
+
+    Runs with autocommit so both index builds are CONCURRENTLY.
+    """
+    btree = f"{partition}_observed_idx"
+    brin = f"{partition}_observed_brin"
+    cur = conn.cursor()
+
+    cur.execute("SELECT COALESCE(pg_relation_size(to_regclass(%s)), 0)", (f"rental_intel.{btree}",))
+    before = cur.fetchone()[0]
+
+    cur.execute(sql.SQL("CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} USING brin (observed_date)").format(
+        sql.Identifier(brin), sql.Identifier('rental_intel', partition)
+    ))
+    cur.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(
+        sql.Identifier('rental_intel', btree)
+    ))
+
+    cur.execute("SELECT pg_relation_size(to_regclass(%s))", (f"rental_intel.{brin}",))
+    after = cur.fetchone()[0]
+    cur.close()
+    return before - after
+
+def export_partition(conn, partition: str, path: str) -> int:
+    """Export a partition to gzip CSV and verify it; returns rows exported
+
+    COPY and COUNT(*) run in one REPEATABLE READ snapshot, so the check
+    compares the file with exactly the rows that were exported. Raises if
+    they differ.
+    """
+    table = sql.Identifier('rental_intel', partition)
+    conn.set_session(isolation_level='REPEATABLE READ')
+    try:
+        cur = conn.cursor()
+        with gzip.open(path, 'wt', newline='') as f:
+            cur.copy_expert(sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER)").format(table).as_string(conn), f)
+        cur.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(table))
+        rows = cur.fetchone()[0]
+        conn.commit()
+        cur.close()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.set_session(isolation_level='DEFAULT')
+
+    with gzip.open(path, 'rt', newline='') as f:
+        exported = sum(1 for _ in csv.reader(f)) - 1
+    if exported != rows:
+        raise RuntimeError(f"{partition}: exported {exported} rows, table has {rows}")
+    return rows
+
+def archive_partition(conn, partition: str, archive_dir: str, drop: bool = False) -> Dict:
+    """Export a partition to gzip CSV, verify it, then detach and rename
+    or drop it
+
+    The partition stays attached (and queryable) until its export is
+    verified. Rows that arrive between the export and the detach are
+    caught by a recount of the detached table and re-exported; if the
+    archive still does not match, the partition is re-attached. Archive
+    file and table are named <partition>_archived_<YYYYMMDDHHMM>, and an
+    existing archive is never overwritten. A renamed partition keeps its
+    storage until it is dropped; its indexes are renamed with it so the
+    month can be recreated. Returns archive path, rows, and bytes
+    reclaimed.
+    """
+    table = sql.Identifier('rental_intel', partition)
+    archive_name = f"{partition}{ARCHIVED_SUFFIX}_{datetime.now().strftime('%Y%m%d%H%M')}"
+    cur = conn.cursor()
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{archive_name}.csv.gz")
+    if os.path.exists(path):
+        raise RuntimeError(f"{partition}: archive {path} already exists")
+    rows = export_partition(conn, partition, path)
+
+    # DETACH ... CONCURRENTLY is not allowed while a DEFAULT partition exists
+    cur.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table pt
+            WHERE pt.partrelid = 'rental_intel.rent_price_history'::regclass
+            AND pt.partdefid <> 0
+        ),
+        pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_class c
+        WHERE c.oid = %s::regclass
+    """, (f"rental_intel.{partition}",))
+    has_default, bound = cur.fetchone()
+    conn.commit()
+    conn.autocommit = True
+    try:
+        cur.execute(sql.SQL("ALTER TABLE rental_intel.rent_price_history DETACH PARTITION {}{}").format(
+            table, sql.SQL('' if has_default else ' CONCURRENTLY')
+        ))
+    finally:
+        conn.autocommit = False
+
+    cur.execute(sql.SQL("SELECT COUNT(*), pg_total_relation_size(%s::regclass) FROM {}").format(table),
+                (f"rental_intel.{partition}",))
+    detached_rows, table_bytes = cur.fetchone()
+    conn.commit()
+    if detached_rows != rows:
+        try:
+            rows = export_partition(conn, partition, path)
+        except Exception:
+            conn.rollback()
+            cur.execute(sql.SQL("ALTER TABLE rental_intel.rent_price_history ATTACH PARTITION {} {}").format(
+                table, sql.SQL(bound)
+            ))
+            conn.commit()
+            raise
+
+    if drop:
+        cur.execute(sql.SQL("DROP TABLE {}").format(table))
+    else:
+        # Index names are schema-wide; the recreated month needs them back
+        cur.execute("""
+            SELECT ic.relname
+            FROM pg_index ix
+            JOIN pg_class ic ON ic.oid = ix.indexrelid
+            WHERE ix.indrelid = %s::regclass
+        """, (f"rental_intel.{partition}",))
+        for (index,) in cur.fetchall():
+            if index.startswith(partition):
+                cur.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                    sql.Identifier('rental_intel', index),
+                    sql.Identifier(archive_name + index[len(partition):])
+                ))
+        cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+            table, sql.Identifier(archive_name)
+        ))
+    conn.commit()
+    cur.close()
+
+    return {
+        'archive': path,
+        'rows': rows,
+        'archive_bytes': os.path.getsize(path),
+        'reclaimed_bytes': table_bytes if drop else 0,
+    }
+
+def run_lifecycle(retention_months: int = RETENTION_MONTHS,
+                  cold_after_months: int = COLD_AFTER_MONTHS,
+                  archive_dir: str = ARCHIVE_DIR,
+                  drop: bool = False, dry_run: bool = False) -> Dict:
+    """Compact cold partitions and archive expired ones; returns a report"""
+    report = {'compacted': [], 'archived': [], 'reclaimed_bytes': 0, 'errors': []}
+    expire_before = months_ago(retention_months)
+    cold_before = months_ago(cold_after_months)
+
+    conn = get_connection('bulk')
+    try:
+        cur = conn.cursor()
+        partitions = list_partitions(cur)
+        cur.close()
+        conn.commit()
+
+        for part in partitions:
+            name = part['name']
+            try:
+                if part['month'] < expire_before:
+                    if dry_run:
+                        report['archived'].append({'partition': name, 'bytes': part['total_bytes']})
+                        continue
+                    result = archive_partition(conn, name, archive_dir, drop)
+                    report['archived'].append({'partition': name, **result})
+                    report['reclaimed_bytes'] += result['reclaimed_bytes']
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {name}: archived {result['rows']:,} rows "
+                          f"-> {result['archive']} ({result['archive_bytes'] / 1024**2:,.1f} MB)")
+
+                elif part['month'] < cold_before and not part['has_brin']:
+                    if dry_run:
+                        report['compacted'].append({'partition': name})
+                        continue
+                    conn.autocommit = True
+                    try:
+                        saved = compact_partition(conn, name)
+                    finally:
+                        conn.autocommit = False
+                    report['compacted'].append({'partition': name, 'saved_bytes': saved})
+                    report['reclaimed_bytes'] += saved
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {name}: BRIN on observed_date, "
+                          f"{saved / 1024**2:,.1f} MB saved")
+
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] {name}: failed: {e}")
+                if not conn.autocommit:
+                    conn.rollback()
+                report['errors'].append((name, str(e)))
+    finally:
+        release_connection(conn)
+
+    return report
+
+def print_status():
+    """List partitions with size and index kind"""
+    conn = get_connection('report')
+    try:
+        cur = conn.cursor()
+        partitions = list_partitions(cur)
+        cur.close()
+    finally:
+        release_connection(conn)
+
+    expire_before = months_ago(RETENTION_MONTHS)
+    cold_before = months_ago(COLD_AFTER_MONTHS)
+    for part in partitions:
+        state = 'expired' if part['month'] < expire_before else 'cold' if part['month'] < cold_before else 'hot'
+        index = 'brin' if part['has_brin'] else 'btree'
+        print(f"{part['name']:<32} {state:<8} {index:<6} {part['total_bytes'] / 1024**2:>10,.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description='rent_price_history partition lifecycle')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('status', help='List partitions, state and size')
+    run = sub.add_parser('run', help='Compact cold partitions and archive expired ones')
+    run.add_argument('--retention-months', type=int, default=RETENTION_MONTHS,
+                     help='Months kept attached')
+    run.add_argument('--cold-after-months', type=int, default=COLD_AFTER_MONTHS,
+                     help='Months kept on B-tree indexes')
+    run.add_argument('--archive-dir', default=ARCHIVE_DIR, help='Where gzip CSV exports go')
+    run.add_argument('--drop', action='store_true',
+                     help='Drop archived partitions instead of keeping them renamed')
+    run.add_argument('--dry-run', action='store_true', help='Report what would change')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        print_status()
+        return
+
+    report = run_lifecycle(args.retention_months, args.cold_after_months,
+                           args.archive_dir, args.drop, args.dry_run)
+    prefix = 'Would ' if args.dry_run else ''
+    print(f"{prefix}compact {len(report['compacted'])} partitions, "
+          f"{prefix.lower()}archive {len(report['archived'])} partitions")
+    print(f"Storage reclaimed: {report['reclaimed_bytes'] / 1024**2:,.1f} MB")
+    if report['errors']:
+        print(f"Errors: {len(report['errors'])}")
+        for name, message in report['errors']:
+            print(f"  {name}: {message}")
+
+if __name__ == "__main__":
+    main()
@@ -15,16 +15,16 @@ def generate_sample_data(count: int = 100) -> list:
     
     property_types = ['apartment', 'house', 'condo', 'townhouse', 'studio']
     cities = [
-        ('San Francisco', 'CA', 94102),
-        ('Los Angeles', 'CA', 90001),
-        ('New York', 'NY', 10001),
-        ('Chicago', 'IL', 60601),
-        ('Austin', 'TX', 78701),
-        ('Seattle', 'WA', 98101),
-        ('Denver', 'CO', 80202),
-        ('Miami', 'FL', 33101),
-        ('Boston', 'MA', 02101),
-        ('Denver', 'CO', 80202),
+        ('San Francisco', 'CA', '94102'),
+        ('Los Angeles', 'CA', '90001'),
+        ('New York', 'NY', '10001'),
+        ('Chicago', 'IL', '60601'),
+        ('Austin', 'TX', '78701'),
+        ('Seattle', 'WA', '98101'),
+        ('Denver', 'CO', '80202'),
+        ('Miami', 'FL', '33101'),
+        ('Boston', 'MA', '02101'),
+        ('Denver', 'CO', '80202'),
     ]
     
     streets = [
@@ -58,7 +58,7 @@ def generate_sample_data(count: int = 100) -> list:
             'street_address': street,
             'city': city,
             'state': state,
-            'zip_code': str(zip_code),
+            'zip_code': zip_code,
             'property_type': random.choice(property_types),
             'bedrooms': bedrooms,
             'bathrooms': bathrooms,
@@ -131,13 +131,15 @@ def test_ingestion():
         print(f"   ✓ Records scanned: {stats['scanned']}")
         print(f"   ✓ Records inserted: {stats['inserted']}")
         print(f"   ✓ Price changes: {stats['price_changes']}")
-        print(f"   ✓ Errors: {len(stats['errors'])}")
+        print(f"   ✓ Errors: {stats['error_total']}")
         
         # Create price history for some listings
         print("\n3. Creating price history...")
         db.cursor.execute("SELECT listing_id FROM rental_intel.listings LIMIT 10")
         listings = db.cursor.fetchall()
         
+        # History is back-dated up to 30 days; create any month it reaches
+        db.ensure_partitions(datetime.now().date() - timedelta(days=30))
         for listing in listings:
             create_price_history(db, listing['listing_id'], 30)
         
@@ -58,10 +58,36 @@ CREATE TABLE rental_intel.rent_price_history (
     rent_per_sqft DECIMAL(8, 4),
     change_type TEXT CHECK (change_type IN ('new', 'increase', 'decrease', 'unchanged')),
     observed_date DATE NOT NULL,
+    zip TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (price_history_id, observed_date)
 ) PARTITION BY RANGE (observed_date);
 
+-- Listing current rent: latest price per listing, kept in step with
+-- rent_price_history by trg_sync_listing_current_rent
+CREATE TABLE rental_intel.listing_current_rent (
+    listing_id BIGINT PRIMARY KEY REFERENCES rental_intel.listings(listing_id) ON DELETE CASCADE,
+    property_id BIGINT NOT NULL,
+    observed_rent DECIMAL(10, 2) NOT NULL,
+    rent_per_sqft DECIMAL(8, 4),
+    change_type TEXT,
+    observed_date DATE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- ZIP daily rent rollup: per-ZIP, per-day sums of price observations,
+-- appended by trg_rollup_new_prices; feeds moving averages and volatility
+CREATE TABLE rental_intel.zip_daily_rent_rollup (
+    zip TEXT NOT NULL,
+    observed_date DATE NOT NULL,
+    rent_count INTEGER NOT NULL DEFAULT 0,
+    rent_sum DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    rent_sumsq DECIMAL(24, 4) NOT NULL DEFAULT 0,
+    increase_count INTEGER NOT NULL DEFAULT 0,
+    decrease_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (zip, observed_date)
+);
+
 -- Daily ZIP metrics: Aggregated metrics by ZIP code
 CREATE TABLE rental_intel.daily_zip_metrics (
     metric_id BIGSERIAL PRIMARY KEY,
@@ -109,10 +135,110 @@ CREATE TABLE rental_intel.ingestion_log (
     records_updated INTEGER DEFAULT 0,
     price_changes INTEGER DEFAULT 0,
     errors JSONB,
-    status TEXT DEFAULT 'running' CHECK (status IN ('running', 'completed', 'failed')),
+    status TEXT DEFAULT 'running' CHECK (status IN ('running', 'completed', 'failed', 'interrupted')),
+    checkpoint JSONB,
+    checkpoint_at TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Dirty ZIPs: ZIPs touched by ingestion since the last metrics refresh
+CREATE TABLE rental_intel.dirty_zips (
+    zip TEXT PRIMARY KEY,
+    marked_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- ZIP rent sketch: per ZIP and day, a sparse log-bucket histogram of
+-- active listing rents (bucket i holds rents in [1.02^i, 1.02^(i+1))).
+-- Sketches merge by adding counts per bucket, so city, state and national
+-- quantiles never re-sort individual rents
+CREATE TABLE rental_intel.zip_rent_sketch (
+    metric_date DATE NOT NULL,
+    state TEXT NOT NULL,
+    city TEXT NOT NULL,
+    zip TEXT NOT NULL,
+    buckets INTEGER[] NOT NULL,
+    counts INTEGER[] NOT NULL,
+    total_count INTEGER NOT NULL,
+    rent_sum DECIMAL(16, 2) NOT NULL,
+    PRIMARY KEY (metric_date, state, city, zip)
+);
+
+-- ZIP property counts: properties per (state, city, zip), maintained by
+-- trg_count_new_properties so rollups never scan properties
+CREATE TABLE rental_intel.zip_property_counts (
+    state TEXT NOT NULL,
+    city TEXT NOT NULL,
+    zip TEXT NOT NULL,
+    property_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (state, city, zip)
+);
+
+-- Geo market rollup: daily city, state and national market summary,
+-- refreshed from the ZIP-level tables by refresh_geo_market_rollup
+CREATE TABLE rental_intel.geo_market_rollup (
+    metric_date DATE NOT NULL,
+    grain TEXT NOT NULL CHECK (grain IN ('city', 'state', 'national')),
+    state TEXT,
+    city TEXT,
+    zip_count INTEGER NOT NULL DEFAULT 0,
+    property_count INTEGER NOT NULL DEFAULT 0,
+    active_listings INTEGER NOT NULL DEFAULT 0,
+    avg_rent DECIMAL(10, 2),
+    median_rent DECIMAL(10, 2),
+    p10_rent DECIMAL(10, 2),
+    p90_rent DECIMAL(10, 2),
+    price_observations INTEGER NOT NULL DEFAULT 0,
+    increases INTEGER NOT NULL DEFAULT 0,
+    decreases INTEGER NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Migration backfill progress: rows up to last_id predate a migration's
+-- triggers and are backfilled in batches. A new database has nothing to
+-- backfill, so its rows are complete.
+CREATE TABLE rental_intel.migration_backfill (
+    name TEXT PRIMARY KEY,
+    last_id BIGINT NOT NULL,
+    done_through BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO rental_intel.migration_backfill (name, last_id) VALUES
+    ('012_price_changes', 0),
+    ('012_property_counts', 0);
+
+-- Forecast shard log: one row per state shard of a weekly forecast run,
+-- for checking how fitting scales with worker count
+CREATE TABLE rental_intel.forecast_shard_log (
+    shard_log_id BIGSERIAL PRIMARY KEY,
+    run_started TIMESTAMP WITH TIME ZONE NOT NULL,
+    forecast_date DATE NOT NULL,
+    model_version TEXT NOT NULL,
+    shard TEXT NOT NULL,
+    workers INTEGER NOT NULL,
+    worker_pid INTEGER,
+    zip_count INTEGER NOT NULL,
+    forecast_rows INTEGER NOT NULL,
+    fit_seconds DECIMAL(10, 3) NOT NULL
+);
+
+-- Forecast model state: per ZIP, the weighted normal-equation statistics
+-- of the forecast fit as of forecast_date, and the last daily_zip_metrics
+-- date and rent folded in. Later runs decay and extend these instead of
+-- refitting
+CREATE TABLE rental_intel.forecast_model_state (
+    zip TEXT PRIMARY KEY,
+    model_version TEXT NOT NULL,
+    forecast_date DATE NOT NULL,
+    last_metric_date DATE NOT NULL,
+    last_rent DECIMAL(10, 2),
+    xtwx DOUBLE PRECISION[] NOT NULL,
+    xtwy DOUBLE PRECISION[] NOT NULL,
+    ywy DOUBLE PRECISION NOT NULL,
+    weight DOUBLE PRECISION NOT NULL,
+    observations INTEGER NOT NULL,
+    fitted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- ============================================
 -- INDEXES
 -- ============================================
@@ -130,10 +256,19 @@ CREATE INDEX idx_listings_status ON rental_intel.listings(listing_status) WHERE
 CREATE INDEX idx_listings_platform ON rental_intel.listings(source_platform);
 CREATE INDEX idx_listings_verified_date ON rental_intel.listings(last_verified_date);
 
--- Rent price history indexes (auto-created on partitions)
+-- Rent price history indexes (auto-created on partitions). observed_date
+-- is indexed per partition instead: B-tree while a month is hot, swapped to
+-- BRIN by partition_manager.py once it goes cold
 CREATE INDEX idx_price_history_listing ON rental_intel.rent_price_history(listing_id);
 CREATE INDEX idx_price_history_property ON rental_intel.rent_price_history(property_id);
-CREATE INDEX idx_price_history_observed ON rental_intel.rent_price_history(observed_date);
+CREATE INDEX idx_price_history_zip_date ON rental_intel.rent_price_history(zip, observed_date);
+
+-- ZIP rollup indexes (zip-leading access is covered by the primary key)
+CREATE INDEX idx_zip_rollup_date ON rental_intel.zip_daily_rent_rollup(observed_date);
+
+-- Geo market rollup key (state/city are NULL above their grain)
+CREATE UNIQUE INDEX idx_geo_market_rollup_key
+    ON rental_intel.geo_market_rollup (metric_date, grain, COALESCE(state, ''), COALESCE(city, ''));
 
 -- ZIP metrics indexes
 CREATE INDEX idx_zip_metrics_zip_date ON rental_intel.daily_zip_metrics(zip, metric_date);
@@ -142,10 +277,13 @@ CREATE INDEX idx_zip_metrics_date ON rental_intel.daily_zip_metrics(metric_date)
 -- Forecast indexes
 CREATE INDEX idx_forecast_zip_date ON rental_intel.forecast_zip_rent(zip, forecast_date);
 CREATE INDEX idx_forecast_target ON rental_intel.forecast_zip_rent(target_date);
+CREATE INDEX idx_forecast_shard_log_run ON rental_intel.forecast_shard_log(run_started);
 
 -- Ingestion log indexes
 CREATE INDEX idx_ingestion_log_source ON rental_intel.ingestion_log(source);
 CREATE INDEX idx_ingestion_log_date ON rental_intel.ingestion_log(run_start);
+CREATE INDEX idx_ingestion_log_checkpoint ON rental_intel.ingestion_log(source, log_id DESC)
+    WHERE checkpoint IS NOT NULL;
 
 -- ============================================
 -- VIEWS FOR REPORTING
@@ -175,15 +313,14 @@ WHERE l.listing_status = 'active';
 
 -- View 2: Latest rent per listing
 CREATE OR REPLACE VIEW rental_intel.v_latest_rent AS
-SELECT DISTINCT ON (listing_id)
+SELECT 
     listing_id,
     property_id,
     observed_rent,
     rent_per_sqft,
     change_type,
     observed_date
-FROM rental_intel.rent_price_history
-ORDER BY listing_id, observed_date DESC;
+FROM rental_intel.listing_current_rent;
 
 -- View 3: Detailed market snapshot with latest prices
 CREATE OR REPLACE VIEW rental_intel.v_market_details AS
@@ -245,6 +382,43 @@ JOIN rental_intel.v_latest_rent r ON l.listing_id = r.listing_id
 WHERE l.listing_status = 'active'
 GROUP BY p.state, p.city, p.zip;
 
+-- Materialized view refresh log: when each materialized view was last
+-- refreshed (kept out of the view so a CONCURRENTLY refresh only rewrites
+-- rows whose data changed)
+CREATE TABLE IF NOT EXISTS rental_intel.materialized_view_refresh (
+    view_name TEXT PRIMARY KEY,
+    refreshed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    row_count BIGINT
+);
+
+-- Materialized market snapshot: v_market_snapshot precomputed at state,
+-- city and ZIP grain in one grouping-sets pass. Refreshed CONCURRENTLY
+-- (readers are never blocked), which needs the unique index below; city
+-- and zip are '' above their grain so the key columns are never NULL
+CREATE MATERIALIZED VIEW IF NOT EXISTS rental_intel.mv_market_snapshot AS
+SELECT 
+    CASE
+        WHEN GROUPING(p.city) = 1 THEN 'state'
+        WHEN GROUPING(p.zip) = 1 THEN 'city'
+        ELSE 'zip'
+    END AS grain,
+    p.state,
+    COALESCE(p.city, '') AS city,
+    COALESCE(p.zip, '') AS zip,
+    COUNT(l.listing_id) AS active_listings,
+    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY r.observed_rent) AS median_rent,
+    AVG(r.observed_rent) AS avg_rent
+FROM rental_intel.properties p
+JOIN rental_intel.listings l ON p.property_id = l.property_id
+JOIN rental_intel.listing_current_rent r ON l.listing_id = r.listing_id
+WHERE l.listing_status = 'active'
+GROUP BY GROUPING SETS ((p.state), (p.state, p.city), (p.state, p.city, p.zip));
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_market_snapshot_key
+    ON rental_intel.mv_market_snapshot (grain, state, city, zip);
+CREATE INDEX IF NOT EXISTS idx_mv_market_snapshot_grain_rent
+    ON rental_intel.mv_market_snapshot (grain, median_rent);
+
 -- View 7: ZIP Trend 30-Day (user requested)
 CREATE OR REPLACE VIEW rental_intel.v_zip_trend_30_day AS
 SELECT 
@@ -281,6 +455,15 @@ $$ LANGUAGE plpgsql IMMUTABLE;
 CREATE OR REPLACE FUNCTION rental_intel.generate_address_hash()
 RETURNS TRIGGER AS $$
 BEGIN
+    -- Upserts that only touch attributes keep the stored address and hash
+    IF TG_OP = 'UPDATE'
+       AND NEW.street_address IS NOT DISTINCT FROM OLD.street_address
+       AND NEW.city IS NOT DISTINCT FROM OLD.city
+       AND NEW.state IS NOT DISTINCT FROM OLD.state
+       AND NEW.zip IS NOT DISTINCT FROM OLD.zip THEN
+        RETURN NEW;
+    END IF;
+    
     NEW.normalized_full_address := rental_intel.normalize_address(
         NEW.street_address, NEW.city, NEW.state, NEW.zip
     );
@@ -295,6 +478,114 @@ CREATE TRIGGER trg_normalize_address
     FOR EACH ROW
     EXECUTE FUNCTION rental_intel.generate_address_hash();
 
+-- Function to keep listing_current_rent in step with price history
+CREATE OR REPLACE FUNCTION rental_intel.sync_listing_current_rent()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO rental_intel.listing_current_rent (
+        listing_id, property_id, observed_rent, rent_per_sqft,
+        change_type, observed_date
+    ) VALUES (
+        NEW.listing_id, NEW.property_id, NEW.observed_rent, NEW.rent_per_sqft,
+        NEW.change_type, NEW.observed_date
+    )
+    ON CONFLICT (listing_id) DO UPDATE SET
+        property_id = EXCLUDED.property_id,
+        observed_rent = EXCLUDED.observed_rent,
+        rent_per_sqft = EXCLUDED.rent_per_sqft,
+        change_type = EXCLUDED.change_type,
+        observed_date = EXCLUDED.observed_date,
+        updated_at = CURRENT_TIMESTAMP
+    -- Late-arriving older observations never replace a newer price
+    WHERE rental_intel.listing_current_rent.observed_date <= EXCLUDED.observed_date;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger for current rent maintenance (same transaction as the append)
+CREATE TRIGGER trg_sync_listing_current_rent
+    AFTER INSERT ON rental_intel.rent_price_history
+    FOR EACH ROW
+    EXECUTE FUNCTION rental_intel.sync_listing_current_rent();
+
+-- Function to denormalize the property's ZIP onto price history rows
+-- (writers that already know it pass zip and skip the lookup)
+CREATE OR REPLACE FUNCTION rental_intel.fill_price_history_zip()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.zip IS NULL THEN
+        SELECT zip INTO NEW.zip
+        FROM rental_intel.properties
+        WHERE property_id = NEW.property_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger for price history ZIP
+CREATE TRIGGER trg_fill_price_history_zip
+    BEFORE INSERT ON rental_intel.rent_price_history
+    FOR EACH ROW
+    EXECUTE FUNCTION rental_intel.fill_price_history_zip();
+
+-- Function to append new price rows to the ZIP daily rollup, aggregated
+-- per statement so a bulk insert costs one upsert per (zip, day)
+CREATE OR REPLACE FUNCTION rental_intel.rollup_new_prices()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO rental_intel.zip_daily_rent_rollup AS r (
+        zip, observed_date, rent_count, rent_sum, rent_sumsq,
+        increase_count, decrease_count
+    )
+    SELECT 
+        n.zip,
+        n.observed_date,
+        COUNT(*),
+        SUM(n.observed_rent),
+        SUM(n.observed_rent * n.observed_rent),
+        COUNT(*) FILTER (WHERE n.change_type = 'increase'),
+        COUNT(*) FILTER (WHERE n.change_type = 'decrease')
+    FROM new_prices n
+    GROUP BY n.zip, n.observed_date
+    ON CONFLICT (zip, observed_date) DO UPDATE SET
+        rent_count = r.rent_count + EXCLUDED.rent_count,
+        rent_sum = r.rent_sum + EXCLUDED.rent_sum,
+        rent_sumsq = r.rent_sumsq + EXCLUDED.rent_sumsq,
+        increase_count = r.increase_count + EXCLUDED.increase_count,
+        decrease_count = r.decrease_count + EXCLUDED.decrease_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger for the ZIP daily rollup (same transaction as the append)
+CREATE TRIGGER trg_rollup_new_prices
+    AFTER INSERT ON rental_intel.rent_price_history
+    REFERENCING NEW TABLE AS new_prices
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rental_intel.rollup_new_prices();
+
+-- Function to count new properties per (state, city, zip), aggregated per
+-- statement so a bulk insert costs one upsert per ZIP
+CREATE OR REPLACE FUNCTION rental_intel.count_new_properties()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO rental_intel.zip_property_counts AS c (state, city, zip, property_count)
+    SELECT n.state, n.city, n.zip, COUNT(*)
+    FROM new_properties n
+    GROUP BY n.state, n.city, n.zip
+    ON CONFLICT (state, city, zip) DO UPDATE SET
+        property_count = c.property_count + EXCLUDED.property_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger for ZIP property counts (upsert conflicts are not in new_properties)
+CREATE TRIGGER trg_count_new_properties
+    AFTER INSERT ON rental_intel.properties
+    REFERENCING NEW TABLE AS new_properties
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rental_intel.count_new_properties();
+
 -- Function to upsert property
 CREATE OR REPLACE FUNCTION rental_intel.upsert_property(
     p_street TEXT,
@@ -349,10 +640,17 @@ BEGIN
     FROM rental_intel.listings WHERE listing_id = p_listing_id;
     
     SELECT observed_rent INTO v_last_rent
-    FROM rental_intel.rent_price_history
-    WHERE listing_id = p_listing_id
-    ORDER BY observed_date DESC
-    LIMIT 1;
+    FROM rental_intel.listing_current_rent
+    WHERE listing_id = p_listing_id;
+    
+    -- Not backfilled yet: fall back to the latest price history row
+    IF NOT FOUND THEN
+        SELECT observed_rent INTO v_last_rent
+        FROM rental_intel.rent_price_history
+        WHERE listing_id = p_listing_id
+        ORDER BY observed_date DESC, price_history_id DESC
+        LIMIT 1;
+    END IF;
     
     IF v_last_rent IS NULL THEN
         v_change_type := 'new';
@@ -379,50 +677,193 @@ CREATE OR REPLACE FUNCTION rental_intel.calculate_zip_metrics(
     p_zip TEXT,
     p_date DATE DEFAULT CURRENT_DATE
 ) RETURNS VOID AS $$
+BEGIN
+    PERFORM rental_intel.calculate_all_zip_metrics(p_date, ARRAY[p_zip]);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Log bucket holding a rent; about 1% relative error at any price level
+CREATE OR REPLACE FUNCTION rental_intel.rent_bucket(p_rent NUMERIC)
+RETURNS INTEGER AS $$
+    SELECT FLOOR(LN(p_rent) / LN(1.02))::INTEGER;
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+-- Representative rent for a bucket (its geometric midpoint)
+CREATE OR REPLACE FUNCTION rental_intel.rent_bucket_value(p_bucket INTEGER)
+RETURNS NUMERIC AS $$
+    SELECT ROUND((POWER(1.02::FLOAT8, p_bucket) * SQRT(1.02::FLOAT8))::NUMERIC, 2);
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+-- Quantile q of a sketch given as bucket-ordered buckets/counts arrays
+CREATE OR REPLACE FUNCTION rental_intel.sketch_quantile(
+    p_buckets INTEGER[],
+    p_counts BIGINT[],
+    p_q FLOAT8
+) RETURNS NUMERIC AS $$
 DECLARE
-    v_median_rent DECIMAL;
-    v_avg_rent DECIMAL;
-    v_active_count INTEGER;
-    v_avg_rent_psf DECIMAL;
-    v_avg_7 DECIMAL;
-    v_avg_30 DECIMAL;
-    v_avg_90 DECIMAL;
+    v_total BIGINT := 0;
+    v_rank BIGINT;
+    v_seen BIGINT := 0;
+    v_i INTEGER;
 BEGIN
-    SELECT 
-        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY lr.observed_rent),
-        AVG(lr.observed_rent),
-        COUNT(*),
-        AVG(lr.rent_per_sqft)
-    INTO v_median_rent, v_avg_rent, v_active_count, v_avg_rent_psf
-    FROM rental_intel.v_active_listings al
-    JOIN rental_intel.v_latest_rent lr ON al.listing_id = lr.listing_id
-    WHERE al.zip = p_zip;
-    
-    SELECT AVG(observed_rent) INTO v_avg_7
-    FROM rental_intel.rent_price_history rph
-    JOIN rental_intel.listings l ON rph.listing_id = l.listing_id
-    JOIN rental_intel.properties p ON rph.property_id = p.property_id
-    WHERE p.zip = p_zip AND rph.observed_date >= p_date - 7;
-    
-    SELECT AVG(observed_rent) INTO v_avg_30
-    FROM rental_intel.rent_price_history rph
-    JOIN rental_intel.listings l ON rph.listing_id = l.listing_id
-    JOIN rental_intel.properties p ON rph.property_id = p.property_id
-    WHERE p.zip = p_zip AND rph.observed_date >= p_date - 30;
-    
-    SELECT AVG(observed_rent) INTO v_avg_90
-    FROM rental_intel.rent_price_history rph
-    JOIN rental_intel.listings l ON rph.listing_id = l.listing_id
-    JOIN rental_intel.properties p ON rph.property_id = p.property_id
-    WHERE p.zip = p_zip AND rph.observed_date >= p_date - 90;
+    FOR v_i IN 1..COALESCE(array_length(p_counts, 1), 0) LOOP
+        v_total := v_total + p_counts[v_i];
+    END LOOP;
+    IF v_total = 0 THEN
+        RETURN NULL;
+    END IF;
     
+    v_rank := GREATEST(CEIL(p_q * v_total), 1);
+    FOR v_i IN 1..array_length(p_counts, 1) LOOP
+        v_seen := v_seen + p_counts[v_i];
+        IF v_seen >= v_rank THEN
+            RETURN rental_intel.rent_bucket_value(p_buckets[v_i]);
+        END IF;
+    END LOOP;
+    RETURN rental_intel.rent_bucket_value(p_buckets[array_length(p_buckets, 1)]);
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- p10/p50/p90 rent at ZIP, city, state and national grain for a date,
+-- answered by merging ZIP sketches bucket by bucket
+CREATE OR REPLACE FUNCTION rental_intel.merged_rent_quantiles(
+    p_date DATE DEFAULT CURRENT_DATE
+) RETURNS TABLE(
+    grain TEXT,
+    state TEXT,
+    city TEXT,
+    zip TEXT,
+    listings BIGINT,
+    avg_rent NUMERIC,
+    p10 NUMERIC,
+    p50 NUMERIC,
+    p90 NUMERIC
+) AS $$
+    WITH buckets AS (
+        SELECT 
+            CASE
+                WHEN GROUPING(s.state) = 1 THEN 'national'
+                WHEN GROUPING(s.city) = 1 THEN 'state'
+                WHEN GROUPING(s.zip) = 1 THEN 'city'
+                ELSE 'zip'
+            END AS grain,
+            s.state, s.city, s.zip, b.bucket,
+            SUM(b.n) AS n
+        FROM rental_intel.zip_rent_sketch s
+        CROSS JOIN LATERAL unnest(s.buckets, s.counts) AS b(bucket, n)
+        WHERE s.metric_date = p_date
+        GROUP BY GROUPING SETS (
+            (s.state, s.city, s.zip, b.bucket),
+            (s.state, s.city, b.bucket),
+            (s.state, b.bucket),
+            (b.bucket)
+        )
+    ),
+    totals AS (
+        SELECT 
+            CASE
+                WHEN GROUPING(state) = 1 THEN 'national'
+                WHEN GROUPING(city) = 1 THEN 'state'
+                WHEN GROUPING(zip) = 1 THEN 'city'
+                ELSE 'zip'
+            END AS grain,
+            state, city, zip,
+            SUM(rent_sum) / NULLIF(SUM(total_count), 0) AS avg_rent
+        FROM rental_intel.zip_rent_sketch
+        WHERE metric_date = p_date
+        GROUP BY GROUPING SETS ((state, city, zip), (state, city), (state), ())
+    ),
+    merged AS (
+        SELECT 
+            grain, state, city, zip,
+            SUM(n) AS listings,
+            array_agg(bucket ORDER BY bucket) AS buckets,
+            array_agg(n::BIGINT ORDER BY bucket) AS counts
+        FROM buckets
+        GROUP BY grain, state, city, zip
+    )
+    SELECT 
+        m.grain, m.state, m.city, m.zip, m.listings::BIGINT,
+        ROUND(t.avg_rent, 2),
+        rental_intel.sketch_quantile(m.buckets, m.counts, 0.1),
+        rental_intel.sketch_quantile(m.buckets, m.counts, 0.5),
+        rental_intel.sketch_quantile(m.buckets, m.counts, 0.9)
+    FROM merged m
+    JOIN totals t
+        ON t.grain = m.grain
+        AND t.state IS NOT DISTINCT FROM m.state
+        AND t.city IS NOT DISTINCT FROM m.city
+        AND t.zip IS NOT DISTINCT FROM m.zip;
+$$ LANGUAGE sql STABLE;
+
+-- Every ZIP's metrics for a date in one statement (optionally limited to
+-- p_zips); returns the number of ZIPs written. Moving averages and the
+-- 30-day volatility (coefficient of variation) come from the daily rollup.
+-- The ZIPs' rent sketches for the date are rebuilt alongside.
+CREATE OR REPLACE FUNCTION rental_intel.calculate_all_zip_metrics(
+    p_date DATE DEFAULT CURRENT_DATE,
+    p_zips TEXT[] DEFAULT NULL
+) RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    WITH zips AS (
+        SELECT DISTINCT zip
+        FROM rental_intel.properties
+        WHERE p_zips IS NULL OR zip = ANY(p_zips)
+    ),
+    current_rent AS (
+        SELECT 
+            al.zip,
+            PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY lr.observed_rent) AS median_rent,
+            AVG(lr.observed_rent) AS avg_rent,
+            COUNT(*) AS active_count,
+            AVG(lr.rent_per_sqft) AS avg_rent_psf
+        FROM rental_intel.v_active_listings al
+        JOIN rental_intel.v_latest_rent lr ON al.listing_id = lr.listing_id
+        WHERE p_zips IS NULL OR al.zip = ANY(p_zips)
+        GROUP BY al.zip
+    ),
+    -- At most 91 rollup rows per ZIP serve all three windows
+    windows AS (
+        SELECT 
+            zip,
+            SUM(rent_sum) FILTER (WHERE observed_date >= p_date - 7) AS sum_7,
+            SUM(rent_count) FILTER (WHERE observed_date >= p_date - 7) AS n_7,
+            SUM(rent_sum) FILTER (WHERE observed_date >= p_date - 30) AS sum_30,
+            SUM(rent_sumsq) FILTER (WHERE observed_date >= p_date - 30) AS sumsq_30,
+            SUM(rent_count) FILTER (WHERE observed_date >= p_date - 30) AS n_30,
+            SUM(rent_sum) AS sum_90,
+            SUM(rent_count) AS n_90
+        FROM rental_intel.zip_daily_rent_rollup
+        WHERE observed_date >= p_date - 90
+          AND (p_zips IS NULL OR zip = ANY(p_zips))
+        GROUP BY zip
+    ),
+    moving AS (
+        SELECT 
+            zip,
+            sum_7 / NULLIF(n_7, 0) AS avg_7,
+            sum_30 / NULLIF(n_30, 0) AS avg_30,
+            sum_90 / NULLIF(n_90, 0) AS avg_90,
+            CASE WHEN n_30 > 1 AND sum_30 > 0 THEN
+                SQRT(GREATEST(sumsq_30 - sum_30 * sum_30 / n_30, 0) / (n_30 - 1))
+                    / (sum_30 / n_30)
+            END AS volatility_30
+        FROM windows
+    )
     INSERT INTO rental_intel.daily_zip_metrics (
         zip, metric_date, median_rent, average_rent, rent_per_sqft,
-        active_listing_count, avg_7_day, avg_30_day, avg_90_day
-    ) VALUES (
-        p_zip, p_date, v_median_rent, v_avg_rent, v_avg_rent_psf,
-        v_active_count, v_avg_7, v_avg_30, v_avg_90
+        active_listing_count, avg_7_day, avg_30_day, avg_90_day,
+        price_volatility_index
     )
+    SELECT 
+        z.zip, p_date, c.median_rent, c.avg_rent, c.avg_rent_psf,
+        COALESCE(c.active_count, 0), m.avg_7, m.avg_30, m.avg_90,
+        m.volatility_30
+    FROM zips z
+    LEFT JOIN current_rent c ON c.zip = z.zip
+    LEFT JOIN moving m ON m.zip = z.zip
     ON CONFLICT (zip, metric_date) DO UPDATE SET
         median_rent = EXCLUDED.median_rent,
         average_rent = EXCLUDED.average_rent,
@@ -431,7 +872,190 @@ BEGIN
         avg_7_day = EXCLUDED.avg_7_day,
         avg_30_day = EXCLUDED.avg_30_day,
         avg_90_day = EXCLUDED.avg_90_day,
+        price_volatility_index = EXCLUDED.price_volatility_index,
         updated_at = CURRENT_TIMESTAMP;
+    
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    
+    DELETE FROM rental_intel.zip_rent_sketch
+    WHERE metric_date = p_date
+      AND (p_zips IS NULL OR zip = ANY(p_zips));
+    
+    INSERT INTO rental_intel.zip_rent_sketch (
+        metric_date, state, city, zip, buckets, counts, total_count, rent_sum
+    )
+    SELECT 
+        p_date, state, city, zip,
+        array_agg(bucket ORDER BY bucket),
+        array_agg(n ORDER BY bucket),
+        SUM(n),
+        SUM(rent_sum)
+    FROM (
+        SELECT 
+            p.state, p.city, p.zip,
+            rental_intel.rent_bucket(lr.observed_rent) AS bucket,
+            COUNT(*)::INTEGER AS n,
+            SUM(lr.observed_rent) AS rent_sum
+        FROM rental_intel.listings l
+        JOIN rental_intel.properties p ON p.property_id = l.property_id
+        JOIN rental_intel.listing_current_rent lr ON lr.listing_id = l.listing_id
+        WHERE l.listing_status = 'active'
+          AND lr.observed_rent > 0
+          AND (p_zips IS NULL OR p.zip = ANY(p_zips))
+        GROUP BY p.state, p.city, p.zip, bucket
+    ) b
+    GROUP BY state, city, zip;
+    
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Incremental daily metrics: recompute only dirty ZIPs and carry every
+-- other ZIP's previous-day row forward. Falls back to a full rebuild when
+-- p_full is set or there is no previous-day row to carry.
+CREATE OR REPLACE FUNCTION rental_intel.calculate_dirty_zip_metrics(
+    p_date DATE DEFAULT CURRENT_DATE,
+    p_full BOOLEAN DEFAULT FALSE
+) RETURNS TABLE(recomputed INTEGER, carried_forward INTEGER) AS $$
+DECLARE
+    v_zips TEXT[];
+BEGIN
+    carried_forward := 0;
+    
+    IF p_full OR NOT EXISTS (
+        SELECT 1 FROM rental_intel.daily_zip_metrics WHERE metric_date = p_date - 1
+    ) THEN
+        DELETE FROM rental_intel.dirty_zips;
+        recomputed := rental_intel.calculate_all_zip_metrics(p_date);
+        RETURN NEXT;
+        RETURN;
+    END IF;
+    
+    -- Claimed ZIPs, plus ZIPs whose 7/30/90-day windows drop observations today
+    WITH claimed AS (
+        DELETE FROM rental_intel.dirty_zips RETURNING zip
+    )
+    SELECT ARRAY(
+        SELECT zip FROM claimed
+        UNION
+        SELECT zip
+        FROM rental_intel.zip_daily_rent_rollup
+        WHERE observed_date IN (p_date - 8, p_date - 31, p_date - 91)
+    ) INTO v_zips;
+    
+    recomputed := rental_intel.calculate_all_zip_metrics(p_date, v_zips);
+    
+    INSERT INTO rental_intel.daily_zip_metrics (
+        zip, metric_date, median_rent, average_rent, rent_per_sqft,
+        active_listing_count, avg_7_day, avg_30_day, avg_90_day,
+        inventory_growth_rate, price_volatility_index, property_type_breakdown
+    )
+    SELECT 
+        zip, p_date, median_rent, average_rent, rent_per_sqft,
+        active_listing_count, avg_7_day, avg_30_day, avg_90_day,
+        inventory_growth_rate, price_volatility_index, property_type_breakdown
+    FROM rental_intel.daily_zip_metrics
+    WHERE metric_date = p_date - 1
+      AND zip <> ALL(v_zips)
+    ON CONFLICT (zip, metric_date) DO NOTHING;
+    GET DIAGNOSTICS carried_forward = ROW_COUNT;
+    
+    INSERT INTO rental_intel.zip_rent_sketch (
+        metric_date, state, city, zip, buckets, counts, total_count, rent_sum
+    )
+    SELECT p_date, state, city, zip, buckets, counts, total_count, rent_sum
+    FROM rental_intel.zip_rent_sketch
+    WHERE metric_date = p_date - 1
+      AND zip <> ALL(v_zips)
+    ON CONFLICT (metric_date, state, city, zip) DO NOTHING;
+    
+    RETURN NEXT;
+END;
+$$ LANGUAGE plpgsql;
+
+-- City, state and national rollup for a date from ZIP-level tables only:
+-- property counts, merged rent sketches and the ZIP daily rollup (a ZIP
+-- spanning cities attributes its price changes to its largest city).
+-- Returns the number of rollup rows written.
+CREATE OR REPLACE FUNCTION rental_intel.refresh_geo_market_rollup(
+    p_date DATE DEFAULT CURRENT_DATE
+) RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    WITH props AS (
+        SELECT 
+            CASE
+                WHEN GROUPING(state) = 1 THEN 'national'
+                WHEN GROUPING(city) = 1 THEN 'state'
+                ELSE 'city'
+            END AS grain,
+            state, city,
+            COUNT(DISTINCT zip) AS zip_count,
+            SUM(property_count) AS property_count
+        FROM rental_intel.zip_property_counts
+        GROUP BY GROUPING SETS ((state, city), (state), ())
+    ),
+    rents AS (
+        SELECT grain, state, city, listings, avg_rent, p10, p50, p90
+        FROM rental_intel.merged_rent_quantiles(p_date)
+        WHERE grain <> 'zip'
+    ),
+    zip_home AS (
+        SELECT DISTINCT ON (zip) zip, state, city
+        FROM rental_intel.zip_property_counts
+        ORDER BY zip, property_count DESC
+    ),
+    changes AS (
+        SELECT 
+            CASE
+                WHEN GROUPING(h.state) = 1 THEN 'national'
+                WHEN GROUPING(h.city) = 1 THEN 'state'
+                ELSE 'city'
+            END AS grain,
+            h.state, h.city,
+            SUM(r.rent_count) AS observations,
+            SUM(r.increase_count) AS increases,
+            SUM(r.decrease_count) AS decreases
+        FROM rental_intel.zip_daily_rent_rollup r
+        JOIN zip_home h ON h.zip = r.zip
+        WHERE r.observed_date = p_date
+        GROUP BY GROUPING SETS ((h.state, h.city), (h.state), ())
+    )
+    INSERT INTO rental_intel.geo_market_rollup (
+        metric_date, grain, state, city, zip_count, property_count,
+        active_listings, avg_rent, median_rent, p10_rent, p90_rent,
+        price_observations, increases, decreases, refreshed_at
+    )
+    SELECT 
+        p_date, p.grain, p.state, p.city, p.zip_count, p.property_count,
+        COALESCE(r.listings, 0), r.avg_rent, r.p50, r.p10, r.p90,
+        COALESCE(c.observations, 0), COALESCE(c.increases, 0), COALESCE(c.decreases, 0),
+        CURRENT_TIMESTAMP
+    FROM props p
+    LEFT JOIN rents r
+        ON r.grain = p.grain
+        AND r.state IS NOT DISTINCT FROM p.state
+        AND r.city IS NOT DISTINCT FROM p.city
+    LEFT JOIN changes c
+        ON c.grain = p.grain
+        AND c.state IS NOT DISTINCT FROM p.state
+        AND c.city IS NOT DISTINCT FROM p.city
+    ON CONFLICT (metric_date, grain, COALESCE(state, ''), COALESCE(city, '')) DO UPDATE SET
+        zip_count = EXCLUDED.zip_count,
+        property_count = EXCLUDED.property_count,
+        active_listings = EXCLUDED.active_listings,
+        avg_rent = EXCLUDED.avg_rent,
+        median_rent = EXCLUDED.median_rent,
+        p10_rent = EXCLUDED.p10_rent,
+        p90_rent = EXCLUDED.p90_rent,
+        price_observations = EXCLUDED.price_observations,
+        increases = EXCLUDED.increases,
+        decreases = EXCLUDED.decreases,
+        refreshed_at = EXCLUDED.refreshed_at;
+    
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -439,7 +1063,9 @@ $$ LANGUAGE plpgsql;
 -- PARTITION MANAGEMENT
 -- ============================================
 
--- Function to create monthly partition
+-- Function to create monthly partition. When a DEFAULT partition exists,
+-- the month is built as a standalone table, the month's rows are moved
+-- out of the DEFAULT partition into it, and it is attached
 CREATE OR REPLACE FUNCTION rental_intel.create_monthly_partition(
     p_year INTEGER,
     p_month INTEGER
@@ -448,6 +1074,8 @@ DECLARE
     v_partition_name TEXT;
     v_start_date DATE;
     v_end_date DATE;
+    v_default TEXT;
+    v_moved BIGINT := 0;
     v_sql TEXT;
 BEGIN
     v_partition_name := 'rent_price_history_' || p_year || '_' || LPAD(p_month::TEXT, 2, '0');
@@ -458,16 +1086,108 @@ BEGIN
         RETURN 'Partition ' || v_partition_name || ' already exists';
     END IF;
     
-    v_sql := 'CREATE TABLE rental_intel.' || v_partition_name || 
-             ' PARTITION OF rental_intel.rent_price_history ' ||
-             'FOR VALUES FROM (''' || v_start_date || ''') TO (''' || v_end_date || ''')';
+    SELECT c.relname INTO v_default
+    FROM pg_partitioned_table pt
+    JOIN pg_class c ON c.oid = pt.partdefid
+    WHERE pt.partrelid = 'rental_intel.rent_price_history'::regclass;
     
-    EXECUTE v_sql;
+    IF v_default IS NULL THEN
+        v_sql := 'CREATE TABLE rental_intel.' || v_partition_name || 
+                 ' PARTITION OF rental_intel.rent_price_history ' ||
+                 'FOR VALUES FROM (''' || v_start_date || ''') TO (''' || v_end_date || ''')';
+        EXECUTE v_sql;
+    ELSE
+        EXECUTE format('CREATE TABLE rental_intel.%I (LIKE rental_intel.rent_price_history INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                       v_partition_name);
+        -- Moved rows were counted by the price history triggers when they
+        -- first landed in the DEFAULT partition, so they bypass them here
+        EXECUTE format('WITH moved AS (DELETE FROM rental_intel.%I WHERE observed_date >= %L AND observed_date < %L RETURNING *) '
+                       'INSERT INTO rental_intel.%I SELECT * FROM moved',
+                       v_default, v_start_date, v_end_date, v_partition_name);
+        GET DIAGNOSTICS v_moved = ROW_COUNT;
+        EXECUTE format('ALTER TABLE rental_intel.rent_price_history ATTACH PARTITION rental_intel.%I FOR VALUES FROM (%L) TO (%L)',
+                       v_partition_name, v_start_date, v_end_date);
+    END IF;
+    
+    EXECUTE 'CREATE INDEX ' || v_partition_name || '_observed_idx ON rental_intel.' ||
+            v_partition_name || ' (observed_date)';
     
+    IF v_moved > 0 THEN
+        RETURN 'Created partition: ' || v_partition_name || ' (' || v_moved || ' rows moved from default)';
+    END IF;
     RETURN 'Created partition: ' || v_partition_name;
 END;
 $$ LANGUAGE plpgsql;
 
+-- Function to create every missing monthly partition between two dates
+-- (bulk loaders call it with the date range of a batch before inserting)
+CREATE OR REPLACE FUNCTION rental_intel.ensure_partitions(
+    p_from DATE,
+    p_to DATE
+) RETURNS TABLE(month_created TEXT) AS $$
+DECLARE
+    v_month DATE := DATE_TRUNC('month', p_from)::DATE;
+BEGIN
+    WHILE v_month <= p_to LOOP
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_tables
+            WHERE schemaname = 'rental_intel'
+            AND tablename = 'rent_price_history_' || TO_CHAR(v_month, 'YYYY_MM')
+        ) THEN
+            month_created := rental_intel.create_monthly_partition(
+                EXTRACT(YEAR FROM v_month)::INTEGER,
+                EXTRACT(MONTH FROM v_month)::INTEGER
+            );
+            RETURN NEXT;
+        END IF;
+        v_month := v_month + INTERVAL '1 month';
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function to create the optional DEFAULT partition, which catches rows
+-- for months that have no partition yet instead of failing the insert
+CREATE OR REPLACE FUNCTION rental_intel.create_default_partition()
+RETURNS TEXT AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_tables WHERE tablename = 'rent_price_history_default') THEN
+        RETURN 'Partition rent_price_history_default already exists';
+    END IF;
+    
+    CREATE TABLE rental_intel.rent_price_history_default
+        PARTITION OF rental_intel.rent_price_history DEFAULT;
+    CREATE INDEX rent_price_history_default_observed_idx
+        ON rental_intel.rent_price_history_default (observed_date);
+    
+    RETURN 'Created partition: rent_price_history_default';
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function to give every month found in the DEFAULT partition its own
+-- partition, moving those rows out of DEFAULT
+CREATE OR REPLACE FUNCTION rental_intel.drain_default_partition()
+RETURNS TABLE(month_created TEXT) AS $$
+DECLARE
+    v_month DATE;
+BEGIN
+    IF to_regclass('rental_intel.rent_price_history_default') IS NULL THEN
+        RETURN;
+    END IF;
+    
+    FOR v_month IN
+        SELECT DISTINCT DATE_TRUNC('month', observed_date)::DATE
+        FROM rental_intel.rent_price_history_default
+        ORDER BY 1
+    LOOP
+        month_created := rental_intel.create_monthly_partition(
+            EXTRACT(YEAR FROM v_month)::INTEGER,
+            EXTRACT(MONTH FROM v_month)::INTEGER
+        );
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
 -- Function to auto-create next 3 months of partitions
 CREATE OR REPLACE FUNCTION rental_intel.auto_create_partitions()
 RETURNS TABLE(month_created TEXT) AS $$
@@ -500,9 +1220,22 @@ COMMENT ON SCHEMA rental_intel IS 'Rental Intelligence System for market analysi
 COMMENT ON TABLE rental_intel.properties IS 'Master property records with normalized addresses';
 COMMENT ON TABLE rental_intel.listings IS 'Active and historical rental listings';
 COMMENT ON TABLE rental_intel.rent_price_history IS 'Append-only price history, partitioned by month';
+COMMENT ON TABLE rental_intel.listing_current_rent IS 'Latest observed rent per listing, maintained on price history insert';
+COMMENT ON TABLE rental_intel.zip_daily_rent_rollup IS 'Per-ZIP daily count, sum and sum of squares of observed rent';
+COMMENT ON COLUMN rental_intel.rent_price_history.zip IS 'Property ZIP, denormalized for (zip, observed_date) range scans';
 COMMENT ON TABLE rental_intel.daily_zip_metrics IS 'Daily ZIP code level market metrics';
 COMMENT ON TABLE rental_intel.forecast_zip_rent IS 'Forecasted rent predictions by ZIP code';
 COMMENT ON TABLE rental_intel.ingestion_log IS 'Audit log for all data ingestion runs';
+COMMENT ON TABLE rental_intel.forecast_shard_log IS 'Per-state-shard timing and model version of weekly forecast runs';
+COMMENT ON TABLE rental_intel.forecast_model_state IS 'Per-ZIP forecast model statistics for warm-start updates';
+COMMENT ON MATERIALIZED VIEW rental_intel.mv_market_snapshot IS 'Market snapshot by state, city and ZIP (grain column), refreshed daily';
+COMMENT ON TABLE rental_intel.zip_rent_sketch IS 'Per-ZIP daily log-bucket rent histogram, mergeable into city/state/national quantiles';
+COMMENT ON TABLE rental_intel.zip_property_counts IS 'Properties per state, city and ZIP, maintained on property insert';
+COMMENT ON TABLE rental_intel.geo_market_rollup IS 'Daily city, state and national market summary built from ZIP-level tables';
+COMMENT ON TABLE rental_intel.migration_backfill IS 'Batched backfill progress of online migrations';
+COMMENT ON TABLE rental_intel.dirty_zips IS 'ZIPs touched by ingestion since the last daily metrics refresh';
+COMMENT ON TABLE rental_intel.materialized_view_refresh IS 'Last refresh time and row count per materialized view';
+COMMENT ON COLUMN rental_intel.ingestion_log.checkpoint IS 'Latest resumable checkpoint: batch cursor, counters, throughput';
 
 -- Done
 SELECT 'Schema created successfully' AS status;